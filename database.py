@@ -1,35 +1,302 @@
 import os
 import sqlite3
-from typing import Optional
-from datetime import datetime
+from typing import Dict, List, Optional
+from datetime import datetime, date, timedelta
 import json
+import threading
+
+from dinero import centimos, a_euros, desglose_iva
 
 # Central DB path for the application
 DB_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), 'inventario.db'))
 
 
+class PooledConnection(sqlite3.Connection):
+    """sqlite3.Connection que vuelve al pool en lugar de cerrarse.
+
+    `close()` devuelve la conexión al pool del hilo actual (haciendo rollback
+    de lo no confirmado) y `with connect() as conn:` hace commit/rollback y
+    después la devuelve, igual que si se llamara a `close()`.
+    """
+
+    _pool = None
+    _pool_key = None
+    _checked_out = False
+
+    def close(self):
+        pool = self._pool
+        if pool is None:
+            super().close()
+            return
+        pool.release(self)
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            return super().__exit__(exc_type, exc, tb)
+        finally:
+            self.close()
+
+
+class ConnectionPool:
+    """Pool de conexiones SQLite reutilizables por hilo.
+
+    Cada hilo usa sólo sus propias conexiones: mantiene su lista de
+    conexiones libres por ruta de BD. Las PRAGMA se aplican una sola vez al
+    crear la conexión. El pool registra las listas de todos los hilos, así
+    que `close_all()` (al salir) cierra también las libres del worker
+    post-venta, de los índices en segundo plano y de las consultas
+    diferidas; las de hilos ya terminados se cierran en el siguiente
+    `checkout`.
+    """
+
+    def __init__(self, max_idle: int = 4):
+        self.max_idle = max_idle
+        self._lock = threading.Lock()
+        # hilo -> {ruta de BD: [conexiones libres]}
+        self._por_hilo: Dict[threading.Thread, Dict[str, List[sqlite3.Connection]]] = {}
+
+    def _idle(self, key):
+        # con self._lock tomado
+        return self._por_hilo.setdefault(threading.current_thread(), {}).setdefault(key, [])
+
+    def _cerrar_hilos_terminados(self):
+        # con self._lock tomado
+        for hilo in [h for h in self._por_hilo if not h.is_alive()]:
+            for conns in self._por_hilo.pop(hilo).values():
+                while conns:
+                    self._really_close(conns.pop())
+
+    def _open(self, path):
+        # Use a short timeout to reduce immediate 'database is locked' errors.
+        # check_same_thread=False only so close_all() can close another
+        # thread's idle connections; each connection is still used by one thread.
+        conn = sqlite3.connect(path, timeout=5.0, factory=PooledConnection, check_same_thread=False)
+        try:
+            # Enable WAL to improve concurrency between readers and writers
+            conn.execute("PRAGMA journal_mode=WAL")
+        except Exception:
+            # If PRAGMA fails for any reason, continue with the connection
+            pass
+        conn._pool = self
+        conn._pool_key = path
+        return conn
+
+    def checkout(self, db_path: Optional[str] = None):
+        """Devuelve una conexión libre del hilo actual o abre una nueva."""
+        path = db_path if db_path else DB_PATH
+        with self._lock:
+            self._cerrar_hilos_terminados()
+            idle = self._idle(path)
+            conn = idle.pop() if idle else None
+        if conn is None:
+            conn = self._open(path)
+        conn._checked_out = True
+        # Return rows as sqlite3.Row to allow access by column name
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def release(self, conn):
+        """Devuelve `conn` al pool; si ya hay bastantes libres la cierra."""
+        if not conn._checked_out:
+            return
+        conn._checked_out = False
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+        except Exception:
+            self._really_close(conn)
+            return
+        with self._lock:
+            idle = self._idle(conn._pool_key)
+            if len(idle) < self.max_idle:
+                idle.append(conn)
+                return
+        self._really_close(conn)
+
+    def close_all(self):
+        """Cierra las conexiones libres de todos los hilos (p.ej. al salir)."""
+        with self._lock:
+            por_hilo, self._por_hilo = self._por_hilo, {}
+        for idle in por_hilo.values():
+            for conns in idle.values():
+                while conns:
+                    self._really_close(conns.pop())
+
+    @staticmethod
+    def _really_close(conn):
+        try:
+            sqlite3.Connection.close(conn)
+        except Exception:
+            pass
+
+
+_pool = ConnectionPool()
+
+
 def connect(db_path: Optional[str] = None):
-    """Return a sqlite3.Connection to the canonical DB path.
+    """Return a pooled sqlite3.Connection to the canonical DB path.
+
+    Pass `db_path` to override (used in tests or scripts). Calling
+    `conn.close()` (or leaving a `with connect() as conn:` block) returns the
+    connection to the per-thread pool instead of closing the file.
+    """
+    return _pool.checkout(db_path)
+
+
+def close_all():
+    """Close idle pooled connections of every thread (call at exit, once workers are done)."""
+    _pool.close_all()
+
+
+def rango_dia(fecha=None):
+    """Return the half-open range (inicio, fin) of ISO strings for one day.
+
+    Use as `created_at >= ? AND created_at < ?` instead of `date(created_at)=?`
+    so SQLite can seek `idx_tickets_created_at` instead of scanning tickets.
+    `fecha` may be a date/datetime or a string starting with YYYY-MM-DD.
+    """
+    return rango_dias(fecha, fecha)
+
+
+def rango_dias(desde=None, hasta=None):
+    """Half-open range (inicio, fin) covering the days `desde`..`hasta` inclusive."""
+    def _to_date(v):
+        if v is None:
+            return date.today()
+        if isinstance(v, datetime):
+            return v.date()
+        if isinstance(v, date):
+            return v
+        return date.fromisoformat(str(v).strip()[:10])
+    d1 = _to_date(desde)
+    d2 = _to_date(hasta)
+    return d1.isoformat(), (d2 + timedelta(days=1)).isoformat()
+
+
+def dias_con_tickets(db_path: Optional[str] = None, desc: bool = True):
+    """Return the distinct days (YYYY-MM-DD) that have tickets.
 
-    Pass `db_path` to override (used in tests or scripts).
+    Walks `idx_tickets_created_at` with one seek per day instead of
+    `SELECT DISTINCT date(created_at)`, which reads every ticket.
+    """
+    if desc:
+        sql = '''
+            WITH RECURSIVE dias(d) AS (
+                SELECT substr(MAX(created_at), 1, 10) FROM tickets
+                UNION ALL
+                SELECT (SELECT substr(MAX(created_at), 1, 10) FROM tickets WHERE created_at < dias.d)
+                FROM dias WHERE dias.d IS NOT NULL
+            )
+            SELECT d FROM dias WHERE d IS NOT NULL
+        '''
+    else:
+        sql = '''
+            WITH RECURSIVE dias(d) AS (
+                SELECT substr(MIN(created_at), 1, 10) FROM tickets
+                UNION ALL
+                SELECT (SELECT substr(MIN(created_at), 1, 10) FROM tickets WHERE created_at >= date(dias.d, '+1 day'))
+                FROM dias WHERE dias.d IS NOT NULL
+            )
+            SELECT d FROM dias WHERE d IS NOT NULL
+        '''
+    conn = connect(db_path)
+    try:
+        cur = conn.cursor()
+        cur.execute(sql)
+        return [r[0] for r in cur.fetchall()]
+    finally:
+        conn.close()
+
+
+# Candidate column names used by older databases (probed once, see product_schema)
+NAME_COL_CANDIDATES = ('nombre', 'name')
+SKU_COL_CANDIDATES = ('sku', 'codigo', 'codigo_barra', 'codigo_barras')
+TIPO_COL_CANDIDATES = ('tipo', 'tipo_id', 'id_tipo', 'tipo_shop')
+
+_schema_lock = threading.Lock()
+_schema_cache = {}
+
+
+def table_columns(table: str, db_path: Optional[str] = None):
+    """Return the column names of `table`, cached per DB path.
+
+    The cache is filled on first use (or by `bootstrap_schema`) and is only
+    invalidated through `refresh_schema`, which migrations must call after
+    altering tables.
     """
     path = db_path if db_path else DB_PATH
-    # Use a short timeout to reduce immediate 'database is locked' errors
-    conn = sqlite3.connect(path, timeout=5.0)
+    with _schema_lock:
+        tables = _schema_cache.setdefault(path, {})
+        cols = tables.get(table)
+    if cols is not None:
+        return list(cols)
+    cols = []
+    conn = connect(db_path)
     try:
-        # Enable WAL to improve concurrency between readers and writers
-        conn.execute("PRAGMA journal_mode=WAL")
+        cur = conn.cursor()
+        cur.execute(f"PRAGMA table_info({table})")
+        cols = [r[1] for r in cur.fetchall()]
     except Exception:
-        # If PRAGMA fails for any reason, continue with the connection
-        pass
-    # Return rows as sqlite3.Row to allow access by column name
-    conn.row_factory = sqlite3.Row
-    return conn
+        cols = []
+    finally:
+        conn.close()
+    # no cachear tablas inexistentes: pueden crearse más tarde
+    if cols:
+        with _schema_lock:
+            _schema_cache.setdefault(path, {})[table] = tuple(cols)
+    return list(cols)
 
 
-def crear_base_de_datos():
+def product_schema(db_path: Optional[str] = None):
+    """Resolved column names of `productos`.
+
+    Returns a dict with `columns` plus `name_col`, `sku_col` and `tipo_col`
+    (None when the table has no such column).
+    """
+    cols = table_columns('productos', db_path)
+
+    def _first(candidates):
+        for c in candidates:
+            if c in cols:
+                return c
+        return None
+
+    return {
+        'columns': cols,
+        'name_col': _first(NAME_COL_CANDIDATES),
+        'sku_col': _first(SKU_COL_CANDIDATES),
+        'tipo_col': _first(TIPO_COL_CANDIDATES),
+    }
+
+
+def refresh_schema(db_path: Optional[str] = None):
+    """Forget cached column info (call after running a migration)."""
+    path = db_path if db_path else DB_PATH
+    with _schema_lock:
+        _schema_cache.pop(path, None)
+
+
+def bootstrap_schema(db_path: Optional[str] = None):
+    """Create/migrate the schema once at startup and warm the column cache."""
+    crear_base_de_datos(db_path)
+    crear_tablas_tickets(db_path)
+    ensure_product_schema(db_path)
+    ensure_relaciones_schema(db_path)
+    ensure_ticket_schema(db_path)
+    ensure_centimos_schema(db_path)
+    ensure_clientes_busqueda_schema(db_path)
+    ensure_indexes(db_path)
+    ensure_turno_schema(db_path)
+    ensure_ventas_dia_schema(db_path)
+    ensure_busqueda_schema(db_path)
+    refresh_schema(db_path)
+    for table in ('productos', 'tickets', 'ticket_lines', 'precios', 'codigos_barras'):
+        table_columns(table, db_path)
+
+
+def crear_base_de_datos(db_path: Optional[str] = None):
     """Create core tables if they don't exist."""
-    conn = connect()
+    conn = connect(db_path)
     cursor = conn.cursor()
 
     cursor.execute('''
@@ -74,14 +341,14 @@ def crear_base_de_datos():
     conn.close()
 
 
-def crear_tablas_tickets():
+def crear_tablas_tickets(db_path: Optional[str] = None):
     """Create tickets and ticket_lines tables used to store receipts.
 
     The schema stores a per-day sequential number `ticket_seq` so each
     day's tickets can be numbered starting at 1 (useful for legal/organizational
     purposes). Lines are stored separately in `ticket_lines`.
     """
-    conn = connect()
+    conn = connect(db_path)
     cur = conn.cursor()
 
     cur.execute('''
@@ -156,9 +423,9 @@ def crear_tablas_tickets():
         pass
 
 
-def ensure_ticket_schema():
+def ensure_ticket_schema(db_path: Optional[str] = None):
     """Ensure `tickets` table has `ticket_no` and `forma_pago` columns (migration safe)."""
-    conn = connect()
+    conn = connect(db_path)
     cur = conn.cursor()
     try:
         cur.execute("PRAGMA table_info(tickets)")
@@ -190,6 +457,25 @@ def ensure_ticket_schema():
             cur.execute('ALTER TABLE tickets ADD COLUMN cierre_id INTEGER')
     except Exception:
         pass
+    # ticket_lines: producto y su categoría/tipo en el momento de la venta
+    try:
+        cur.execute("PRAGMA table_info(ticket_lines)")
+        cols_lineas = [r[1] for r in cur.fetchall()]
+    except Exception:
+        cols_lineas = []
+    nuevas = []
+    for col, spec in (('producto_id', 'INTEGER'), ('categoria', 'TEXT'), ('tipo', 'TEXT')):
+        if cols_lineas and col not in cols_lineas:
+            try:
+                cur.execute(f'ALTER TABLE ticket_lines ADD COLUMN {col} {spec}')
+                nuevas.append(col)
+            except Exception:
+                pass
+    if nuevas:
+        try:
+            rellenar_lineas_producto(conn)
+        except Exception:
+            pass
     try:
         conn.commit()
     except Exception:
@@ -202,11 +488,66 @@ def ensure_ticket_schema():
         conn.close()
     except Exception:
         pass
+    refresh_schema(db_path)
+
+
+# Importes en céntimos enteros junto a las columnas REAL de siempre:
+# (tabla, columna REAL, columna en céntimos). TicketService los escribe
+# desde el carrito; los triggers rellenan los de cualquier otro escritor
+# que sólo dé el REAL (scripts, versiones antiguas).
+COLUMNAS_CENTIMOS = (
+    ('tickets', 'total', 'total_cent'),
+    ('ticket_lines', 'precio', 'precio_cent'),
+)
 
 
-def ensure_product_schema():
+def ensure_centimos_schema(db_path: Optional[str] = None) -> bool:
+    """Add tickets.total_cent / ticket_lines.precio_cent and the triggers that fill them.
+
+    Backfills the cents the first time. Returns False if the ticket tables
+    do not exist yet.
+    """
+    conn = connect(db_path)
+    cur = conn.cursor()
+    try:
+        nuevas = []
+        for tabla, col, col_cent in COLUMNAS_CENTIMOS:
+            cur.execute(f'PRAGMA table_info({tabla})')
+            cols = {r[1] for r in cur.fetchall()}
+            if col not in cols:
+                return False
+            if col_cent not in cols:
+                cur.execute(f'ALTER TABLE {tabla} ADD COLUMN {col_cent} INTEGER')
+                nuevas.append(tabla)
+            calc = f'CAST(ROUND(new.{col} * 100) AS INTEGER)'
+            triggers = {
+                f'trg_centimos_{tabla}_ins': f"AFTER INSERT ON {tabla} WHEN new.{col_cent} IS NULL BEGIN UPDATE {tabla} SET {col_cent} = {calc} WHERE id = new.id; END",
+                # sólo si el escritor cambió el REAL sin tocar los céntimos
+                f'trg_centimos_{tabla}_upd': (
+                    f"AFTER UPDATE OF {col} ON {tabla} WHEN new.{col_cent} IS old.{col_cent} "
+                    f"BEGIN UPDATE {tabla} SET {col_cent} = {calc} WHERE id = new.id; END"
+                ),
+            }
+            for nombre, cuerpo in triggers.items():
+                cur.execute(f'CREATE TRIGGER IF NOT EXISTS {nombre} {cuerpo}')
+        if nuevas:
+            rellenar_centimos(conn)
+        conn.commit()
+        return True
+    finally:
+        conn.close()
+        refresh_schema(db_path)
+
+
+def rellenar_centimos(conn):
+    """Recompute every cents column from its REAL column (caller commits)."""
+    for tabla, col, col_cent in COLUMNAS_CENTIMOS:
+        conn.execute(f'UPDATE {tabla} SET {col_cent} = CAST(ROUND({col} * 100) AS INTEGER)')
+
+
+def ensure_product_schema(db_path: Optional[str] = None):
     """Apply lightweight migrations to ensure product-related columns/tables exist."""
-    conn = connect()
+    conn = connect(db_path)
     cur = conn.cursor()
     # Add columns to productos if missing
     try:
@@ -253,6 +594,862 @@ def ensure_product_schema():
 
     conn.commit()
     conn.close()
+    refresh_schema(db_path)
+
+
+# Claves enteras de productos hacia sus tablas maestras:
+# (columna_id, columna de texto en productos, tabla maestra). El texto se
+# sigue guardando tal cual (nombre o id según de dónde venga); los triggers
+# resuelven el id con las mismas reglas que los antiguos JOIN
+# `p.categoria = cat.nombre OR p.categoria = cat.id`.
+RELACIONES_PRODUCTO = (
+    ('categoria_id', 'categoria', 'categorias'),
+    ('proveedor_id', 'proveedor', 'proveedores'),
+    ('tipo_id', 'tipo', 'tipos'),
+)
+
+
+def _sql_resolver_relacion(tabla: str, texto: str) -> str:
+    """Subconsulta con el id de `tabla` al que apunta la expresión `texto` (nombre o id)."""
+    # por nombre primero; si no, el texto es directamente el id
+    return (
+        f"COALESCE((SELECT m.id FROM {tabla} m WHERE m.nombre = {texto} LIMIT 1), "
+        f"(SELECT m.id FROM {tabla} m WHERE m.id = {texto}))"
+    )
+
+
+def ensure_relaciones_schema(db_path: Optional[str] = None) -> bool:
+    """Add productos.categoria_id/proveedor_id/tipo_id and the triggers that keep them in sync.
+
+    Also adds productos.<campo>_orden: the name the catalogue shows for the
+    related row (the master's current name, else the product's text), so
+    sorting by it alphabetically can use an index. Backfills both the first
+    time. Returns False if `productos` or one of the master tables does not
+    exist yet.
+    """
+    conn = connect(db_path)
+    cur = conn.cursor()
+    try:
+        cur.execute('PRAGMA table_info(productos)')
+        prod_cols = {r[1] for r in cur.fetchall()}
+        cur.execute("SELECT name FROM sqlite_master WHERE type='table'")
+        tablas = {r[0] for r in cur.fetchall()}
+        if not prod_cols or any(t not in tablas for _, _, t in RELACIONES_PRODUCTO):
+            return False
+        if any(c not in prod_cols for _, c, _ in RELACIONES_PRODUCTO):
+            return False
+
+        nuevas = [col_id for col_id, _, _ in RELACIONES_PRODUCTO if col_id not in prod_cols]
+        for col_id in nuevas:
+            cur.execute(f'ALTER TABLE productos ADD COLUMN {col_id} INTEGER')
+        nuevas_orden = [f'{c}_orden' for _, c, _ in RELACIONES_PRODUCTO if f'{c}_orden' not in prod_cols]
+        for col in nuevas_orden:
+            cur.execute(f'ALTER TABLE productos ADD COLUMN {col} TEXT')
+
+        sets_new = ', '.join(f'{col_id} = {_sql_resolver_relacion(t, "new." + c)}' for col_id, c, t in RELACIONES_PRODUCTO)
+        triggers = {
+            'trg_relaciones_productos_ins': f"AFTER INSERT ON productos BEGIN UPDATE productos SET {sets_new} WHERE id = new.id; END",
+            'trg_relaciones_productos_upd': (
+                f"AFTER UPDATE OF {', '.join(c for _, c, _ in RELACIONES_PRODUCTO)} ON productos "
+                f"BEGIN UPDATE productos SET {sets_new} WHERE id = new.id; END"
+            ),
+        }
+        for col_id, c, t in RELACIONES_PRODUCTO:
+            # un alta o un cambio de nombre en la maestra enlaza los productos que ya la nombraban
+            enlazar = f"UPDATE productos SET {col_id} = new.id WHERE {col_id} IS NULL AND ({c} = new.nombre OR {c} = new.id);"
+            triggers[f'trg_relaciones_{t}_ins'] = f"AFTER INSERT ON {t} BEGIN {enlazar} END"
+            triggers[f'trg_relaciones_{t}_upd'] = f"AFTER UPDATE OF nombre ON {t} BEGIN {enlazar} END"
+            triggers[f'trg_relaciones_{t}_del'] = f"AFTER DELETE ON {t} BEGIN UPDATE productos SET {col_id} = NULL WHERE {col_id} = old.id; END"
+            # el nombre para ordenar sigue a los renombres de la maestra
+            triggers[f'trg_orden_{t}_upd'] = (
+                f"AFTER UPDATE OF nombre ON {t} "
+                f"BEGIN UPDATE productos SET {c}_orden = COALESCE(new.nombre, {c}, '') WHERE {col_id} = new.id; END"
+            )
+        # cualquier cambio de las claves (los triggers de arriba incluidos) recalcula el nombre para ordenar
+        triggers['trg_orden_productos_ids'] = (
+            f"AFTER UPDATE OF {', '.join(col_id for col_id, _, _ in RELACIONES_PRODUCTO)} ON productos "
+            f"BEGIN UPDATE productos SET {_sql_orden_relaciones('new')} WHERE id = new.id; END"
+        )
+        for nombre, cuerpo in triggers.items():
+            cur.execute(f'CREATE TRIGGER IF NOT EXISTS {nombre} {cuerpo}')
+        if nuevas or nuevas_orden:
+            reconstruir_relaciones(conn)
+        conn.commit()
+        return True
+    finally:
+        conn.close()
+        refresh_schema(db_path)
+
+
+def _sql_orden_relaciones(fila: str) -> str:
+    """SET de <campo>_orden de la fila `fila` ('new' o 'productos') a partir de sus claves."""
+    return ', '.join(
+        f"{c}_orden = COALESCE((SELECT m.nombre FROM {t} m WHERE m.id = {fila}.{col_id}), {fila}.{c}, '')"
+        for col_id, c, t in RELACIONES_PRODUCTO
+    )
+
+
+def reconstruir_relaciones(conn):
+    """Recompute categoria_id/proveedor_id/tipo_id and the sort names of every product (caller commits)."""
+    sets = ', '.join(f'{col_id} = {_sql_resolver_relacion(t, "productos." + c)}' for col_id, c, t in RELACIONES_PRODUCTO)
+    conn.execute(f'UPDATE productos SET {sets}')
+    conn.execute(f'UPDATE productos SET {_sql_orden_relaciones("productos")}')
+
+
+# --- Búsqueda de clientes ---
+# telefono_norm (sólo dígitos) y dni_norm (mayúsculas, sin espacios, guiones
+# ni puntos) se buscan por prefijo con idx_clientes_*_norm; el nombre va a
+# clientes_fts (palabras sin acentos, con prefijos). Los triggers los
+# mantienen al día ante cualquier escritura en clientes.
+SEPARADORES_TELEFONO = (' ', '-', '.', '+', '(', ')', '/')
+SEPARADORES_DNI = (' ', '-', '.')
+
+
+def _sql_quitar(expr: str, separadores) -> str:
+    for sep in separadores:
+        expr = f"REPLACE({expr}, '{sep}', '')"
+    return expr
+
+
+def _sql_clientes_norm(fila: str) -> str:
+    """SET de telefono_norm/dni_norm a partir de la fila `fila` ('new' o 'clientes')."""
+    tel = _sql_quitar(f"TRIM({fila}.telefono)", SEPARADORES_TELEFONO)
+    dni = 'UPPER(' + _sql_quitar(f"TRIM({fila}.dni)", SEPARADORES_DNI) + ')'
+    return f"telefono_norm = NULLIF({tel}, ''), dni_norm = NULLIF({dni}, '')"
+
+
+def ensure_clientes_busqueda_schema(db_path: Optional[str] = None) -> bool:
+    """Add clientes.telefono_norm/dni_norm, the name index and their triggers.
+
+    Fills them the first time. Returns False if `clientes` does not exist;
+    without FTS5 only the name search table is skipped (LIKE is used).
+    """
+    conn = connect(db_path)
+    cur = conn.cursor()
+    try:
+        cur.execute('PRAGMA table_info(clientes)')
+        cols = {r[1] for r in cur.fetchall()}
+        if not cols:
+            return False
+        nuevas = [c for c in ('telefono_norm', 'dni_norm') if c not in cols]
+        for c in nuevas:
+            cur.execute(f'ALTER TABLE clientes ADD COLUMN {c} TEXT')
+        # listado alfabético paginado sin ordenar toda la tabla
+        cur.execute('CREATE INDEX IF NOT EXISTS idx_clientes_nombre_nocase ON clientes(nombre COLLATE NOCASE)')
+
+        triggers = {
+            'trg_clientes_norm_ins': f"AFTER INSERT ON clientes BEGIN UPDATE clientes SET {_sql_clientes_norm('new')} WHERE id = new.id; END",
+            'trg_clientes_norm_upd': f"AFTER UPDATE OF telefono, dni ON clientes BEGIN UPDATE clientes SET {_sql_clientes_norm('new')} WHERE id = new.id; END",
+        }
+        cur.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name='clientes_fts'")
+        fts_existia = cur.fetchone() is not None
+        try:
+            cur.execute(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS clientes_fts USING fts5(nombre, "
+                "tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')"
+            )
+            triggers.update({
+                'trg_clientes_fts_ins': "AFTER INSERT ON clientes BEGIN INSERT INTO clientes_fts(rowid, nombre) VALUES (new.id, new.nombre); END",
+                'trg_clientes_fts_upd': (
+                    "AFTER UPDATE OF nombre ON clientes BEGIN DELETE FROM clientes_fts WHERE rowid = old.id; "
+                    "INSERT INTO clientes_fts(rowid, nombre) VALUES (new.id, new.nombre); END"
+                ),
+                'trg_clientes_fts_del': "AFTER DELETE ON clientes BEGIN DELETE FROM clientes_fts WHERE rowid = old.id; END",
+            })
+            fts = True
+        except sqlite3.OperationalError:
+            fts = False
+        for nombre, cuerpo in triggers.items():
+            cur.execute(f'CREATE TRIGGER IF NOT EXISTS {nombre} {cuerpo}')
+        if nuevas or (fts and not fts_existia):
+            reconstruir_clientes_busqueda(conn)
+        conn.commit()
+        return True
+    finally:
+        conn.close()
+        refresh_schema(db_path)
+
+
+def reconstruir_clientes_busqueda(conn):
+    """Recompute the normalised keys and refill clientes_fts if present (caller commits)."""
+    cur = conn.cursor()
+    cur.execute(f'UPDATE clientes SET {_sql_clientes_norm("clientes")}')
+    cur.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name='clientes_fts'")
+    if cur.fetchone() is not None:
+        cur.execute('DELETE FROM clientes_fts')
+        cur.execute('INSERT INTO clientes_fts(rowid, nombre) SELECT id, nombre FROM clientes')
+
+
+# Índices de las consultas calientes (escáner, cierres, búsqueda de clientes,
+# rejilla de botones sin código). (nombre, tabla, columnas)
+INDICES = (
+    ('idx_tickets_created_at', 'tickets', ('created_at',)),
+    ('idx_tickets_cierre_id', 'tickets', ('cierre_id',)),
+    ('idx_ticket_lines_ticket_id', 'ticket_lines', ('ticket_id',)),
+    ('idx_ticket_lines_sku', 'ticket_lines', ('sku',)),
+    ('idx_ticket_lines_producto_id', 'ticket_lines', ('producto_id',)),
+    ('idx_codigos_barras_ean', 'codigos_barras', ('ean',)),
+    ('idx_codigos_barras_producto_id', 'codigos_barras', ('producto_id',)),
+    ('idx_precios_producto_activo', 'precios', ('producto_id', 'activo')),
+    ('idx_productos_categoria', 'productos', ('categoria',)),
+    ('idx_productos_tipo', 'productos', ('tipo',)),
+    ('idx_productos_proveedor', 'productos', ('proveedor',)),
+    ('idx_productos_categoria_id', 'productos', ('categoria_id',)),
+    ('idx_productos_tipo_id', 'productos', ('tipo_id',)),
+    ('idx_productos_proveedor_id', 'productos', ('proveedor_id',)),
+    ('idx_productos_categoria_orden', 'productos', ('categoria_orden',)),
+    ('idx_productos_tipo_orden', 'productos', ('tipo_orden',)),
+    ('idx_productos_proveedor_orden', 'productos', ('proveedor_orden',)),
+    ('idx_clientes_telefono', 'clientes', ('telefono',)),
+    ('idx_clientes_dni', 'clientes', ('dni',)),
+    ('idx_clientes_telefono_norm', 'clientes', ('telefono_norm',)),
+    ('idx_clientes_dni_norm', 'clientes', ('dni_norm',)),
+    ('idx_cierres_caja_fecha_hora', 'cierres_caja', ('fecha_hora',)),
+)
+
+# Índices de expresión para el orden del catálogo paginado por cursor
+# (dao_articulos.catalog_query usa exactamente estas expresiones; el id va
+# implícito en el índice). (nombre, tabla, columna requerida, expresión)
+INDICES_ORDEN = (
+    ('idx_productos_orden_nombre', 'productos', 'nombre', "COALESCE(nombre, '')"),
+)
+
+# índices que ya no usa ninguna consulta (el orden por id de la maestra se
+# sustituyó por productos.<campo>_orden)
+INDICES_OBSOLETOS = ('idx_productos_orden_categoria', 'idx_productos_orden_proveedor', 'idx_productos_orden_tipo')
+
+
+def ensure_indexes(db_path: Optional[str] = None):
+    """Create the indexes in `INDICES` and `INDICES_ORDEN` if missing (idempotent).
+
+    Drops the ones in `INDICES_OBSOLETOS`.
+
+    Indexes whose table or columns don't exist in this DB are skipped.
+    Returns the list of index names created in this call.
+    """
+    creados = []
+    conn = connect(db_path)
+    cur = conn.cursor()
+    try:
+        cur.execute("SELECT name FROM sqlite_master WHERE type='index'")
+        existentes = {r[0] for r in cur.fetchall()}
+        for nombre in INDICES_OBSOLETOS:
+            if nombre in existentes:
+                cur.execute(f'DROP INDEX IF EXISTS {nombre}')
+        pendientes = [(n, t, c, ', '.join(c)) for n, t, c in INDICES]
+        pendientes += [(n, t, (c,), expr) for n, t, c, expr in INDICES_ORDEN]
+        for nombre, tabla, columnas, definicion in pendientes:
+            if nombre in existentes:
+                continue
+            try:
+                cur.execute(f"PRAGMA table_info({tabla})")
+                cols = [r[1] for r in cur.fetchall()]
+            except Exception:
+                cols = []
+            if not cols or any(c not in cols for c in columnas):
+                continue
+            try:
+                cur.execute(f"CREATE INDEX IF NOT EXISTS {nombre} ON {tabla}({definicion})")
+                creados.append(nombre)
+            except Exception:
+                pass
+        conn.commit()
+    finally:
+        conn.close()
+    return creados
+
+
+# --- Búsqueda de productos (FTS5) ---
+# productos_fts: palabras (unicode61 sin acentos, prefijos) sobre nombre,
+# nombre_boton, sku, EANs, categoría y proveedor; rowid = productos.id.
+# productos_tri: trigramas de sku, EANs y nombre para coincidencias parciales
+# ("fkajs" dentro de un SKU). Los triggers las mantienen al día ante cualquier
+# escritura en productos o codigos_barras.
+FTS_COLUMNAS = ('nombre', 'nombre_boton', 'sku', 'eans', 'categoria', 'proveedor')
+TRI_COLUMNAS = ('sku', 'eans', 'nombre')
+
+
+def _sql_fila_busqueda(columnas, prod_cols, pid: Optional[str] = None):
+    """SELECT con las filas de búsqueda (del producto `pid`, expresión SQL, o de todos)."""
+    exprs = []
+    for c in columnas:
+        if c == 'eans':
+            exprs.append("(SELECT group_concat(ean, ' ') FROM codigos_barras WHERE producto_id = p.id)")
+        elif c in prod_cols:
+            exprs.append(f'p.{c}')
+        else:
+            exprs.append("''")
+    sql = f"SELECT p.id, {', '.join(exprs)} FROM productos p"
+    return sql + (f" WHERE p.id = {pid}" if pid else '')
+
+
+def ensure_busqueda_schema(db_path: Optional[str] = None) -> bool:
+    """Create the FTS5 search tables and their triggers if missing.
+
+    Fills them the first time. Returns False if this SQLite has no FTS5
+    (searches then fall back to LIKE).
+    """
+    conn = connect(db_path)
+    cur = conn.cursor()
+    try:
+        cur.execute("SELECT name FROM sqlite_master WHERE type='table' AND name IN ('productos_fts', 'productos_tri')")
+        existian = {r[0] for r in cur.fetchall()}
+        cur.execute('PRAGMA table_info(productos)')
+        prod_cols = {r[1] for r in cur.fetchall()}
+        if not prod_cols:
+            return False
+        try:
+            cur.execute(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS productos_fts USING fts5({', '.join(FTS_COLUMNAS)}, "
+                "tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')"
+            )
+            cur.execute(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS productos_tri USING fts5({', '.join(TRI_COLUMNAS)}, "
+                "tokenize = 'trigram case_sensitive 0')"
+            )
+        except sqlite3.OperationalError:
+            conn.rollback()
+            return False
+
+        def reindexar(pid):
+            return (
+                f"DELETE FROM productos_fts WHERE rowid = {pid}; "
+                f"INSERT INTO productos_fts(rowid, {', '.join(FTS_COLUMNAS)}) {_sql_fila_busqueda(FTS_COLUMNAS, prod_cols, pid)}; "
+                f"DELETE FROM productos_tri WHERE rowid = {pid}; "
+                f"INSERT INTO productos_tri(rowid, {', '.join(TRI_COLUMNAS)}) {_sql_fila_busqueda(TRI_COLUMNAS, prod_cols, pid)}; "
+            )
+
+        # sólo las columnas indexadas: stock, precios o claves no reescriben la búsqueda
+        indexadas = ['id'] + [c for c in dict.fromkeys(FTS_COLUMNAS + TRI_COLUMNAS) if c in prod_cols and c != 'id']
+        triggers = {
+            'trg_busqueda_productos_ins': f"AFTER INSERT ON productos BEGIN {reindexar('new.id')} END",
+            'trg_busqueda_productos_upd': (
+                f"AFTER UPDATE OF {', '.join(indexadas)} ON productos "
+                f"BEGIN DELETE FROM productos_fts WHERE rowid = old.id; DELETE FROM productos_tri WHERE rowid = old.id; {reindexar('new.id')} END"
+            ),
+            'trg_busqueda_productos_del': "AFTER DELETE ON productos BEGIN DELETE FROM productos_fts WHERE rowid = old.id; DELETE FROM productos_tri WHERE rowid = old.id; END",
+            'trg_busqueda_eans_ins': f"AFTER INSERT ON codigos_barras BEGIN {reindexar('new.producto_id')} END",
+            'trg_busqueda_eans_del': f"AFTER DELETE ON codigos_barras BEGIN {reindexar('old.producto_id')} END",
+        }
+        # versiones anteriores reindexaban en cualquier UPDATE de productos
+        cur.execute("SELECT sql FROM sqlite_master WHERE type='trigger' AND name='trg_busqueda_productos_upd'")
+        r = cur.fetchone()
+        if r and 'UPDATE OF' not in (r[0] or ''):
+            cur.execute('DROP TRIGGER trg_busqueda_productos_upd')
+        for nombre, cuerpo in triggers.items():
+            cur.execute(f'CREATE TRIGGER IF NOT EXISTS {nombre} {cuerpo}')
+        if existian != {'productos_fts', 'productos_tri'}:
+            reconstruir_busqueda(conn)
+        conn.commit()
+        return True
+    finally:
+        conn.close()
+
+
+def reconstruir_busqueda(conn):
+    """Refill both search tables from productos/codigos_barras (caller commits)."""
+    cur = conn.cursor()
+    cur.execute('PRAGMA table_info(productos)')
+    prod_cols = {r[1] for r in cur.fetchall()}
+    cur.execute('DELETE FROM productos_fts')
+    cur.execute('DELETE FROM productos_tri')
+    for tabla, columnas in (('productos_fts', FTS_COLUMNAS), ('productos_tri', TRI_COLUMNAS)):
+        cur.execute(f"INSERT INTO {tabla}(rowid, {', '.join(columnas)}) {_sql_fila_busqueda(columnas, prod_cols)}")
+
+
+def _sql_atributos_producto():
+    """(JOINs, expresión de categoría, expresión de tipo) para leer de `productos p`.
+
+    Con las claves enteras el nombre sale de la maestra (el actual); si no,
+    del texto del producto. Las columnas salen de la caché de esquema.
+    """
+    cols = set(table_columns('productos'))
+    joins, exprs = '', []
+    for campo, tabla, alias in (('categoria', 'categorias', 'cat'), ('tipo', 'tipos', 't')):
+        if campo not in cols:
+            exprs.append('NULL')
+        elif f'{campo}_id' in cols:
+            joins += f' LEFT JOIN {tabla} {alias} ON {alias}.id = p.{campo}_id'
+            exprs.append(f'COALESCE({alias}.nombre, p.{campo})')
+        else:
+            exprs.append(f'p.{campo}')
+    return joins, exprs[0], exprs[1]
+
+
+def atributos_lineas(cur, lineas):
+    """(producto_id, categoria, tipo) de cada línea de un carrito, en una sola consulta.
+
+    Se busca por `id` y, en las líneas sin id entero (descuentos, libres),
+    por `sku`; las que no casan con ningún producto dan (None, None, None).
+    """
+    ids, skus = [], []
+    for ln in lineas or []:
+        try:
+            ids.append(int(ln.get('id')))
+        except (TypeError, ValueError):
+            if ln.get('sku'):
+                skus.append(str(ln.get('sku')))
+    por_id, por_sku = {}, {}
+    if ids or skus:
+        joins, cat, tipo = _sql_atributos_producto()
+        cur.execute(
+            f"SELECT p.id, p.sku, {cat}, {tipo} FROM productos p{joins} "
+            "WHERE p.id IN (SELECT value FROM json_each(?)) OR p.sku IN (SELECT value FROM json_each(?))",
+            (json.dumps(ids), json.dumps(skus)),
+        )
+        for pid, sku, categoria, tipo_p in cur.fetchall():
+            por_id[pid] = (pid, categoria, tipo_p)
+            if sku:
+                por_sku[str(sku)] = (pid, categoria, tipo_p)
+    res = []
+    for ln in lineas or []:
+        try:
+            attrs = por_id.get(int(ln.get('id')))
+        except (TypeError, ValueError):
+            attrs = por_sku.get(str(ln.get('sku'))) if ln.get('sku') else None
+        res.append(attrs or (None, None, None))
+    return res
+
+
+def rellenar_lineas_producto(conn) -> int:
+    """Fill producto_id/categoria/tipo of old ticket_lines by SKU (caller commits).
+
+    Only lines without producto_id are touched; lines whose product no
+    longer exists stay empty. Returns the number of lines filled.
+    """
+    cur = conn.cursor()
+    joins, cat, tipo = _sql_atributos_producto()
+    cur.execute(f'''
+        UPDATE ticket_lines SET producto_id = a.id, categoria = a.categoria, tipo = a.tipo
+        FROM (SELECT p.id, p.sku, {cat} AS categoria, {tipo} AS tipo FROM productos p{joins}) a
+        WHERE ticket_lines.producto_id IS NULL AND ticket_lines.sku IS NOT NULL AND ticket_lines.sku = a.sku
+    ''')
+    return cur.rowcount
+
+
+def agregar_tickets(conn, where: str, params=(), por_lineas: bool = True, por_categoria: bool = False,
+                    por_tipo: bool = False, por_articulo: bool = False, limite_articulos: Optional[int] = None,
+                    por_tickets: bool = True):
+    """Compute every close-out figure for the tickets matching `where`.
+
+    Shared by the X preview, the Z close (`close_day`) and the cierre history.
+    Ticket-level figures (totals, payment methods, cashiers, points, ticket
+    range) come from ONE grouped pass over `tickets`; tax, category, type and
+    article breakdowns from ONE grouped pass over their `ticket_lines`
+    (skipped when `por_lineas` is False; `por_tickets=False` skips the first
+    pass). `where` must refer to unqualified `tickets` columns, e.g.
+    "created_at >= ? AND created_at < ?".
+    """
+    cur = conn.cursor()
+    resumen = {}
+    if por_tickets:
+        resumen = _agregar_cabeceras(cur, where, params)
+    if not por_lineas:
+        return resumen
+    return _agregar_lineas(cur, where, params, resumen, por_categoria, por_tipo, por_articulo, limite_articulos)
+
+
+def _agregar_cabeceras(cur, where, params):
+    # importes sumados en céntimos enteros (total_cent) y pasados a euros al final
+    exacto = 'total_cent' in table_columns('tickets')
+    cur.execute(f'''
+        SELECT forma_pago, cajero, COUNT(*), COALESCE(SUM({'total_cent' if exacto else 'total'}),0),
+               COALESCE(SUM(puntos_ganados),0), COALESCE(SUM(puntos_canjeados),0),
+               MIN(ticket_no), MAX(ticket_no)
+        FROM tickets WHERE {where}
+        GROUP BY forma_pago, cajero
+    ''', tuple(params))
+    resumen = {
+        'tickets_from': None, 'tickets_to': None, 'count_tickets': 0, 'total': 0.0,
+        'total_efectivo': 0.0, 'total_tarjeta': 0.0, 'total_web': 0.0,
+        'puntos_ganados': 0.0, 'puntos_canjeados': 0.0,
+    }
+    formas = {}
+    cajeros = {}
+    importes = dict.fromkeys(('total', 'total_efectivo', 'total_tarjeta', 'total_web'), 0)
+    for forma, cajero, n, total, pg, pc, no_min, no_max in cur.fetchall():
+        total = int(total or 0) if exacto else centimos(total)
+        resumen['count_tickets'] += n
+        importes['total'] += total
+        resumen['puntos_ganados'] += float(pg or 0.0)
+        resumen['puntos_canjeados'] += float(pc or 0.0)
+        if no_min is not None and (resumen['tickets_from'] is None or no_min < resumen['tickets_from']):
+            resumen['tickets_from'] = no_min
+        if no_max is not None and (resumen['tickets_to'] is None or no_max > resumen['tickets_to']):
+            resumen['tickets_to'] = no_max
+        key = (forma or '').upper()
+        if key in ('EFECTIVO', 'TARJETA', 'WEB'):
+            importes['total_' + key.lower()] += total
+        f = formas.setdefault(forma or '', {'forma': forma or '', 'count': 0, 'total': 0})
+        f['count'] += n
+        f['total'] += total
+        c = cajeros.setdefault(cajero or 'N/D', {'cajero': cajero or 'N/D', 'count': 0, 'total': 0})
+        c['count'] += n
+        c['total'] += total
+    for clave, cent in importes.items():
+        resumen[clave] = a_euros(cent)
+    for e in list(formas.values()) + list(cajeros.values()):
+        e['total'] = a_euros(e['total'])
+    resumen['por_forma_pago'] = list(formas.values())
+    resumen['por_cajero'] = list(cajeros.values())
+    return resumen
+
+
+def _agregar_lineas(cur, where, params, resumen, por_categoria, por_tipo, por_articulo, limite_articulos):
+    cols = table_columns('ticket_lines')
+    snapshot = 'producto_id' in cols
+    exacto = 'precio_cent' in cols
+    join = ''
+    if snapshot:
+        # categoría/tipo guardados con la línea: ni JOIN con productos ni
+        # desgloses que cambien al renombrar o borrar un producto
+        con_producto, cat_col, tipo_col = 'tl.producto_id IS NOT NULL', 'tl.categoria', 'tl.tipo'
+        articulo = 'COALESCE(tl.producto_id, tl.nombre)'
+    else:
+        con_producto, cat_col, tipo_col, articulo = '0', "''", "''", 'tl.nombre'
+        if por_categoria or por_tipo:
+            join = 'LEFT JOIN productos p ON tl.sku = p.sku'
+            con_producto, cat_col, tipo_col = 'p.id IS NOT NULL', 'p.categoria', 'p.tipo'
+    select = ['tl.iva', con_producto if (por_categoria or por_tipo) else '0']
+    group = ['tl.iva']
+    for flag, col in ((por_categoria, cat_col), (por_tipo, tipo_col), (por_articulo, articulo)):
+        select.append(f"COALESCE({col}, '')" if flag else "''")
+        if flag:
+            group.append(col)
+    if por_categoria or por_tipo:
+        group.append(con_producto)
+    # MAX(tl.id) hace que tl.nombre sea el de la venta más reciente del artículo
+    cur.execute(f'''
+        SELECT {', '.join(select)}, SUM(tl.cantidad), COALESCE(SUM(tl.cantidad * {'tl.precio_cent' if exacto else 'tl.precio'}),0), MAX(tl.id), tl.nombre
+        FROM ticket_lines tl {join}
+        WHERE tl.ticket_id IN (SELECT id FROM tickets WHERE {where})
+        GROUP BY {', '.join(group)}
+    ''', tuple(params))
+    impuestos = {}
+    categorias = {}
+    tipos = {}
+    articulos = {}
+
+    def _acumular(d, key, campo, qty, total):
+        e = d.setdefault(key, {campo: key, 'qty': 0, 'total': 0})
+        e['qty'] += qty or 0
+        e['total'] += total
+
+    ultima_linea = {}
+    for iva, con_producto, categoria, tipo_p, articulo, qty, total, max_id, nombre in cur.fetchall():
+        # céntimos enteros (cantidades fraccionarias: al céntimo más próximo)
+        total = int(round(total or 0)) if exacto else centimos(total)
+        iva_f = float(iva or 0.0)
+        impuestos[iva_f] = impuestos.get(iva_f, 0) + total
+        if con_producto:
+            if por_categoria:
+                _acumular(categorias, categoria, 'categoria', qty, total)
+            if por_tipo:
+                _acumular(tipos, tipo_p, 'tipo', qty, total)
+        if por_articulo:
+            _acumular(articulos, articulo, 'nombre', qty, total)
+            if (max_id or 0) >= ultima_linea.get(articulo, -1):
+                ultima_linea[articulo] = max_id or 0
+                articulos[articulo]['nombre'] = nombre or ''
+            articulos[articulo]['producto_id'] = articulo if (snapshot and isinstance(articulo, int)) else None
+
+    resumen['impuestos'] = []
+    for iva_f, subtotal in impuestos.items():
+        base, cuota = desglose_iva(subtotal, iva_f)
+        resumen['impuestos'].append({'iva': iva_f, 'base': a_euros(base), 'cuota': a_euros(cuota), 'total': a_euros(subtotal)})
+    for d in (categorias, tipos, articulos):
+        for e in d.values():
+            e['total'] = a_euros(e['total'])
+    if por_categoria:
+        resumen['por_categoria'] = list(categorias.values())
+    if por_tipo:
+        resumen['por_tipo'] = list(tipos.values())
+    if por_articulo:
+        top = sorted(articulos.values(), key=lambda a: a['qty'], reverse=True)
+        resumen['por_articulo'] = top[:limite_articulos] if limite_articulos else top
+    return resumen
+
+
+# Acumulador del turno abierto: los tickets sin cierre Z (`TURNO_ABIERTO`,
+# la misma definición que usa el cierre Z). Filas por dimensión: 'total'
+# (con puntos y rango de tickets), 'forma_pago', 'cajero' e 'iva' (subtotal
+# de líneas), con los importes en céntimos enteros. Se actualiza en la misma
+# transacción que guarda el ticket y el cierre Z lo vacía.
+TURNO_ABIERTO = 'cierre_id IS NULL'
+
+_SQL_TURNO_UPSERT = '''
+    INSERT INTO turno_actual (dimension, clave, num, total_cent, puntos_ganados, puntos_canjeados, ticket_min, ticket_max)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT(dimension, clave) DO UPDATE SET
+        num = num + excluded.num,
+        total_cent = total_cent + excluded.total_cent,
+        puntos_ganados = puntos_ganados + excluded.puntos_ganados,
+        puntos_canjeados = puntos_canjeados + excluded.puntos_canjeados,
+        ticket_min = MIN(COALESCE(ticket_min, excluded.ticket_min), COALESCE(excluded.ticket_min, ticket_min)),
+        ticket_max = MAX(COALESCE(ticket_max, excluded.ticket_max), COALESCE(excluded.ticket_max, ticket_max))
+'''
+
+
+def ensure_turno_schema(db_path: Optional[str] = None):
+    """Create `turno_actual` if missing and fill it from the open shift's tickets.
+
+    The table is only a cache of the open tickets: an older one (total in
+    euros, REAL) is dropped and rebuilt in cents.
+    """
+    conn = connect(db_path)
+    cur = conn.cursor()
+    try:
+        cur.execute('PRAGMA table_info(turno_actual)')
+        cols = {r[1] for r in cur.fetchall()}
+        if cols and 'total_cent' not in cols:
+            cur.execute('DROP TABLE turno_actual')
+            cols = set()
+        existia = bool(cols)
+        cur.execute('''
+            CREATE TABLE IF NOT EXISTS turno_actual (
+                dimension TEXT NOT NULL,
+                clave TEXT NOT NULL DEFAULT '',
+                num INTEGER DEFAULT 0,
+                total_cent INTEGER DEFAULT 0,
+                puntos_ganados REAL DEFAULT 0,
+                puntos_canjeados REAL DEFAULT 0,
+                ticket_min INTEGER,
+                ticket_max INTEGER,
+                PRIMARY KEY (dimension, clave)
+            )
+        ''')
+        if not existia:
+            try:
+                reconstruir_turno(conn)
+            except sqlite3.Error:
+                # esquema de tickets antiguo: queda vacío y se usa agregar_tickets
+                pass
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def acumular_turno(cur, ticket: dict, lineas):
+    """Add one saved ticket to `turno_actual` (call inside the ticket transaction)."""
+    total = ticket['total_cent'] if ticket.get('total_cent') is not None else centimos(ticket.get('total'))
+    no = ticket.get('ticket_no')
+    filas = [
+        ('total', '', 1, total, float(ticket.get('puntos_ganados') or 0), float(ticket.get('puntos_canjeados') or 0), no, no),
+        ('forma_pago', ticket.get('forma_pago') or '', 1, total, 0, 0, None, None),
+        ('cajero', ticket.get('cajero') or '', 1, total, 0, 0, None, None),
+    ]
+    por_iva = {}
+    for ln in lineas or []:
+        iva = str(float(ln.get('iva') or 0.0))
+        n, sub = por_iva.get(iva, (0, 0))
+        precio = ln['precio_cent'] if ln.get('precio_cent') is not None else centimos(ln.get('precio'))
+        por_iva[iva] = (n + 1, sub + int(round(float(ln.get('cantidad') or 0) * precio)))
+    for iva, (n, sub) in por_iva.items():
+        filas.append(('iva', iva, n, sub, 0, 0, None, None))
+    cur.executemany(_SQL_TURNO_UPSERT, filas)
+
+
+def reiniciar_turno(cur):
+    """Empty the accumulator (Z close / ticket wipe)."""
+    cur.execute('DELETE FROM turno_actual')
+
+
+def reconstruir_turno(conn):
+    """Rebuild `turno_actual` from the open tickets (`TURNO_ABIERTO`); empty if there are none."""
+    cur = conn.cursor()
+    reiniciar_turno(cur)
+    cur.execute(f'SELECT 1 FROM tickets WHERE {TURNO_ABIERTO} LIMIT 1')
+    if cur.fetchone() is None:
+        return
+    agr = agregar_tickets(conn, TURNO_ABIERTO, ())
+    cur.executemany(_SQL_TURNO_UPSERT, [f[:3] + (centimos(f[3]),) + f[4:] for f in _filas_resumen(agr)])
+
+
+def _filas_resumen(agr):
+    """Rows (dimension, clave, num, total, puntos_ganados, puntos_canjeados, ticket_min, ticket_max)
+    for an `agregar_tickets` result: 'total', 'forma_pago', 'cajero', 'iva' and, when
+    present, 'categoria'/'tipo' (num = units)."""
+    filas = [('total', '', agr['count_tickets'], agr['total'], agr['puntos_ganados'], agr['puntos_canjeados'],
+              agr['tickets_from'], agr['tickets_to'])]
+    for f in agr.get('por_forma_pago', []):
+        filas.append(('forma_pago', f['forma'], f['count'], f['total'], 0, 0, None, None))
+    for c in agr.get('por_cajero', []):
+        filas.append(('cajero', '' if c['cajero'] == 'N/D' else c['cajero'], c['count'], c['total'], 0, 0, None, None))
+    for imp in agr.get('impuestos', []):
+        filas.append(('iva', str(float(imp['iva'])), 0, imp['total'], 0, 0, None, None))
+    for dimension in ('categoria', 'tipo'):
+        for d in agr.get('por_' + dimension, []):
+            filas.append((dimension, d[dimension] or '', d['qty'], d['total'], 0, 0, None, None))
+    return filas
+
+
+def _resumen_desde_filas(filas):
+    """Inverse of `_filas_resumen`: same keys as `agregar_tickets` (None without a 'total' row)."""
+    totales = [f for f in filas if f[0] == 'total']
+    if not totales:
+        return None
+    _, _, num, total, pg, pc, tmin, tmax = totales[0]
+    # las sumas REAL se devuelven al céntimo
+    resumen = {
+        'tickets_from': tmin, 'tickets_to': tmax, 'count_tickets': int(num or 0), 'total': a_euros(centimos(total)),
+        'total_efectivo': 0.0, 'total_tarjeta': 0.0, 'total_web': 0.0,
+        'puntos_ganados': float(pg or 0.0), 'puntos_canjeados': float(pc or 0.0),
+        'por_forma_pago': [], 'por_cajero': [], 'impuestos': [],
+    }
+    for dimension, clave, num, total, *_ in filas:
+        total_cent = centimos(total)
+        total = a_euros(total_cent)
+        if dimension == 'forma_pago':
+            resumen['por_forma_pago'].append({'forma': clave, 'count': num, 'total': total})
+            key = (clave or '').upper()
+            if key in ('EFECTIVO', 'TARJETA', 'WEB'):
+                resumen['total_' + key.lower()] = a_euros(centimos(resumen['total_' + key.lower()]) + total_cent)
+        elif dimension == 'cajero':
+            resumen['por_cajero'].append({'cajero': clave or 'N/D', 'count': num, 'total': total})
+        elif dimension == 'iva':
+            iva_f = float(clave or 0.0)
+            base, cuota = desglose_iva(total_cent, iva_f)
+            resumen['impuestos'].append({'iva': iva_f, 'base': a_euros(base), 'cuota': a_euros(cuota), 'total': total})
+        elif dimension in ('categoria', 'tipo'):
+            resumen.setdefault('por_' + dimension, []).append({dimension: clave, 'qty': num, 'total': total})
+    return resumen
+
+
+def leer_turno(conn):
+    """Return the open shift's figures from `turno_actual` (same keys as `agregar_tickets`).
+
+    Returns None when the accumulator is missing or empty; callers then fall
+    back to `reconstruir_turno`/`agregar_tickets`.
+    """
+    cur = conn.cursor()
+    cur.execute('SELECT dimension, clave, num, total_cent, puntos_ganados, puntos_canjeados, ticket_min, ticket_max FROM turno_actual')
+    return _resumen_desde_filas([f[:3] + (a_euros(f[3] or 0),) + f[4:] for f in cur.fetchall()])
+
+
+# Resumen diario de ventas: lo escribe cada cierre Z (`close_day`) con las
+# cifras de sus tickets, una fila por cierre × dimensión × clave (mismas
+# dimensiones que turno_actual más 'categoria' y 'tipo'); los artículos van
+# en ventas_dia_articulos. Los informes por días, meses o años y el histórico
+# suman estas filas en lugar de recorrer ticket_lines.
+_SQL_VENTAS_DIA = '''
+    INSERT INTO ventas_dia (fecha, cierre_id, dimension, clave, num, total, puntos_ganados, puntos_canjeados, ticket_min, ticket_max)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+'''
+
+
+def ensure_ventas_dia_schema(db_path: Optional[str] = None):
+    """Create the daily rollup tables if missing and fill them from the closed tickets."""
+    conn = connect(db_path)
+    cur = conn.cursor()
+    try:
+        cur.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='ventas_dia'")
+        existia = cur.fetchone() is not None
+        cur.execute('''
+            CREATE TABLE IF NOT EXISTS ventas_dia (
+                fecha TEXT NOT NULL,
+                cierre_id INTEGER NOT NULL,
+                dimension TEXT NOT NULL,
+                clave TEXT NOT NULL DEFAULT '',
+                num REAL DEFAULT 0,
+                total REAL DEFAULT 0.0,
+                puntos_ganados REAL DEFAULT 0,
+                puntos_canjeados REAL DEFAULT 0,
+                ticket_min INTEGER,
+                ticket_max INTEGER,
+                PRIMARY KEY (cierre_id, dimension, clave)
+            )
+        ''')
+        cur.execute('''
+            CREATE TABLE IF NOT EXISTS ventas_dia_articulos (
+                fecha TEXT NOT NULL,
+                cierre_id INTEGER NOT NULL,
+                clave TEXT NOT NULL,
+                producto_id INTEGER,
+                nombre TEXT,
+                qty REAL DEFAULT 0,
+                total REAL DEFAULT 0.0,
+                PRIMARY KEY (cierre_id, clave)
+            )
+        ''')
+        cur.execute('CREATE INDEX IF NOT EXISTS idx_ventas_dia_fecha ON ventas_dia(fecha)')
+        cur.execute('CREATE INDEX IF NOT EXISTS idx_ventas_dia_articulos_fecha ON ventas_dia_articulos(fecha)')
+        if not existia:
+            try:
+                reconstruir_ventas_dia(conn)
+            except sqlite3.Error:
+                # esquema de tickets antiguo: se rellena con scripts/migracion_ventas_dia.py
+                pass
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def guardar_ventas_dia(cur, fecha: str, cierre_id: int, agregados: dict):
+    """Write the rollup rows of one Z close (call inside the close transaction).
+
+    `agregados` must come from `agregar_tickets` with categories, types and
+    articles. Rewrites any rows already stored for `cierre_id`.
+    """
+    cur.execute('DELETE FROM ventas_dia WHERE cierre_id=?', (cierre_id,))
+    cur.execute('DELETE FROM ventas_dia_articulos WHERE cierre_id=?', (cierre_id,))
+    cur.executemany(_SQL_VENTAS_DIA, [(fecha, cierre_id) + f for f in _filas_resumen(agregados)])
+    cur.executemany(
+        'INSERT INTO ventas_dia_articulos (fecha, cierre_id, clave, producto_id, nombre, qty, total) VALUES (?, ?, ?, ?, ?, ?, ?)',
+        [
+            (fecha, cierre_id, str(a['producto_id']) if a.get('producto_id') is not None else 'n:' + (a['nombre'] or ''),
+             a.get('producto_id'), a['nombre'], a['qty'], a['total'])
+            for a in agregados.get('por_articulo', [])
+        ],
+    )
+
+
+def leer_ventas_dia(conn, where: str, params=(), limite_articulos: Optional[int] = None):
+    """Sum the daily rollup rows matching `where` (same keys as `agregar_tickets`).
+
+    `where` refers to `fecha` and/or `cierre_id`, e.g. "fecha >= ? AND fecha <= ?".
+    Includes por_categoria, por_tipo and por_articulo (by units, optionally
+    limited). Returns None when there are no rows (day not closed with Z).
+    """
+    cur = conn.cursor()
+    cur.execute(f'''
+        SELECT dimension, clave, SUM(num), SUM(total), SUM(puntos_ganados), SUM(puntos_canjeados), MIN(ticket_min), MAX(ticket_max)
+        FROM ventas_dia WHERE {where}
+        GROUP BY dimension, clave
+    ''', tuple(params))
+    resumen = _resumen_desde_filas(cur.fetchall())
+    if resumen is None:
+        return None
+    resumen.setdefault('por_categoria', [])
+    resumen.setdefault('por_tipo', [])
+    # MAX(cierre_id) hace que nombre sea el del cierre más reciente
+    cur.execute(f'''
+        SELECT producto_id, nombre, SUM(qty), SUM(total), MAX(cierre_id)
+        FROM ventas_dia_articulos WHERE {where}
+        GROUP BY clave
+        ORDER BY SUM(qty) DESC
+    ''' + (f' LIMIT {int(limite_articulos)}' if limite_articulos else ''), tuple(params))
+    resumen['por_articulo'] = [
+        {'nombre': nombre or '', 'producto_id': pid, 'qty': qty or 0, 'total': a_euros(centimos(total))}
+        for pid, nombre, qty, total, _ in cur.fetchall()
+    ]
+    return resumen
+
+
+def reconstruir_ventas_dia(conn) -> int:
+    """Rebuild the rollup from the tickets of every Z close (caller commits).
+
+    The day of each close is the day of its tickets. Returns the number of
+    closes written.
+    """
+    cur = conn.cursor()
+    cur.execute('DELETE FROM ventas_dia')
+    cur.execute('DELETE FROM ventas_dia_articulos')
+    cur.execute('SELECT cierre_id, substr(MIN(created_at), 1, 10) FROM tickets WHERE cierre_id IS NOT NULL GROUP BY cierre_id')
+    cierres = cur.fetchall()
+    for cierre_id, fecha in cierres:
+        agregados = agregar_tickets(conn, 'cierre_id = ?', (cierre_id,), por_categoria=True, por_tipo=True, por_articulo=True)
+        guardar_ventas_dia(cur, fecha, cierre_id, agregados)
+    return len(cierres)
 
 
 def close_day(fecha=None, tipo='Z', include_category=False, include_products=False, cajero=None, notas=None):
@@ -262,30 +1459,29 @@ def close_day(fecha=None, tipo='Z', include_category=False, include_products=Fal
     conn = connect()
     cur = conn.cursor()
     try:
-        # 1. Definir qué tickets entran en el cierre
-        ticket_where = "date(created_at)=? AND (cierre_id IS NULL)" if tipo == 'Z' else "date(created_at)=?"
-
-        # 2. Cálculos económicos básicos
-        cur.execute(f"SELECT COUNT(*), COALESCE(SUM(total),0) FROM tickets WHERE {ticket_where}", (fecha,))
-        num_ventas, total_ingresos = cur.fetchone()
-
-        # 3. Desglose por forma de pago (Lógica Blindada)
-        val_efectivo = 0.0; val_tarjeta = 0.0; val_web = 0.0
-        cur.execute(f"SELECT forma_pago, SUM(total) FROM tickets WHERE {ticket_where} GROUP BY forma_pago", (fecha,))
-        for forma, total in cur.fetchall():
-            f = (forma or "").upper()
-            if f == 'EFECTIVO':
-                val_efectivo = float(total or 0)
-            elif f == 'TARJETA':
-                val_tarjeta = float(total or 0)
-            elif f == 'WEB':
-                val_web = float(total or 0)
-
-        # 4. Cálculo de Fidelización
-        cur.execute(f"SELECT COALESCE(SUM(puntos_ganados),0), COALESCE(SUM(puntos_canjeados),0) FROM tickets WHERE {ticket_where}", (fecha,))
-        pts_ganados, pts_canjeados = cur.fetchone()
-
-        # 5. GUARDADO REAL EN LA BASE DE DATOS (Asegurar que todas las columnas reciban su variable)
+        # 1. Definir qué tickets entran en el cierre: el X es el informe del
+        #    día; el Z cierra el turno abierto (todos los tickets sin cierre
+        #    hasta el final de `fecha`, también los de días anteriores)
+        if tipo == 'Z':
+            ticket_where = f"{TURNO_ABIERTO} AND created_at < ?"
+            rango = rango_dia(fecha)[1:]
+        else:
+            ticket_where = "created_at >= ? AND created_at < ?"
+            rango = rango_dia(fecha)
+
+        # 2. Todas las cifras del cierre en una pasada (ver agregar_tickets);
+        #    el Z siempre calcula los desgloses porque van al resumen diario
+        agregados = agregar_tickets(conn, ticket_where, rango, por_categoria=include_category or tipo == 'Z',
+                                    por_tipo=include_category or tipo == 'Z', por_articulo=include_products or tipo == 'Z')
+        num_ventas = agregados['count_tickets']
+        total_ingresos = agregados['total']
+        val_efectivo = agregados['total_efectivo']
+        val_tarjeta = agregados['total_tarjeta']
+        val_web = agregados['total_web']
+        pts_ganados = agregados['puntos_ganados']
+        pts_canjeados = agregados['puntos_canjeados']
+
+        # 3. GUARDADO REAL EN LA BASE DE DATOS (Asegurar que todas las columnas reciban su variable)
         ahora = datetime.now().isoformat()
         cur.execute('''
             INSERT INTO cierres_caja 
@@ -295,18 +1491,37 @@ def close_day(fecha=None, tipo='Z', include_category=False, include_products=Fal
         
         cierre_id = cur.lastrowid
 
-        # 6. Marcar tickets como cerrados si es tipo Z
+        # 4. Marcar tickets como cerrados si es tipo Z y abrir turno nuevo
+        #    (el registro de cierres_caja queda como foto del turno cerrado)
         if tipo == 'Z':
-            cur.execute(f"UPDATE tickets SET cierre_id=? WHERE {ticket_where}", (cierre_id, fecha))
+            cur.execute(f"UPDATE tickets SET cierre_id=? WHERE {ticket_where}", (cierre_id,) + rango)
+            try:
+                # vacío, salvo tickets posteriores a `fecha` que siguen abiertos
+                reconstruir_turno(conn)
+            except sqlite3.OperationalError:
+                # BD sin turno_actual (no se ha ejecutado bootstrap_schema)
+                pass
+            try:
+                guardar_ventas_dia(cur, fecha, cierre_id, agregados)
+            except sqlite3.OperationalError:
+                # BD sin ventas_dia: scripts/migracion_ventas_dia.py lo rellena después
+                pass
         
         conn.commit()
         
         # Devolver el resumen para que la UI lo pinte (usando las mismas variables que acabamos de guardar)
-        return {
+        resumen = dict(agregados)
+        if not include_category:
+            resumen.pop('por_categoria', None)
+            resumen.pop('por_tipo', None)
+        if not include_products:
+            resumen.pop('por_articulo', None)
+        resumen.update({
             "numero": cierre_id, "fecha": fecha, "total": total_ingresos, "count_tickets": num_ventas,
             "total_efectivo": val_efectivo, "total_tarjeta": val_tarjeta, "total_web": val_web,
             "puntos_ganados": pts_ganados, "puntos_canjeados": pts_canjeados, "cierre_id": cierre_id
-        }
+        })
+        return resumen
     finally:
         conn.close()
 
@@ -0,0 +1,133 @@
+"""Importes en céntimos enteros.
+
+Los precios y totales llegan como float o texto ('12.10', '12,10') y se
+pasan a céntimos una sola vez con `centimos()`; a partir de ahí se suman y
+multiplican enteros, así que los totales, el desglose de IVA y los cierres
+cuadran al céntimo sin redondeos repetidos. `Dinero` envuelve esos enteros
+(el carrito lleva con él sus totales por tipo de IVA y el ticket su total);
+`a_euros()` vuelve a float para mostrar o para las columnas REAL de siempre.
+
+En la base de datos, `tickets.total_cent` y `ticket_lines.precio_cent`
+(ver `database.ensure_centimos_schema`) guardan los mismos importes en
+céntimos.
+"""
+from decimal import Decimal, ROUND_HALF_UP, InvalidOperation
+from functools import total_ordering
+from typing import Dict, Tuple, Union
+
+# tipos de IVA habituales: 100 * (100 + tipo), el divisor del desglose en
+# céntimos; otros tipos se calculan y se guardan aquí la primera vez
+TABLA_IVA: Dict[float, int] = {t: 100 * (100 + t) for t in (0.0, 4.0, 10.0, 21.0)}
+
+
+def centimos(valor) -> int:
+    """Céntimos enteros de un importe en euros (float, int, texto, Dinero o None).
+
+    Redondea medio céntimo hacia arriba sobre el valor decimal escrito
+    (`2.675` -> 268), no sobre su representación binaria. Lo que no es un
+    importe (texto inválido, nan, inf) vale 0.
+    """
+    if valor is None or valor == '':
+        return 0
+    if isinstance(valor, Dinero):
+        return valor.centimos
+    if isinstance(valor, int):
+        return valor * 100
+    try:
+        d = Decimal(str(valor).strip().replace(',', '.'))
+        return int((d * 100).quantize(Decimal(1), rounding=ROUND_HALF_UP))
+    except (InvalidOperation, ValueError, OverflowError):
+        return 0
+
+
+def a_euros(cent: int) -> float:
+    return cent / 100
+
+
+def _div_redondeo(num: int, den: int) -> int:
+    """num / den redondeado al entero más próximo (medio hacia fuera del cero)."""
+    q, r = divmod(abs(num), den)
+    if 2 * r >= den:
+        q += 1
+    return q if num >= 0 else -q
+
+
+def desglose_iva(total_cent: int, tipo) -> Tuple[int, int]:
+    """(base, cuota) en céntimos de un importe IVA incluido; base + cuota == total."""
+    try:
+        tipo_f = float(tipo or 0.0)
+    except (TypeError, ValueError):
+        tipo_f = 0.0
+    divisor = TABLA_IVA.get(tipo_f)
+    if divisor is None:
+        divisor = TABLA_IVA[tipo_f] = int(round(100 * (100 + tipo_f)))
+    if divisor <= 0:
+        return total_cent, 0
+    base = _div_redondeo(total_cent * 10000, divisor)
+    return base, total_cent - base
+
+
+@total_ordering
+class Dinero:
+    """Importe en céntimos enteros."""
+
+    __slots__ = ('centimos',)
+
+    def __init__(self, cent: int = 0):
+        self.centimos = int(cent)
+
+    @classmethod
+    def de_euros(cls, valor) -> 'Dinero':
+        return cls(centimos(valor))
+
+    def euros(self) -> float:
+        return a_euros(self.centimos)
+
+    def desglose(self, tipo) -> Tuple['Dinero', 'Dinero']:
+        base, cuota = desglose_iva(self.centimos, tipo)
+        return Dinero(base), Dinero(cuota)
+
+    def __add__(self, otro: 'Dinero') -> 'Dinero':
+        if not isinstance(otro, Dinero):
+            return NotImplemented
+        return Dinero(self.centimos + otro.centimos)
+
+    def __sub__(self, otro: 'Dinero') -> 'Dinero':
+        if not isinstance(otro, Dinero):
+            return NotImplemented
+        return Dinero(self.centimos - otro.centimos)
+
+    def __mul__(self, cantidad: Union[int, float]) -> 'Dinero':
+        if isinstance(cantidad, int):
+            return Dinero(self.centimos * cantidad)
+        return Dinero(_div_redondeo(centimos(cantidad) * self.centimos, 100))
+
+    __rmul__ = __mul__
+
+    def __neg__(self) -> 'Dinero':
+        return Dinero(-self.centimos)
+
+    def __eq__(self, otro) -> bool:
+        return isinstance(otro, Dinero) and self.centimos == otro.centimos
+
+    def __lt__(self, otro: 'Dinero') -> bool:
+        if not isinstance(otro, Dinero):
+            return NotImplemented
+        return self.centimos < otro.centimos
+
+    def __hash__(self):
+        return hash(self.centimos)
+
+    def __bool__(self):
+        return self.centimos != 0
+
+    def __float__(self):
+        return self.euros()
+
+    def __str__(self):
+        signo = '-' if self.centimos < 0 else ''
+        e, c = divmod(abs(self.centimos), 100)
+        return f'{signo}{e}.{c:02d}'
+
+    def __repr__(self):
+        return f'Dinero({self.centimos})'
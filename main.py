@@ -1,7 +1,15 @@
+import sys
+
+# --profile-startup: cronometrar imports y pasos del arranque desde aquí
+from modulos.perfil_arranque import perfil
+if '--profile-startup' in sys.argv:
+    perfil.activar()
+
 import customtkinter as ctk
 import os
-import sys
+import importlib
 import logging
+import threading
 import tkinter.messagebox as messagebox
 
 try:
@@ -15,16 +23,58 @@ logging.basicConfig(filename=LOG_FILE, level=logging.INFO,
 logging.info("Arrancando KOOL_TPV - PID: %s", os.getpid())
 print("Arrancando KOOL_TPV - PID:", os.getpid())
 
-from modulos.inicio.ui_inicio import PantallaInicio
-from modulos.tpv.ui_ventas import CajaVentas
-from modulos.almacen.ui_almacen import PantallaGestionArticulos
-from modulos.almacen.articulos.ui_crear_producto import PantallaCrearProducto
-from modulos.almacen.articulos.todos_articulos import TodosArticulos
-from modulos.clientes.ui_gestion_clientes import GestionClientesView
-from modulos.configuracion.ui_config_fidelizacion import UIConfigFidelizacion as ConfigFidelizacionView
-# Gestión de usuarios
-from modulos.configuracion.ui_gestion_usuarios import GestionUsuariosView as UIGestionUsuarios
-from modulos.tpv.ui_historico_cierres import HistoricoCierresView
+# Crear/migrar el esquema una sola vez y cachear columnas (database.product_schema)
+try:
+    import database
+    with perfil.paso('esquema de la base de datos'):
+        database.bootstrap_schema()
+except Exception:
+    logging.exception("No se pudo inicializar el esquema de la base de datos")
+
+# Índice de códigos del escáner: se carga en segundo plano, mientras tanto
+# ProductoService.buscar_por_codigo consulta la BD directamente
+try:
+    from modulos.almacen.indice_codigos import indice_codigos
+    indice_codigos.cargar_en_segundo_plano()
+except Exception:
+    logging.exception("No se pudo cargar el índice de códigos")
+
+# Botones del selector SIN CÓDIGO por categoría/tipo, también en segundo plano
+try:
+    from modulos.almacen.indice_botones import indice_botones
+    indice_botones.cargar_en_segundo_plano()
+except Exception:
+    logging.exception("No se pudo cargar el índice de botones")
+
+from modulos.gestor_pantallas import GestorPantallas
+
+# Pantallas por nombre: (módulo, clase). El módulo se importa la primera vez
+# que se muestra la pantalla (ver _clase), no al arrancar.
+PANTALLAS = {
+    'inicio': ('modulos.inicio.ui_inicio', 'PantallaInicio'),
+    'ventas': ('modulos.tpv.ui_ventas', 'CajaVentas'),
+    'almacen_antiguo': ('modulos.almacen.ui_almacen', 'PantallaGestionArticulos'),
+    'crear_producto': ('modulos.almacen.articulos.ui_crear_producto', 'PantallaCrearProducto'),
+    'todos_articulos': ('modulos.almacen.articulos.todos_articulos', 'TodosArticulos'),
+    'gestion_clientes': ('modulos.clientes.ui_gestion_clientes', 'GestionClientesView'),
+    'config_fidelizacion': ('modulos.configuracion.ui_config_fidelizacion', 'UIConfigFidelizacion'),
+    'gestion_usuarios': ('modulos.configuracion.ui_gestion_usuarios', 'GestionUsuariosView'),
+    'historico_cierres': ('modulos.tpv.ui_historico_cierres', 'HistoricoCierresView'),
+    'tickets': ('modulos.tpv.ui_tickets', 'TicketsView'),
+    'cierre_caja': ('modulos.tpv.ui_cierre_caja', 'CierreCajaView'),
+    'mantenimiento': ('modulos.configuracion.reiniciar.ui_mantenimiento', 'UIMantenimiento'),
+}
+
+# la caja se importa en segundo plano este tiempo después de abrir la ventana
+PRECARGA_CAJA_MS = 1500
+
+
+def _clase(nombre):
+    modulo, clase = PANTALLAS[nombre]
+    if modulo in sys.modules:
+        return getattr(sys.modules[modulo], clase)
+    with perfil.paso(f'import {modulo}'):
+        return getattr(importlib.import_module(modulo), clase)
 
 ctk.set_appearance_mode("dark")
 ctk.set_default_color_theme("blue")
@@ -43,12 +93,41 @@ class AppTPV(ctk.CTk):
 
         self.container = ctk.CTkFrame(self)
         self.container.pack(side="top", fill="both", expand=True)
+        # pantallas que se conservan entre navegaciones (inicio y caja nunca se liberan)
+        self.pantallas = GestorPantallas(self.container, fijas=('inicio', 'ventas'))
 
         self.mostrar_inicio()
+        # con la ventana ya en pantalla, adelantar el import de la caja
+        self.after(PRECARGA_CAJA_MS, self._precargar_caja)
+
+    def _mostrar(self, nombre, *args, cachear=True, **kwargs):
+        """Muestra la pantalla registrada `nombre`; `args` van al constructor, `kwargs` a on_show."""
+        def crear():
+            clase = _clase(nombre)
+            with perfil.paso(f'crear {nombre}'):
+                return clase(self.container, self, *args)
+        return self.pantallas.mostrar(nombre, crear, cachear=cachear, **kwargs)
+
+    def _precargar_caja(self):
+        modulo = PANTALLAS['ventas'][0]
+        if modulo in sys.modules:
+            return
+
+        def importar():
+            try:
+                importlib.import_module(modulo)
+            except Exception:
+                logging.exception('No se pudo precargar %s', modulo)
+        threading.Thread(target=importar, name='precarga-caja', daemon=True).start()
 
     def limpiar_container(self):
-        for widget in self.container.winfo_children():
-            widget.destroy()
+        """Destruye todas las pantallas, también las conservadas en caché."""
+        self.pantallas.vaciar()
+
+    def _pantalla_inicio(self):
+        """La PantallaInicio visible, o None."""
+        actual = self.pantallas.actual
+        return actual if isinstance(actual, _clase('inicio')) else None
 
     def _get_current_user(self):
         """Return the currently identified user (prefer `usuario_actual` then `cajero_activo`)."""
@@ -123,24 +202,21 @@ class AppTPV(ctk.CTk):
             self.config_desbloqueado = False
         except Exception:
             pass
-        self.limpiar_container()
-        PantallaInicio(self.container, self)
+        self._mostrar('inicio')
 
     def mostrar_ventas(self):
         try:
             self.config_desbloqueado = False
         except Exception:
             pass
-        self.limpiar_container()
-        CajaVentas(self.container, self)
+        self._mostrar('ventas')
 
     def mostrar_crear_producto(self, producto_id=None):
         try:
             self.config_desbloqueado = False
         except Exception:
             pass
-        self.limpiar_container()
-        PantallaCrearProducto(self.container, self, producto_id)
+        self._mostrar('crear_producto', producto_id, cachear=False)
 
     def mostrar_todos_articulos(self, categoria=None):
         self.ultima_categoria_seleccionada = categoria
@@ -148,8 +224,7 @@ class AppTPV(ctk.CTk):
             self.config_desbloqueado = False
         except Exception:
             pass
-        self.limpiar_container()
-        TodosArticulos(self.container, self, categoria)
+        self._mostrar('todos_articulos', categoria, categoria=categoria)
 
     def mostrar_tickets(self, fecha=None, retorno_historico=False):
         try:
@@ -157,9 +232,7 @@ class AppTPV(ctk.CTk):
                 self.config_desbloqueado = False
             except Exception:
                 pass
-            from modulos.tpv.ui_tickets import TicketsView
-            self.limpiar_container()
-            TicketsView(self.container, self, fecha, retorno_historico)
+            self._mostrar('tickets', fecha, retorno_historico, cachear=False)
         except Exception:
             try:
                 self.mostrar_inicio()
@@ -173,9 +246,7 @@ class AppTPV(ctk.CTk):
             except Exception:
                 pass
             print('DEBUG: Intentando mostrar clientes')
-            self.limpiar_container()
-            view = GestionClientesView(self.container, self)
-            view.pack(fill="both", expand=True)
+            self._mostrar('gestion_clientes')
         except Exception:
             logging.exception("Error mostrando la vista de Gestión de Clientes")
             try:
@@ -185,9 +256,7 @@ class AppTPV(ctk.CTk):
 
     def mostrar_gestion_usuarios(self):
         try:
-            self.limpiar_container()
-            view = UIGestionUsuarios(self.container, self)
-            view.pack(fill='both', expand=True)
+            self._mostrar('gestion_usuarios', cachear=False)
         except Exception:
             logging.exception('Error mostrando la vista de Gestión de Usuarios')
             try:
@@ -197,9 +266,7 @@ class AppTPV(ctk.CTk):
 
     def mostrar_config_fidelizacion(self):
         try:
-            self.limpiar_container()
-            view = ConfigFidelizacionView(self.container, self)
-            view.pack(fill='both', expand=True)
+            self._mostrar('config_fidelizacion', cachear=False)
         except Exception:
             logging.exception('Error mostrando la vista de Configuración de Fidelización')
             try:
@@ -209,10 +276,7 @@ class AppTPV(ctk.CTk):
 
     def mostrar_mantenimiento(self):
         try:
-            self.limpiar_container()
-            from modulos.configuracion.reiniciar.ui_mantenimiento import UIMantenimiento
-            view = UIMantenimiento(self.container, self)
-            view.pack(fill='both', expand=True)
+            self._mostrar('mantenimiento', cachear=False)
         except Exception:
             logging.exception('Error mostrando la vista de Mantenimiento')
             try:
@@ -224,16 +288,9 @@ class AppTPV(ctk.CTk):
         """Called after mostrar_inicio to restore previous submenu if available."""
         try:
             prev = getattr(self, '_prev_inicio_submenu', None)
-            hijos = self.container.winfo_children()
-            if not hijos:
-                return
-            first = hijos[0]
             # only proceed if it's PantallaInicio
-            try:
-                from modulos.inicio.ui_inicio import PantallaInicio
-                if not isinstance(first, PantallaInicio):
-                    return
-            except Exception:
+            first = self._pantalla_inicio()
+            if first is None:
                 return
 
             if prev == 'almacen':
@@ -281,9 +338,7 @@ class AppTPV(ctk.CTk):
                 self.config_desbloqueado = False
             except Exception:
                 pass
-            from modulos.tpv.ui_cierre_caja import CierreCajaView
-            self.limpiar_container()
-            CierreCajaView(self.container, self)
+            self._mostrar('cierre_caja', cachear=False)
         except Exception:
             try:
                 self.mostrar_inicio()
@@ -293,9 +348,7 @@ class AppTPV(ctk.CTk):
     def mostrar_historico_cierres(self):
         try:
             self.config_desbloqueado = False
-            self.limpiar_container()
-            view = HistoricoCierresView(self.container, self)
-            view.pack(fill='both', expand=True)
+            self._mostrar('historico_cierres')
         except Exception:
             logging.exception('Error mostrando la vista de Histórico de Cierres')
             try:
@@ -315,8 +368,7 @@ class AppTPV(ctk.CTk):
             self.config_desbloqueado = False
         except Exception:
             pass
-        self.limpiar_container()
-        PantallaGestionArticulos(self.container, self)
+        self._mostrar('almacen_antiguo', cachear=False)
 
     def mostrar_submenu_almacen(self):
         try:
@@ -324,10 +376,9 @@ class AppTPV(ctk.CTk):
         except Exception:
             pass
         self.mostrar_inicio()
-        hijos = self.container.winfo_children()
-        if not hijos:
+        pantalla_actual = self._pantalla_inicio()
+        if pantalla_actual is None:
             return
-        pantalla_actual = hijos[0]
         if hasattr(pantalla_actual, 'mostrar_submenu_almacen'):
             try:
                 pantalla_actual.mostrar_submenu_almacen()
@@ -353,24 +404,35 @@ class AppTPV(ctk.CTk):
 
         # Buscar la instancia de PantallaInicio en el container y pedirle que muestre el submenu
         try:
-            hijos = self.container.winfo_children()
-            if not hijos:
-                return
-            first = hijos[0]
-            try:
-                from modulos.inicio.ui_inicio import PantallaInicio
-                if isinstance(first, PantallaInicio):
-                    try:
-                        first.mostrar_submenu_config()
-                    except Exception:
-                        pass
-            except Exception:
-                # si no se puede importar o no coincide, no hacemos nada
-                pass
+            first = self._pantalla_inicio()
+            if first is not None:
+                try:
+                    first.mostrar_submenu_config()
+                except Exception:
+                    pass
         except Exception:
             pass
 
 
 if __name__ == "__main__":
-    app = AppTPV()
-    app.mainloop()
\ No newline at end of file
+    with perfil.paso('ventana e inicio'):
+        app = AppTPV()
+    if perfil.activo:
+        def _informe_arranque():
+            texto = perfil.informe()
+            print(texto)
+            logging.info('Perfil de arranque:\n%s', texto)
+        app.after_idle(_informe_arranque)
+    try:
+        app.mainloop()
+    finally:
+        # terminar las ventas que aún estén en la cola post-venta
+        try:
+            from modulos.tpv.postventa import cola_postventa
+            cola_postventa.esperar()
+        except Exception:
+            logging.exception('Error vaciando la cola post-venta')
+        try:
+            database.close_all()
+        except Exception:
+            pass
\ No newline at end of file
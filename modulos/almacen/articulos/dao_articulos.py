@@ -1,6 +1,146 @@
+import base64
+import json
 import sqlite3
-from typing import List, Dict, Optional
-from database import connect
+from typing import List, Dict, Optional, Any, Tuple
+from database import connect, product_schema
+from modulos.almacen import busqueda
+
+
+def catalog_query(db_path: Optional[str] = None,
+                  search: str = '',
+                  proveedor: str = '',
+                  categoria: str = '',
+                  tipo: str = '',
+                  with_price: bool = True) -> Tuple[str, str, List[Any], Dict[str, str]]:
+    """Build the catalogue SELECT and FROM/WHERE for the given filters.
+
+    Returns (select_sql, from_where_sql, params, sort_exprs). `sort_exprs`
+    maps the sortable keys ('nombre', 'categoria', 'proveedor', 'tipo') to
+    the SQL expression used both in ORDER BY and in keyset cursors.
+
+    Sorting by name uses the expression index idx_productos_orden_nombre;
+    categoria/proveedor/tipo sort alphabetically by the shown name through
+    productos.<campo>_orden, which the relation triggers keep equal to it
+    (idx_productos_*_orden). Older databases without those columns sort by
+    the joined name, with a full sort per page.
+    """
+    # product columns are resolved once and cached in database.product_schema
+    schema = product_schema(db_path)
+    name_col = schema['name_col']
+    sku_col = schema['sku_col']
+    tipo_col = schema['tipo_col']
+
+    # integer keys maintained by database.ensure_relaciones_schema; older
+    # databases without them still join on the text columns
+    fk = all(c in schema['columns'] for c in ('categoria_id', 'proveedor_id', 'tipo_id'))
+    orden = fk and all(f'{c}_orden' in schema['columns'] for c in ('categoria', 'proveedor', 'tipo'))
+
+    names = {
+        'nombre': f"COALESCE(p.{name_col}, '')" if name_col else "''",
+        'categoria': "COALESCE(cat.nombre, p.categoria, '')",
+        'proveedor': "COALESCE(prov.nombre, p.proveedor, '')",
+        'tipo': f"COALESCE(t.nombre, p.{tipo_col}, '')" if tipo_col else "''",
+    }
+    sort_exprs = dict(names)
+    if orden:
+        # same value as the joined name, but indexed
+        sort_exprs.update({campo: f'p.{campo}_orden' for campo in ('categoria', 'proveedor', 'tipo')})
+    select_sql = (
+        f"SELECT p.id, {names['nombre']} AS nombre, "
+        + (f"p.{sku_col} AS sku, " if sku_col else "'' AS sku, ")
+        + f"{names['categoria']} AS categoria_nombre, {names['proveedor']} AS proveedor_nombre, "
+        + f"{names['tipo']} AS tipo_nombre"
+        + (', pr.pvp AS pvp, pr.coste AS coste' if with_price else '')
+    )
+
+    sql = ' FROM productos p '
+    if with_price:
+        sql += 'LEFT JOIN precios pr ON p.id = pr.producto_id AND pr.activo = 1 '
+    if fk:
+        sql += 'LEFT JOIN categorias cat ON cat.id = p.categoria_id '
+        sql += 'LEFT JOIN proveedores prov ON prov.id = p.proveedor_id '
+        sql += 'LEFT JOIN tipos t ON t.id = p.tipo_id '
+    else:
+        sql += 'LEFT JOIN categorias cat ON (p.categoria = cat.nombre OR p.categoria = cat.id) '
+        sql += 'LEFT JOIN proveedores prov ON (p.proveedor = prov.nombre OR p.proveedor = prov.id) '
+        if tipo_col:
+            sql += f'LEFT JOIN tipos t ON (p.{tipo_col} = t.nombre OR p.{tipo_col} = t.id) '
+
+    params: List[Any] = []
+    where_clauses = []
+    ids_sql = None
+    if search and busqueda.disponible(db_path):
+        # full-text + trigram index instead of scanning every row with LIKE
+        ids_sql, ids_params = busqueda.filtro_ids(search)
+        if ids_sql:
+            where_clauses.append(f'p.id IN ({ids_sql})')
+            params.extend(ids_params)
+    if search and not ids_sql:
+        # no index or no indexable term (only punctuation, '%'...): the term
+        # is matched literally, never dropped
+        qlike = '%' + search.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+        sub = []
+        if name_col:
+            sub.append(f"p.{name_col} LIKE ? ESCAPE '\\'")
+        if sku_col:
+            sub.append(f"p.{sku_col} LIKE ? ESCAPE '\\'")
+        where_clauses.append('(' + ' OR '.join(sub) + ')' if sub else '0 = 1')
+        params.extend([qlike] * len(sub))
+
+    def _apply_filter(expr, value):
+        if not value:
+            return
+        where_clauses.append(expr)
+        params.extend([value, value])
+
+    if fk:
+        # id lookup by name (served by idx_productos_*_id); products whose text
+        # matches no master row are still found by that text
+        for col, tabla, value in (('proveedor', 'proveedores', proveedor), ('categoria', 'categorias', categoria), ('tipo', 'tipos', tipo)):
+            _apply_filter(
+                f'(p.{col}_id IN (SELECT id FROM {tabla} WHERE nombre = ? COLLATE NOCASE) '
+                f'OR (p.{col}_id IS NULL AND p.{col} = ? COLLATE NOCASE))',
+                value,
+            )
+    else:
+        _apply_filter('(LOWER(p.proveedor) = LOWER(?) OR LOWER(prov.nombre) = LOWER(?))', proveedor)
+        _apply_filter('(LOWER(p.categoria) = LOWER(?) OR LOWER(cat.nombre) = LOWER(?))', categoria)
+        if tipo_col:
+            _apply_filter(f'(LOWER(p.{tipo_col}) = LOWER(?) OR LOWER(t.nombre) = LOWER(?))', tipo)
+
+    if where_clauses:
+        sql += ' WHERE ' + ' AND '.join(where_clauses)
+    return select_sql, sql, params, sort_exprs
+
+
+def _row_to_item(r) -> Dict:
+    return {
+        'id': r[0],
+        'nombre': r[1] or '',
+        'sku': r[2] or '',
+        'categoria': r[3] or '',
+        'proveedor': r[4] or '',
+        'tipo': r[5] or '',
+    }
+
+
+def encode_cursor(sort_key: Optional[str], direction: str, value: Any, last_id: int) -> str:
+    """Opaque cursor holding the (sort value, id) position of the last row served."""
+    data = json.dumps({'k': sort_key, 'd': direction, 'v': value, 'id': last_id})
+    return base64.urlsafe_b64encode(data.encode('utf-8')).decode('ascii')
+
+
+def decode_cursor(cursor: Optional[str], sort_key: Optional[str], direction: str) -> Optional[Dict]:
+    """Decode a cursor; None if missing, malformed or created for another ordering."""
+    if not cursor:
+        return None
+    try:
+        data = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8'))
+        if data.get('k') != sort_key or data.get('d') != direction or data.get('id') is None:
+            return None
+        return data
+    except Exception:
+        return None
 
 
 def get_products_page(db_path: str,
@@ -12,138 +152,109 @@ def get_products_page(db_path: str,
                       tipo: str = '',
                       sort_by: Optional[str] = None,
                       sort_desc: bool = False) -> List[Dict]:
-    """Return a paginated list of products as dictionaries.
+    """Return a paginated list of products as dictionaries (LIMIT/OFFSET).
 
-    This function mirrors the previous SQL logic used inside
-    TodosArticulos.load_items. It keeps the DB access isolated here so
-    the UI can call it via a simple API.
+    Kept for callers that address pages by number; deep pages get slower,
+    so browsing should use `get_products_keyset`.
     """
-    conn = connect(db_path)
-    cur = conn.cursor()
+    select_sql, sql, params, sort_exprs = catalog_query(db_path, search, proveedor, categoria, tipo)
+    sql = select_sql + sql
+    if sort_by:
+        sql += f" ORDER BY {sort_exprs.get(sort_by, sort_exprs['nombre'])} {'DESC' if sort_desc else 'ASC'}"
+    if page_size:
+        offset = (max(1, page) - 1) * page_size
+        sql += f" LIMIT {int(page_size)} OFFSET {int(offset)}"
 
-    # get product columns to detect available fields
+    conn = connect(db_path)
     try:
-        cur.execute("PRAGMA table_info(productos)")
-        rows = cur.fetchall()
-        prod_cols = [r[1] for r in rows]
-    except Exception:
-        prod_cols = []
-
-    name_col = 'nombre' if 'nombre' in prod_cols else ('name' if 'name' in prod_cols else None)
-    sku_col = None
-    for sc in ['sku', 'codigo', 'codigo_barra', 'codigo_barras']:
-        if sc in prod_cols:
-            sku_col = sc
-            break
-
-    select_parts = ['p.id']
-    if name_col:
-        select_parts.append(f'p.{name_col} as nombre')
-    else:
-        select_parts.append("'' as nombre")
-    if sku_col:
-        select_parts.append(f'p.{sku_col} as sku')
-    else:
-        select_parts.append("'' as sku")
-
-    select_parts.extend([
-        'p.categoria as categoria_raw',
-        'COALESCE(cat.nombre, p.categoria, "") as categoria_nombre',
-        'p.proveedor as proveedor_raw',
-        'COALESCE(prov.nombre, p.proveedor, "") as proveedor_nombre',
-        'pr.pvp as pvp',
-        'pr.coste as coste'
-    ])
-
-    tipo_col = None
-    for tc in ['tipo', 'tipo_id', 'id_tipo', 'tipo_shop']:
-        if tc in prod_cols:
-            tipo_col = tc
-            break
-    if tipo_col:
-        select_parts.insert(-2, f'p.{tipo_col} as tipo_raw')
-        select_parts.insert(-2, f'COALESCE(t.nombre, p.{tipo_col}, "") as tipo_nombre')
-
-    sql = 'SELECT ' + ', '.join(select_parts) + ' FROM productos p '
-    sql += 'LEFT JOIN precios pr ON p.id = pr.producto_id AND pr.activo = 1 '
-    sql += 'LEFT JOIN categorias cat ON (p.categoria = cat.nombre OR p.categoria = cat.id) '
-    sql += 'LEFT JOIN proveedores prov ON (p.proveedor = prov.nombre OR p.proveedor = prov.id) '
-    if tipo_col:
-        sql += f'LEFT JOIN tipos t ON (p.{tipo_col} = t.nombre OR p.{tipo_col} = t.id) '
-
-    params = []
-    if search:
-        qlike = f"%{search}%"
-        where_clauses = []
-        if name_col:
-            where_clauses.append(f'p.{name_col} LIKE ?')
-        if sku_col:
-            where_clauses.append(f'p.{sku_col} LIKE ?')
-        if where_clauses:
-            sql += ' WHERE (' + ' OR '.join(where_clauses) + ') '
-            for _ in where_clauses:
-                params.append(qlike)
-
-    def _apply_filter(column_expr, value):
-        nonlocal sql, params
-        if not value:
-            return
-        v = value
-        if 'WHERE' in sql:
-            sql += ' AND '
-        else:
-            sql += ' WHERE '
-        sql += column_expr
-        params.extend([v, v])
+        cur = conn.cursor()
+        cur.execute(sql, params)
+        return [_row_to_item(r) for r in cur.fetchall()]
+    except sqlite3.Error:
+        return []
+    finally:
+        try:
+            conn.close()
+        except Exception:
+            pass
 
-    _apply_filter('(LOWER(p.proveedor) = LOWER(?) OR LOWER(prov.nombre) = LOWER(?)) ', proveedor)
-    _apply_filter('(LOWER(p.categoria) = LOWER(?) OR LOWER(cat.nombre) = LOWER(?)) ', categoria)
-    if tipo_col:
-        _apply_filter(f'(LOWER(p.{tipo_col}) = LOWER(?) OR LOWER(t.nombre) = LOWER(?)) ', tipo)
 
-    if sort_by:
-        sort_map = {
-            'nombre': 'nombre',
-            'categoria': 'categoria_nombre',
-            'proveedor': 'proveedor_nombre',
-            'tipo': 'tipo_nombre'
-        }
-        sort_col = sort_map.get(sort_by, 'nombre')
-        sql += f" ORDER BY {sort_col} {'DESC' if sort_desc else 'ASC'}"
+def get_products_keyset(db_path: Optional[str] = None,
+                        cursor: Optional[str] = None,
+                        page_size: int = 100,
+                        search: str = '',
+                        proveedor: str = '',
+                        categoria: str = '',
+                        tipo: str = '',
+                        sort_by: Optional[str] = None,
+                        sort_desc: bool = False) -> Dict:
+    """Return one catalogue page using keyset pagination on (sort key, id).
 
-    if page_size:
-        offset = (max(1, page) - 1) * page_size
-        sql += f" LIMIT {page_size} OFFSET {offset}"
+    `cursor` is the `next_cursor` of the previous page (None for the first
+    one). Each page is an index-friendly `WHERE (key, id) > (?, ?)` instead
+    of an OFFSET scan. Returns {'items', 'has_next', 'next_cursor'}; sqlite
+    errors propagate to the caller.
+    """
+    select_sql, sql, params, sort_exprs = catalog_query(db_path, search, proveedor, categoria, tipo)
+    key = sort_by if sort_by in sort_exprs else None
+    direction = 'DESC' if (key and sort_desc) else 'ASC'
+    op = '<' if direction == 'DESC' else '>'
+
+    pos = decode_cursor(cursor, key, direction)
+    if pos is not None:
+        if key:
+            # the bound on the leading term lets sqlite seek the index; the
+            # row value alone would make it scan from the first entry
+            cond = f"{sort_exprs[key]} {op}= ? AND ({sort_exprs[key]}, p.id) {op} (?, ?)"
+            params = params + [pos['v'], pos['v'], pos['id']]
+        else:
+            cond = f"p.id {op} ?"
+            params = params + [pos['id']]
+        sql += (' AND ' if ' WHERE ' in sql else ' WHERE ') + cond
+
+    order = f"{sort_exprs[key]} {direction}, p.id {direction}" if key else 'p.id ASC'
+    # the sort value goes last so the cursor can be built from the last row;
+    # one extra row only to know whether there is a next page
+    sql = select_sql + (f', {sort_exprs[key]} AS orden' if key else '') + sql + f' ORDER BY {order} LIMIT {int(page_size) + 1}'
 
+    conn = connect(db_path)
     try:
+        cur = conn.cursor()
         cur.execute(sql, params)
         rows = cur.fetchall()
-    except Exception:
+    finally:
         try:
             conn.close()
         except Exception:
             pass
-        return []
 
-    items = []
-    for r in rows:
-        _id = r[0]
-        nombre = r[1] if len(r) > 1 else ''
-        sku = r[2] if len(r) > 2 else ''
-        categoria_nombre = r[4] if len(r) > 4 else ''
-        proveedor_nombre = r[6] if len(r) > 6 else ''
-        tipo_nombre = r[8] if len(r) > 8 else ''
-        items.append({
-            'id': _id,
-            'nombre': nombre or '',
-            'sku': sku or '',
-            'categoria': categoria_nombre or '',
-            'proveedor': proveedor_nombre or '',
-            'tipo': tipo_nombre or ''
-        })
+    has_next = len(rows) > page_size
+    items = [_row_to_item(r) for r in rows[:page_size]]
+    next_cursor = None
+    if has_next and items:
+        last = rows[page_size - 1]
+        next_cursor = encode_cursor(key, direction, last[-1] if key else None, last[0])
+    return {'items': items, 'has_next': has_next, 'next_cursor': next_cursor}
+
 
+def count_products(db_path: Optional[str] = None,
+                   search: str = '',
+                   proveedor: str = '',
+                   categoria: str = '',
+                   tipo: str = '') -> int:
+    """Count the products matching the filters (no join when unfiltered)."""
+    if not (search or proveedor or categoria or tipo):
+        sql, params = 'SELECT COUNT(*) FROM productos', []
+    else:
+        _, from_where, params, _ = catalog_query(db_path, search, proveedor, categoria, tipo, with_price=False)
+        sql = 'SELECT COUNT(*)' + from_where
+    conn = connect(db_path)
     try:
-        conn.close()
-    except Exception:
-        pass
-    return items
+        cur = conn.cursor()
+        cur.execute(sql, params)
+        return int(cur.fetchone()[0] or 0)
+    finally:
+        try:
+            conn.close()
+        except Exception:
+            pass
@@ -5,10 +5,10 @@ import tkinter as tk
 from tkinter import filedialog
 from modulos.exportar_importar.exportar_service import ExportarService
 import customtkinter as ctk
-import threading
 from tkinter import messagebox
 from tkinter import ttk
-from modulos.almacen.producto_service import ProductoService
+from modulos.almacen.producto_service import ProductoService, version_catalogo
+from modulos.consulta_diferida import ConsultaDiferida
 
 
 class DialogExportarArticulos(ctk.CTkToplevel):
@@ -142,13 +142,24 @@ class TodosArticulos(ctk.CTkFrame):
         self.db_path = None
         self.sort_by = None
         self.sort_desc = False
-        # pagination defaults
-        self.page = 1
+        # keyset stream: `page` pages of `page_size` rows are already in the tree
+        self.page = 0
         self.page_size = 100
+        self._has_next = False
+        self._next_cursor = None
+        self._total = None
+        # pages to load before restoring a saved view (see _on_pagina)
+        self._paginas_objetivo = 1
+        # page reads run on the shared query worker; a newer refresh drops older pages
+        self._consultas = ConsultaDiferida(self, espera_ms=300)
+        self._cargando = False
+        self._ultima_busqueda = None
+        # catalogue version of the rows on screen (see on_show)
+        self._version_catalogo = None
         # Service layer
         self.service = ProductoService()
 
-        # placeholder for columns header; rendered inside render_list so we can update arrows
+        # columns header; built once in _build_header, arrows updated in _actualizar_cabecera
         self.columns = [("nombre", "Nombre"), ("tipo", "Tipo"), ("proveedor", "Proveedor"), ("categoria", "Categoría")]
         self.cols_frame_parent = ctk.CTkFrame(self)
         self.cols_frame_parent.pack(fill="x", padx=10, pady=(8, 0))
@@ -159,8 +170,8 @@ class TodosArticulos(ctk.CTkFrame):
             except Exception:
                 pass
 
-        # Scrollable area where the list/tree will be placed
-        self.scroll = ctk.CTkScrollableFrame(self, height=420)
+        # Area holding the Treeview (it scrolls itself, only visible rows are drawn)
+        self.scroll = ctk.CTkFrame(self, height=420)
         self.scroll.pack(fill="both", expand=True, padx=10, pady=(4, 0))
 
         # Bottom controls: search, Export, Volver
@@ -171,6 +182,7 @@ class TodosArticulos(ctk.CTkFrame):
         self.entry_buscar = ctk.CTkEntry(bottom, textvariable=self.search_var, placeholder_text="Buscar por nombre o sku...")
         self.entry_buscar.grid(row=0, column=0, sticky='ew', padx=(0,8))
         self.entry_buscar.bind('<Return>', lambda e: self.refresh())
+        self.entry_buscar.bind('<KeyRelease>', self._on_search_change)
         self.btn_buscar = ctk.CTkButton(bottom, text="Buscar", width=120, command=self.refresh)
         self.btn_buscar.grid(row=0, column=1, padx=(0,8))
         self.btn_todos = ctk.CTkButton(bottom, text="Todos", fg_color="#6c6c6c", command=self._clear_filters)
@@ -196,48 +208,70 @@ class TodosArticulos(ctk.CTkFrame):
         self.filter_tipo = ctk.StringVar(value='')
         self.filter_categoria = ctk.StringVar(value='')
 
-        # Load and show (restore state if exists)
+        # Load and show (restore state if exists, then the explicit category)
+        self._aplicar_vista(self._vista_pedida(categoria))
+        self._build_header()
+        self._build_tree()
+        self.refresh()
+
+    def on_show(self, categoria=None):
+        """Called when the kept-alive screen is shown again (see GestorPantallas).
+
+        Reloads only if the requested view differs from the one on screen or
+        the catalogue changed meanwhile; otherwise just restores the selection.
+        """
+        vista = self._vista_pedida(categoria)
+        cambiada = any(vista[k] != v for k, v in self._vista_actual().items())
+        catalogo = version_catalogo() != self._version_catalogo
+        if not (cambiada or catalogo):
+            self._restaurar_estado()
+            return
+        paginas = vista['paginas'] if cambiada else max(1, self.page)
+        self._aplicar_vista(vista)
+        self._paginas_objetivo = paginas
+        if catalogo:
+            self._cargar_valores_filtro()
+        self.refresh()
+
+    def _vista_pedida(self, categoria=None):
+        """View (order, search, filters, pages) to open with: saved state, then `categoria`."""
+        vista = {'paginas': 1, 'page_size': 100, 'sort_by': None, 'sort_desc': False, 'search': '',
+                 'filter_categoria': '', 'filter_proveedor': '', 'filter_tipo': ''}
         try:
             state = getattr(self.controller, 'todos_articulos_state', None)
             if state:
-                self.page = state.get('page', 1)
-                self.page_size = state.get('page_size', 100)
-                self.sort_by = state.get('sort_by', None)
-                self.sort_desc = state.get('sort_desc', False)
-                self.search_var.set(state.get('search', ''))
-                # restore filters if present
-                try:
-                    fc = state.get('filter_categoria')
-                    if fc is not None:
-                        self.filter_categoria.set(fc)
-                except Exception:
-                    pass
-                try:
-                    fp = state.get('filter_proveedor')
-                    if fp is not None:
-                        self.filter_proveedor.set(fp)
-                except Exception:
-                    pass
-                try:
-                    ft = state.get('filter_tipo')
-                    if ft is not None:
-                        self.filter_tipo.set(ft)
-                except Exception:
-                    pass
+                vista['paginas'] = max(1, int(state.get('page', 1) or 1))
+                for k in ('page_size', 'sort_by', 'sort_desc', 'search', 'filter_categoria', 'filter_proveedor', 'filter_tipo'):
+                    if state.get(k) is not None:
+                        vista[k] = state[k]
         except Exception:
             pass
-        # If a category was passed into the constructor (e.g. from another view), apply it
-        try:
-            if categoria:
-                try:
-                    # always apply explicit category argument so external callers (buttons/views)
-                    # can open the list filtered by that category immediately
-                    self.filter_categoria.set(categoria)
-                except Exception:
-                    pass
-        except Exception:
-            pass
-        self.refresh()
+        # always apply explicit category argument so external callers (buttons/views)
+        # can open the list filtered by that category immediately
+        if categoria:
+            vista['filter_categoria'] = categoria
+        return vista
+
+    def _vista_actual(self):
+        return {
+            'page_size': self.page_size,
+            'sort_by': self.sort_by,
+            'sort_desc': self.sort_desc,
+            'search': self.search_var.get(),
+            'filter_categoria': self.filter_categoria.get(),
+            'filter_proveedor': self.filter_proveedor.get(),
+            'filter_tipo': self.filter_tipo.get(),
+        }
+
+    def _aplicar_vista(self, vista):
+        self._paginas_objetivo = vista['paginas']
+        self.page_size = vista['page_size']
+        self.sort_by = vista['sort_by']
+        self.sort_desc = vista['sort_desc']
+        self.search_var.set(vista['search'])
+        self.filter_categoria.set(vista['filter_categoria'])
+        self.filter_proveedor.set(vista['filter_proveedor'])
+        self.filter_tipo.set(vista['filter_tipo'])
 
     # Small helpers
     def _connect(self):
@@ -247,19 +281,13 @@ class TodosArticulos(ctk.CTkFrame):
         return connect()
 
     def _table_columns(self, table):
-        con = self._connect()
+        # columnas cacheadas en database (se refrescan tras migraciones)
+        from database import table_columns
         try:
-            cur = con.cursor()
-            cur.execute(f"PRAGMA table_info({table})")
-            rows = cur.fetchall()
-            return [r[1] for r in rows]
+            return table_columns(table)
         except Exception:
             return []
-        finally:
-            try:
-                con.close()
-            except Exception:
-                pass
+
     def _distinct_values_from_product(self, col):
         """Usa el servicio para obtener valores únicos para filtros."""
         try:
@@ -360,120 +388,16 @@ class TodosArticulos(ctk.CTkFrame):
         self.refresh()
 
     # -------------------------
-    # Data load & render
+    # List widgets (built once)
     # -------------------------
-    def load_items(self, page_size_override=None):
-        # normalize incoming filter vars (comboboxes may hold '[Todos]')
-        try:
-            q = self.search_var.get().strip()
-        except Exception:
-            q = ''
-        try:
-            prov_val = getattr(self, 'filter_proveedor').get().strip()
-        except Exception:
-            prov_val = ''
-        try:
-            cat_val = getattr(self, 'filter_categoria').get().strip()
-        except Exception:
-            cat_val = ''
-        try:
-            tipo_val = getattr(self, 'filter_tipo').get().strip()
-        except Exception:
-            tipo_val = ''
-        if prov_val == '[Todos]':
-            prov_val = ''
-        if cat_val == '[Todos]':
-            cat_val = ''
-        if tipo_val == '[Todos]':
-            tipo_val = ''
-        
-        try:
-            ps = page_size_override if page_size_override is not None else getattr(self, 'page_size', 100)
-            filtros = {
-                'page': getattr(self, 'page', 1),
-                'page_size': ps,
-                'search': q,
-                'proveedor': prov_val,
-                'categoria': cat_val,
-                'tipo': tipo_val,
-                'sort_by': getattr(self, 'sort_by', None),
-                'sort_desc': getattr(self, 'sort_desc', False)
-            }
-            items = self.service.obtener_productos_paginados(filtros)
-            return items
-        except Exception as e:
-            try:
-                messagebox.showerror("Error", f"Error leyendo productos: {e}")
-            except Exception:
-                pass
-            return []
-
-        
-
-    def clear_list(self):
-        for w in self.scroll.winfo_children():
-            w.destroy()
-
-    def render_list(self):
-        # start background load to avoid blocking the UI
-        try:
-            # show quick loading label
-            try:
-                if getattr(self, '_loading_label', None):
-                    self._loading_label.pack(fill='both', expand=True)
-                else:
-                    self._loading_label = ctk.CTkLabel(self.scroll, text='Cargando...', anchor='center')
-                    self._loading_label.pack(fill='both', expand=True)
-            except Exception:
-                pass
-            t = threading.Thread(target=self._bg_load_and_render, daemon=True)
-            t.start()
-        except Exception:
-            # fallback to synchronous render
-            items = self.load_items()
-            try:
-                self._render_list_with_items(items)
-            except Exception:
-                pass
-
-    def _bg_load_and_render(self):
-        # request one extra row to detect whether there is a next page
-        try:
-            items = self.load_items(page_size_override=(getattr(self, 'page_size', 100) + 1))
-        except Exception:
-            items = []
-        try:
-            if items and len(items) > getattr(self, 'page_size', 100):
-                self._has_next = True
-                items = items[:getattr(self, 'page_size', 100)]
-            else:
-                self._has_next = False
-        except Exception:
-            self._has_next = False
-        try:
-            self.after(0, lambda: self._render_list_with_items(items))
-        except Exception:
-            pass
+    def _filter_var(self, col_key):
+        return {'proveedor': self.filter_proveedor, 'categoria': self.filter_categoria, 'tipo': self.filter_tipo}[col_key]
 
-    def _render_list_with_items(self, items):
-        # remove loading label if present
-        try:
-            if getattr(self, '_loading_label', None):
-                try:
-                    self._loading_label.destroy()
-                except Exception:
-                    pass
-                self._loading_label = None
-        except Exception:
-            pass
-        self.clear_list()
-        # header-like row for spreadsheet feel (recreate header each render so arrow updates)
-        try:
-            for w in self.cols_frame_parent.winfo_children():
-                w.destroy()
-        except Exception:
-            pass
+    def _build_header(self):
+        """Create titles, filter combos and sort buttons once; `_actualizar_cabecera` keeps them current."""
         header_ctrl = self.cols_frame_parent
+        self._header_combos = {}
+        self._header_buttons = {}
         # ensure two rows: 0 -> small title, 1 -> control (combo/button)
         try:
             header_ctrl.grid_rowconfigure(0, weight=0)
@@ -482,25 +406,8 @@ class TodosArticulos(ctk.CTkFrame):
             pass
         # selection column UI removed (select-all hidden)
         for i, (col_key, col_label) in enumerate(self.columns):
-            arrow = ''
-            if self.sort_by == col_key:
-                arrow = ' ▲' if not self.sort_desc else ' ▼'
             # For certain columns show a dropdown selector
             if col_key in ('proveedor', 'categoria', 'tipo'):
-                if col_key == 'proveedor':
-                    vals = ['[Todos]'] + self._distinct_values_from_product('proveedor')
-                    var = self.filter_proveedor
-                elif col_key == 'categoria':
-                    vals = ['[Todos]'] + self._distinct_values_from_product('categoria')
-                    var = self.filter_categoria
-                else:
-                    vals = ['[Todos]'] + (self._distinct_values_from_product(self.tipo_col_name) if self.tipo_col_name else [])
-                    var = self.filter_tipo
-                # ensure variable shows [Todos] when empty
-                try:
-                    display_value = var.get() if var.get() else '[Todos]'
-                except Exception:
-                    display_value = '[Todos]'
                 # place a small title label above the combo
                 try:
                     lbl = ctk.CTkLabel(header_ctrl, text=col_label, font=(None, 9))
@@ -508,13 +415,14 @@ class TodosArticulos(ctk.CTkFrame):
                 except Exception:
                     pass
                 try:
-                    combo = ctk.CTkComboBox(header_ctrl, values=vals, variable=var, command=lambda v, k=col_key: self._on_header_combo_change(k, v))
-                    combo.set(display_value)
+                    combo = ctk.CTkComboBox(header_ctrl, values=['[Todos]'], variable=self._filter_var(col_key), command=lambda v, k=col_key: self._on_header_combo_change(k, v))
                     combo.grid(row=1, column=i+1, sticky='nsew', padx=4, pady=6)
+                    self._header_combos[col_key] = combo
                 except Exception:
                     # fallback to button if combobox not available
-                    b = ctk.CTkButton(header_ctrl, text=col_label + arrow, fg_color="#1f538d", text_color="white", corner_radius=8, command=lambda k=col_key: self.toggle_sort(k))
+                    b = ctk.CTkButton(header_ctrl, text=col_label, fg_color="#1f538d", text_color="white", corner_radius=8, command=lambda k=col_key: self.toggle_sort(k))
                     b.grid(row=1, column=i+1, sticky='nsew', padx=4, pady=6)
+                    self._header_buttons[col_key] = (b, col_label)
             else:
                 # non-filter columns: put a title label blank and the button below
                 try:
@@ -529,121 +437,293 @@ class TodosArticulos(ctk.CTkFrame):
                         lbl2 = ctk.CTkLabel(header_ctrl, text="", font=("Arial", 11, "bold"))
                         lbl2.grid(row=1, column=i+1, sticky='nsew', padx=4, pady=6)
                     else:
-                        b = ctk.CTkButton(header_ctrl, text=col_label + arrow, fg_color="#1f538d", text_color="white", corner_radius=8, command=lambda k=col_key: self.toggle_sort(k))
+                        b = ctk.CTkButton(header_ctrl, text=col_label, fg_color="#1f538d", text_color="white", corner_radius=8, command=lambda k=col_key: self.toggle_sort(k))
                         b.grid(row=1, column=i+1, sticky='nsew', padx=4, pady=6)
+                        self._header_buttons[col_key] = (b, col_label)
                 except Exception:
                     pass
+        self._cargar_valores_filtro()
 
-        # rows (render into a Treeview for stable columns)
-        # record last rendered ids for potential fallback uses
+    def _cargar_valores_filtro(self):
+        """(Re)load the distinct values offered by the header combos."""
+        for col_key, combo in getattr(self, '_header_combos', {}).items():
+            col = self.tipo_col_name if col_key == 'tipo' else col_key
+            vals = ['[Todos]'] + (self._distinct_values_from_product(col) if col else [])
+            try:
+                combo.configure(values=vals)
+            except Exception:
+                pass
+
+    def _actualizar_cabecera(self):
+        """Sync sort arrows and combo texts with the current state (no widgets are recreated)."""
+        for col_key, (b, col_label) in getattr(self, '_header_buttons', {}).items():
+            arrow = ''
+            if self.sort_by == col_key:
+                arrow = ' ▲' if not self.sort_desc else ' ▼'
+            try:
+                b.configure(text=col_label + arrow)
+            except Exception:
+                pass
+        for col_key, combo in getattr(self, '_header_combos', {}).items():
+            # ensure the combo shows [Todos] when the filter is empty
+            try:
+                if not self._filter_var(col_key).get():
+                    combo.set('[Todos]')
+            except Exception:
+                pass
+
+    def _build_tree(self):
+        """Single Treeview for the whole list; Tk only draws the rows in view."""
+        self._last_rendered_item_ids = []
+        tree_frame = ctk.CTkFrame(self.scroll)
+        tree_frame.pack(fill='both', expand=True)
+        cols = [c[0] for c in self.columns]
+        self.tree = ttk.Treeview(tree_frame, columns=cols, show='headings', selectmode='extended')
+        # make headings bold for better readability
         try:
-            self._last_rendered_item_ids = [it['id'] for it in items]
+            style = ttk.Style()
+            style.configure("Treeview.Heading", font=("Arial", 11, "bold"))
         except Exception:
-            self._last_rendered_item_ids = []
+            pass
+        # configure headings
+        for col_key, col_label in self.columns:
+            try:
+                # left-justify heading text and column content
+                self.tree.heading(col_key, text=col_label, anchor='w')
+                self.tree.column(col_key, anchor='w', stretch=True)
+            except Exception:
+                pass
+        # vertical scrollbar; scrolling near the end streams the next page
+        self._vsb = ttk.Scrollbar(tree_frame, orient='vertical', command=self.tree.yview)
+        self.tree.configure(yscrollcommand=self._on_tree_scroll)
+        self.tree.pack(side='left', fill='both', expand=True)
+        self._vsb.pack(side='right', fill='y')
+        # bind double-click to edit
+        try:
+            self.tree.bind('<Double-1>', self._on_tree_double_click)
+        except Exception:
+            pass
 
-        # Use a Treeview for rows to ensure columns align with header and resize consistently
+        # footer: loaded/total counter and a manual "load more"
+        self._pagination_frame = ctk.CTkFrame(self)
+        self._pagination_frame.pack(fill='x', padx=10, pady=(0,10))
+        self._lbl_page = ctk.CTkLabel(self._pagination_frame, text='')
+        self._lbl_page.pack(side='left', padx=6)
+        self._btn_next = ctk.CTkButton(self._pagination_frame, text='Cargar más ▼', command=self.next_page, state='disabled')
+        self._btn_next.pack(side='left', padx=6)
+
+    # -------------------------
+    # Data load & render
+    # -------------------------
+    def _filtros(self, page_size_override=None):
+        # normalize incoming filter vars (comboboxes may hold '[Todos]')
+        try:
+            q = self.search_var.get().strip()
+        except Exception:
+            q = ''
+        try:
+            prov_val = getattr(self, 'filter_proveedor').get().strip()
+        except Exception:
+            prov_val = ''
         try:
-            for w in self.scroll.winfo_children():
-                w.destroy()
-            tree_frame = ctk.CTkFrame(self.scroll)
-            tree_frame.pack(fill='both', expand=True)
-            cols = [c[0] for c in self.columns]
-            self.tree = ttk.Treeview(tree_frame, columns=cols, show='headings', selectmode='extended')
-            # make headings bold for better readability
+            cat_val = getattr(self, 'filter_categoria').get().strip()
+        except Exception:
+            cat_val = ''
+        try:
+            tipo_val = getattr(self, 'filter_tipo').get().strip()
+        except Exception:
+            tipo_val = ''
+        if prov_val == '[Todos]':
+            prov_val = ''
+        if cat_val == '[Todos]':
+            cat_val = ''
+        if tipo_val == '[Todos]':
+            tipo_val = ''
+        ps = page_size_override if page_size_override is not None else getattr(self, 'page_size', 100)
+        return {
+            'page_size': ps,
+            'search': q,
+            'proveedor': prov_val,
+            'categoria': cat_val,
+            'tipo': tipo_val,
+            'sort_by': getattr(self, 'sort_by', None),
+            'sort_desc': getattr(self, 'sort_desc', False)
+        }
+
+    def load_items(self, page_size_override=None, cursor=None):
+        """Load one keyset page starting at `cursor` (None = first page) and return its items."""
+        try:
+            res = self.service.obtener_pagina_productos(self._filtros(page_size_override), cursor=cursor)
+            return res.get('items') or []
+        except Exception as e:
             try:
-                style = ttk.Style()
-                style.configure("Treeview.Heading", font=("Arial", 11, "bold"))
+                messagebox.showerror("Error", f"Error leyendo productos: {e}")
             except Exception:
                 pass
-            # configure headings
-            for col_key, col_label in self.columns:
-                try:
-                    # left-justify heading text and column content
-                    self.tree.heading(col_key, text=col_label, anchor='w')
-                    self.tree.column(col_key, anchor='w', stretch=True)
-                except Exception:
-                    pass
-            # vertical scrollbar
-            vsb = ttk.Scrollbar(tree_frame, orient='vertical', command=self.tree.yview)
-            self.tree.configure(yscrollcommand=vsb.set)
-            self.tree.pack(side='left', fill='both', expand=True)
-            vsb.pack(side='right', fill='y')
+            return []
 
-            # populate rows
-            for it in items:
-                try:
-                    vals = (it.get('nombre',''), it.get('tipo',''), it.get('proveedor',''), it.get('categoria',''))
-                    self.tree.insert('', 'end', iid=str(it['id']), values=vals)
-                except Exception:
-                    pass
+    def refresh(self, espera_ms=0):
+        """Start a new result set (search, filters or order changed) from its first page.
+
+        `espera_ms` > 0 debounces the read (search as you type).
+        """
+        self.page = 0
+        self._has_next = False
+        self._next_cursor = None
+        self._ultima_busqueda = self.search_var.get()
+        self._version_catalogo = version_catalogo()
+        self._actualizar_cabecera()
+        self._cargar_pagina(None, espera_ms)
+
+    def _on_search_change(self, event=None):
+        # only keys that change the text (not arrows, shift...) restart the list
+        if self.search_var.get() == self._ultima_busqueda:
+            return
+        self.refresh(espera_ms=self._consultas.espera_ms)
+
+    def next_page(self):
+        """Append the next keyset page to the tree (scroll near the end or 'Cargar más')."""
+        if self._cargando or not self._has_next or not self._next_cursor:
+            return
+        self._cargar_pagina(self._next_cursor)
 
-            # if there's saved state from before (selection + yview), restore it
+    def _cargar_pagina(self, cursor, espera_ms=0):
+        self._cargando = True
+        try:
+            self._lbl_page.configure(text='Cargando...')
+            self._btn_next.configure(state='disabled')
+        except Exception:
+            pass
+        filtros = self._filtros()
+        # the total is only counted once per result set
+        self._consultas.lanzar(
+            lambda: self.service.obtener_pagina_productos(filtros, cursor=cursor, incluir_total=cursor is None),
+            lambda res: self._on_pagina(cursor, res),
+            espera_ms=espera_ms,
+            al_fallar=lambda e: self._on_pagina(cursor, {'items': [], 'has_next': False, 'error': e}),
+        )
+
+    def _on_pagina(self, cursor, res):
+        # only called for the current request (ConsultaDiferida drops superseded ones)
+        self._cargando = False
+        if res.get('error') is not None:
             try:
-                state = getattr(self.controller, 'todos_articulos_state', None)
-                if state:
-                    sel = state.get('selected_id')
-                    yv = state.get('yview')
-                    if isinstance(yv, (int, float)):
-                        try:
-                            self.tree.yview_moveto(float(yv))
-                        except Exception:
-                            pass
-                    if sel is not None:
-                        try:
-                            sid = str(int(sel))
-                            if sid in self.tree.get_children():
-                                self.tree.selection_set(sid)
-                                self.tree.see(sid)
-                        except Exception:
-                            pass
-                    # clear saved selection so subsequent navigations don't stale
-                    try:
-                        delattr(self.controller, 'todos_articulos_state')
-                    except Exception:
-                        try:
-                            self.controller.todos_articulos_state = None
-                        except Exception:
-                            pass
+                messagebox.showerror("Error", f"Error leyendo productos: {res['error']}")
             except Exception:
                 pass
+        self.page += 1
+        self._has_next = bool(res.get('has_next'))
+        self._next_cursor = res.get('cursor_siguiente')
+        if cursor is None:
+            self._total = res.get('total')
+        self._poblar(res.get('items') or [], append=cursor is not None)
+        self._actualizar_pie()
+        # restoring a saved view: load as many pages as were showing
+        if self._has_next and self.page < self._paginas_objetivo:
+            self.next_page()
+            return
+        self._paginas_objetivo = 1
+        self._restaurar_estado()
+        # the rows may not fill the view yet: nothing to scroll, so keep streaming
+        try:
+            self.after_idle(self._comprobar_final)
+        except Exception:
+            pass
 
-            # bind double-click to edit
+    def _poblar(self, items, append=False):
+        """Put `items` in the tree reusing rows (iid = product id) instead of recreating them."""
+        tree = self.tree
+        if append:
+            for it in items:
+                iid = str(it['id'])
+                if not tree.exists(iid):
+                    tree.insert('', 'end', iid=iid, values=self._valores_fila(it))
+        else:
+            nuevos = [str(it['id']) for it in items]
+            keep = set(nuevos)
+            sobran = [iid for iid in tree.get_children('') if iid not in keep]
+            if sobran:
+                tree.delete(*sobran)
+            for idx, it in enumerate(items):
+                iid = nuevos[idx]
+                vals = self._valores_fila(it)
+                if tree.exists(iid):
+                    tree.item(iid, values=vals)
+                    tree.move(iid, '', idx)
+                else:
+                    tree.insert('', idx, iid=iid, values=vals)
             try:
-                self.tree.bind('<Double-1>', self._on_tree_double_click)
+                tree.yview_moveto(0)
             except Exception:
                 pass
+        # record loaded ids for export when nothing is selected
+        try:
+            self._last_rendered_item_ids = [int(iid) for iid in tree.get_children('')]
+        except Exception:
+            self._last_rendered_item_ids = []
+
+    @staticmethod
+    def _valores_fila(it):
+        return (it.get('nombre',''), it.get('tipo',''), it.get('proveedor',''), it.get('categoria',''))
+
+    def _actualizar_pie(self):
+        try:
+            cargados = len(self.tree.get_children(''))
+            total = self._total
+            texto = f'{cargados} de {total} artículos' if total is not None else f'{cargados} artículos'
+            self._lbl_page.configure(text=texto)
+            self._btn_next.configure(state='normal' if self._has_next else 'disabled')
         except Exception:
             pass
 
-            # no manual visual update required; Treeview handles selection visuals
-        # Pagination controls
+    def _on_tree_scroll(self, first, last):
         try:
-            if getattr(self, '_pagination_frame', None):
-                self._pagination_frame.destroy()
+            self._vsb.set(first, last)
         except Exception:
             pass
-        self._pagination_frame = ctk.CTkFrame(self)
-        self._pagination_frame.pack(fill='x', padx=10, pady=(0,10))
-        # create prev/label/next with references so we can enable/disable
-        self._btn_prev = ctk.CTkButton(self._pagination_frame, text='◀ Anterior', command=self.prev_page)
-        self._btn_prev.pack(side='left', padx=6)
-        self._lbl_page = ctk.CTkLabel(self._pagination_frame, text=f'Página {self.page}')
-        self._lbl_page.pack(side='left', padx=6)
-        self._btn_next = ctk.CTkButton(self._pagination_frame, text='Siguiente ▶', command=self.next_page)
-        self._btn_next.pack(side='left', padx=6)
-        # configure state
+        # within the last tenth of what is loaded: fetch the next page
         try:
-            if getattr(self, 'page', 1) <= 1:
-                self._btn_prev.configure(state='disabled')
-            else:
-                self._btn_prev.configure(state='normal')
+            if float(last) >= 0.9:
+                self.next_page()
         except Exception:
             pass
+
+    def _comprobar_final(self):
         try:
-            if getattr(self, '_has_next', False):
-                self._btn_next.configure(state='normal')
-            else:
-                self._btn_next.configure(state='disabled')
+            if self.tree.yview()[1] >= 0.9:
+                self.next_page()
+        except Exception:
+            pass
+
+    def _restaurar_estado(self):
+        # if there's saved state from before (selection + yview), restore it
+        try:
+            state = getattr(self.controller, 'todos_articulos_state', None)
+            if not state:
+                return
+            sel = state.get('selected_id')
+            yv = state.get('yview')
+            if isinstance(yv, (int, float)):
+                try:
+                    self.tree.yview_moveto(float(yv))
+                except Exception:
+                    pass
+            if sel is not None:
+                try:
+                    sid = str(int(sel))
+                    if self.tree.exists(sid):
+                        self.tree.selection_set(sid)
+                        self.tree.see(sid)
+                except Exception:
+                    pass
+            # clear saved selection so subsequent navigations don't stale
+            try:
+                delattr(self.controller, 'todos_articulos_state')
+            except Exception:
+                try:
+                    self.controller.todos_articulos_state = None
+                except Exception:
+                    pass
         except Exception:
             pass
 
@@ -656,12 +736,8 @@ class TodosArticulos(ctk.CTkFrame):
         else:
             self.sort_by = key
             self.sort_desc = False
-        self.page = 1
         self.refresh()
 
-    def refresh(self):
-        self.render_list()
-
     # Export logic removed: centralized in `ExportarService`.
     # TODO: Integrar con `modulos.exportar_importar.exportar_service.ExportarService.exportar_a_csv`.
 
@@ -700,8 +776,8 @@ class TodosArticulos(ctk.CTkFrame):
                 except Exception:
                     pass
                 messagebox.showinfo('Borrar', f'Se han borrado {len(ids)} artículos seleccionados.')
+                self._cargar_valores_filtro()
                 self._clear_filters()
-                self.refresh()
             else:
                 messagebox.showerror('Error', 'No se pudieron borrar los artículos seleccionados.')
         except Exception as e:
@@ -728,23 +804,6 @@ class TodosArticulos(ctk.CTkFrame):
             except Exception:
                 pass
 
-    def next_page(self):
-        try:
-            if not getattr(self, '_has_next', False):
-                return
-            self.page = getattr(self, 'page', 1) + 1
-            self.refresh()
-        except Exception:
-            try:
-                self.page = getattr(self, 'page', 1)
-            except Exception:
-                pass
-
-    def prev_page(self):
-        if getattr(self, 'page', 1) > 1:
-            self.page -= 1
-        self.refresh()
-
     def exportar_csv(self):
         # Deprecated: use dialog-based export. Kept for API compatibility.
         try:
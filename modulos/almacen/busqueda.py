@@ -0,0 +1,62 @@
+"""Consultas de búsqueda de productos sobre las tablas FTS5.
+
+`database.ensure_busqueda_schema` crea `productos_fts` (palabras sin acentos,
+con prefijos) y `productos_tri` (trigramas de sku/EAN/nombre). Aquí se
+traduce lo que teclea el usuario a expresiones MATCH:
+
+- cada palabra se busca como prefijo (`"cami"*` encuentra "Camiseta") y
+  todas deben aparecer, en cualquier orden;
+- con 3 o más caracteres se añade la búsqueda por trigramas, que encuentra
+  trozos en medio de un SKU o un EAN.
+
+Si la base de datos no tiene las tablas (SQLite sin FTS5) `disponible()`
+devuelve False y los llamadores usan su LIKE de siempre.
+"""
+import re
+from typing import Optional, List, Tuple
+
+import database
+
+# pesos bm25 por columna: nombre, nombre_boton, sku, eans, categoria, proveedor
+PESOS_FTS = (10.0, 6.0, 8.0, 8.0, 2.0, 1.0)
+
+_PALABRA = re.compile(r'\w+', re.UNICODE)
+
+
+def disponible(db_path: Optional[str] = None) -> bool:
+    return bool(database.table_columns('productos_fts', db_path)) and bool(database.table_columns('productos_tri', db_path))
+
+
+def expresion_fts(texto: str) -> Optional[str]:
+    """'camis roj' -> '"camis"* "roj"*' (None si no hay palabras)."""
+    palabras = _PALABRA.findall(texto or '')
+    if not palabras:
+        return None
+    return ' '.join(f'"{p}"*' for p in palabras)
+
+
+def expresion_trigram(texto: str) -> Optional[str]:
+    """Subcadena literal para `productos_tri` (None si tiene menos de 3 caracteres)."""
+    t = (texto or '').strip()
+    if len(t) < 3:
+        return None
+    return '"' + t.replace('"', '""') + '"'
+
+
+def filtro_ids(texto: str) -> Tuple[Optional[str], List[str]]:
+    """Subconsulta `SELECT id` con los productos que casan con `texto` y sus parámetros.
+
+    Une palabras (FTS) y trigramas; devuelve (None, []) si no hay nada que buscar.
+    """
+    partes, params = [], []
+    fts = expresion_fts(texto)
+    if fts:
+        partes.append('SELECT rowid FROM productos_fts WHERE productos_fts MATCH ?')
+        params.append(fts)
+    tri = expresion_trigram(texto)
+    if tri:
+        partes.append('SELECT rowid FROM productos_tri WHERE productos_tri MATCH ?')
+        params.append(tri)
+    if not partes:
+        return None, []
+    return ' UNION '.join(partes), params
@@ -0,0 +1,126 @@
+"""Índice en memoria de los botones de venta rápida (selector SIN CÓDIGO).
+
+Guarda, para cada categoría y cada tipo, la lista de productos con precio
+activo que el selector pinta como botones, de modo que cambiar de categoría
+en la pantalla táctil no toca la base de datos. Se carga con una sola
+consulta (`cargar`, normalmente en un hilo de fondo al arrancar) y
+`ProductoService` lo invalida al guardar o eliminar productos; la siguiente
+lectura lo vuelve a cargar. Una invalidación que llega mientras una carga
+está leyendo la base de datos no se pierde: esa carga no marca el índice
+como cargado.
+
+Las categorías y tipos son pares (id, nombre): con `productos.<campo>_id`
+el id es el de la tabla maestra; los productos cuyo texto no enlaza con la
+maestra (o las bases sin esas columnas) salen con id None y su texto.
+"""
+import logging
+import threading
+from typing import Optional, Dict, List, Tuple, Any
+
+import database
+
+logger = logging.getLogger(__name__)
+
+# (producto_id, nombre_boton, nombre, pvp)
+Boton = Tuple[int, Any, Any, float]
+Clave = Tuple[Optional[int], str]
+
+
+def _sql_productos(columnas) -> str:
+    select = ['p.id', 'p.nombre_boton', 'p.nombre', 'pr.pvp']
+    joins = ['JOIN precios pr ON p.id = pr.producto_id AND pr.activo = 1']
+    for campo, tabla in (('categoria', 'categorias'), ('tipo', 'tipos')):
+        if f'{campo}_id' in columnas:
+            alias = f'm_{campo}'
+            select += [f'{alias}.id', f'COALESCE({alias}.nombre, p.{campo})']
+            joins.append(f'LEFT JOIN {tabla} {alias} ON {alias}.id = p.{campo}_id')
+        else:
+            select += ['NULL', f'p.{campo}']
+    return f"SELECT {', '.join(select)} FROM productos p {' '.join(joins)} ORDER BY p.nombre_boton"
+
+
+class IndiceBotones:
+    """Mapas categoría -> botones y tipo -> botones para el selector sin código."""
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._por_categoria: Dict[Clave, List[Boton]] = {}
+        self._por_tipo: Dict[Clave, List[Boton]] = {}
+        self.cargado = False
+        # sube en cada invalidar(); una carga empezada antes no deja el índice por bueno
+        self._generacion = 0
+
+    def cargar(self, db_path: Optional[str] = None) -> bool:
+        """Carga (o recarga) el índice completo con una consulta."""
+        with self._lock:
+            generacion = self._generacion
+        conn = None
+        try:
+            conn = database.connect(db_path)
+            cur = conn.cursor()
+            cur.execute(_sql_productos(database.product_schema(db_path)['columns']))
+            por_categoria = {}
+            por_tipo = {}
+            for pid, nombre_boton, nombre, pvp, cat_id, cat, tipo_id, tipo in cur.fetchall():
+                boton = (pid, nombre_boton, nombre, float(pvp or 0.0))
+                # sólo los productos con nombre de botón salen por categoría
+                if cat and nombre_boton:
+                    por_categoria.setdefault((cat_id, cat), []).append(boton)
+                if tipo:
+                    por_tipo.setdefault((tipo_id, tipo), []).append(boton)
+            with self._lock:
+                self._por_categoria = por_categoria
+                self._por_tipo = por_tipo
+                self.cargado = generacion == self._generacion
+            logger.info('Índice de botones cargado: %s categorías, %s tipos', len(por_categoria), len(por_tipo))
+            return True
+        except Exception:
+            logger.exception('Error cargando índice de botones')
+            return False
+        finally:
+            try:
+                if conn:
+                    conn.close()
+            except Exception:
+                pass
+
+    def cargar_en_segundo_plano(self, db_path: Optional[str] = None):
+        """Lanza `cargar` en un hilo daemon (para no retrasar el arranque)."""
+        t = threading.Thread(target=self.cargar, args=(db_path,), daemon=True)
+        t.start()
+        return t
+
+    def invalidar(self):
+        """Marca el índice como desactualizado; se recarga en la próxima lectura."""
+        with self._lock:
+            self._generacion += 1
+            self.cargado = False
+
+    def categorias(self) -> List[Clave]:
+        with self._lock:
+            self._asegurar()
+            return sorted(self._por_categoria, key=lambda c: c[1])
+
+    def tipos(self) -> List[Clave]:
+        with self._lock:
+            self._asegurar()
+            return sorted(self._por_tipo, key=lambda t: t[1])
+
+    def productos_categoria(self, categoria: Clave) -> List[Boton]:
+        with self._lock:
+            self._asegurar()
+            return list(self._por_categoria.get(tuple(categoria), ()))
+
+    def productos_tipo(self, tipo: Clave) -> List[Boton]:
+        with self._lock:
+            self._asegurar()
+            return list(self._por_tipo.get(tuple(tipo), ()))
+
+    # --- helpers (llamar con el lock tomado) ---
+    def _asegurar(self):
+        if not self.cargado:
+            self.cargar()
+
+
+# Instancia compartida por el proceso (ver ProductoService y SelectorSinCodigo)
+indice_botones = IndiceBotones()
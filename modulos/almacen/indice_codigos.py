@@ -0,0 +1,194 @@
+"""Índice en memoria código -> producto para el escáner del TPV.
+
+Mantiene en un dict todos los SKU y EAN (`codigos_barras`) apuntando al
+producto con su precio activo, de modo que `ProductoService.buscar_por_codigo`
+resuelve un escaneo sin tocar la base de datos. El índice se carga al arrancar
+(`cargar`, normalmente en un hilo de fondo) y `ProductoService` lo mantiene al
+día al guardar o eliminar productos.
+
+Si el índice aún no está cargado, o el código no está en él, el servicio cae
+a la consulta SQL de siempre; así un producto creado por otro proceso sigue
+encontrándose y se añade al índice.
+
+Los productos actualizados o eliminados mientras una carga lee la base de
+datos conservan su entrada reciente: la carga no los pisa con su foto
+anterior (y si el índice se vacía entre tanto, la carga se descarta).
+"""
+import logging
+import threading
+from typing import Optional, Dict, Any, Iterable, List
+
+import database
+
+logger = logging.getLogger(__name__)
+
+_SELECT_PRODUCTOS = '''
+    SELECT p.nombre, pr.pvp AS precio, p.sku, p.tipo_iva, p.id, COALESCE(p.pvp_variable,0) as pvp_variable
+    FROM productos p
+    JOIN precios pr ON p.id = pr.producto_id
+    WHERE pr.activo = 1
+'''
+
+
+class IndiceCodigos:
+    """Mapa código (SKU o EAN) -> datos del producto para el escáner."""
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._productos: Dict[int, Dict[str, Any]] = {}
+        self._por_sku: Dict[str, int] = {}
+        self._por_ean: Dict[str, int] = {}
+        self._eans_de: Dict[int, set] = {}
+        self.cargado = False
+        # ids tocados durante cada carga en curso; sube en cada vaciar()
+        self._cambios_carga: List[set] = []
+        self._generacion = 0
+
+    def cargar(self, db_path: Optional[str] = None) -> bool:
+        """Carga (o recarga) el índice completo con dos consultas."""
+        cambios = set()
+        with self._lock:
+            generacion = self._generacion
+            self._cambios_carga.append(cambios)
+        conn = None
+        try:
+            conn = database.connect(db_path)
+            cur = conn.cursor()
+            cur.execute(_SELECT_PRODUCTOS)
+            productos = {}
+            por_sku = {}
+            for r in cur.fetchall():
+                d = {k: r[k] for k in r.keys()}
+                productos[d['id']] = d
+                if d.get('sku'):
+                    por_sku[str(d['sku'])] = d['id']
+            cur.execute('SELECT producto_id, ean FROM codigos_barras')
+            por_ean = {}
+            eans_de = {}
+            for pid, ean in cur.fetchall():
+                if ean and pid in productos:
+                    por_ean[str(ean)] = pid
+                    eans_de.setdefault(pid, set()).add(str(ean))
+            with self._lock:
+                if generacion != self._generacion:
+                    logger.info('Índice de códigos vaciado durante la carga; se descarta')
+                    return False
+                anteriores, eans_anteriores = self._productos, self._eans_de
+                self._productos = productos
+                self._por_sku = por_sku
+                self._por_ean = por_ean
+                self._eans_de = eans_de
+                # lo actualizado mientras se leía es más reciente que la foto cargada
+                for pid in cambios:
+                    self._quitar(pid)
+                    if pid in anteriores:
+                        self._poner(anteriores[pid], eans_anteriores.get(pid))
+                self.cargado = True
+            logger.info('Índice de códigos cargado: %s productos, %s EAN', len(productos), len(por_ean))
+            return True
+        except Exception:
+            logger.exception('Error cargando índice de códigos')
+            return False
+        finally:
+            with self._lock:
+                self._cambios_carga.remove(cambios)
+            try:
+                if conn:
+                    conn.close()
+            except Exception:
+                pass
+
+    def cargar_en_segundo_plano(self, db_path: Optional[str] = None):
+        """Lanza `cargar` en un hilo daemon (para no retrasar el arranque)."""
+        t = threading.Thread(target=self.cargar, args=(db_path,), daemon=True)
+        t.start()
+        return t
+
+    def buscar(self, codigo: str) -> Optional[Dict[str, Any]]:
+        """Devuelve una copia del producto para `codigo` o None. El SKU tiene prioridad."""
+        if codigo is None:
+            return None
+        codigo = str(codigo)
+        with self._lock:
+            pid = self._por_sku.get(codigo)
+            if pid is None:
+                pid = self._por_ean.get(codigo)
+            prod = self._productos.get(pid) if pid is not None else None
+            return dict(prod) if prod else None
+
+    def actualizar_producto(self, producto_id: int, db_path: Optional[str] = None):
+        """Relee un producto (precio activo y EANs) y actualiza sus entradas."""
+        conn = None
+        try:
+            conn = database.connect(db_path)
+            cur = conn.cursor()
+            cur.execute(_SELECT_PRODUCTOS + ' AND p.id = ? LIMIT 1', (producto_id,))
+            r = cur.fetchone()
+            prod = {k: r[k] for k in r.keys()} if r else None
+            eans = []
+            if prod:
+                cur.execute('SELECT ean FROM codigos_barras WHERE producto_id=?', (producto_id,))
+                eans = [str(e[0]) for e in cur.fetchall() if e[0]]
+            with self._lock:
+                self._marcar(producto_id)
+                self._quitar(producto_id)
+                if prod:
+                    self._poner(prod, eans)
+        except Exception:
+            logger.exception('Error actualizando índice de códigos para producto id=%s', producto_id)
+            # ante la duda, que el escáner vaya a la BD para este producto
+            with self._lock:
+                self._marcar(producto_id)
+                self._quitar(producto_id)
+        finally:
+            try:
+                if conn:
+                    conn.close()
+            except Exception:
+                pass
+
+    def eliminar(self, ids: Iterable[int]):
+        with self._lock:
+            for pid in ids:
+                try:
+                    pid = int(pid)
+                except (TypeError, ValueError):
+                    continue
+                self._marcar(pid)
+                self._quitar(pid)
+
+    def vaciar(self):
+        """Deja el índice vacío pero cargado (tras vaciar el inventario)."""
+        with self._lock:
+            self._generacion += 1
+            self._productos = {}
+            self._por_sku = {}
+            self._por_ean = {}
+            self._eans_de = {}
+
+    # --- helpers (llamar con el lock tomado) ---
+    def _marcar(self, producto_id):
+        for cambios in self._cambios_carga:
+            cambios.add(producto_id)
+
+    def _quitar(self, producto_id):
+        prod = self._productos.pop(producto_id, None)
+        if prod and prod.get('sku') and self._por_sku.get(str(prod['sku'])) == producto_id:
+            del self._por_sku[str(prod['sku'])]
+        for ean in self._eans_de.pop(producto_id, ()):
+            if self._por_ean.get(ean) == producto_id:
+                del self._por_ean[ean]
+
+    def _poner(self, prod, eans):
+        pid = prod['id']
+        self._productos[pid] = prod
+        if prod.get('sku'):
+            self._por_sku[str(prod['sku'])] = pid
+        if eans:
+            self._eans_de[pid] = set(eans)
+            for ean in eans:
+                self._por_ean[ean] = pid
+
+
+# Instancia compartida por el proceso (ver ProductoService)
+indice_codigos = IndiceCodigos()
@@ -1,11 +1,58 @@
 from typing import Optional, List, Dict, Any
 import logging
 import sqlite3
+import json
+import threading
 import database
 from datetime import datetime
+from modulos.almacen.indice_codigos import indice_codigos
+from modulos.almacen.indice_botones import indice_botones
+from modulos.almacen.articulos import dao_articulos
+from modulos.almacen import busqueda
 
 logger = logging.getLogger(__name__)
 
+# SKU y EAN como dos búsquedas por índice (un OR entre tablas obliga a recorrer
+# productos); `prio` da preferencia al SKU igual que el índice en memoria.
+SQL_BUSCAR_POR_CODIGO = '''
+    SELECT nombre, precio, sku, tipo_iva, id, pvp_variable FROM (
+        SELECT 0 AS prio, p.nombre, pr.pvp AS precio, p.sku, p.tipo_iva, p.id, COALESCE(p.pvp_variable,0) as pvp_variable
+        FROM productos p
+        JOIN precios pr ON p.id = pr.producto_id
+        WHERE p.sku = ? AND pr.activo = 1
+        UNION ALL
+        SELECT 1 AS prio, p.nombre, pr.pvp AS precio, p.sku, p.tipo_iva, p.id, COALESCE(p.pvp_variable,0) as pvp_variable
+        FROM codigos_barras cb
+        JOIN productos p ON p.id = cb.producto_id
+        JOIN precios pr ON p.id = pr.producto_id
+        WHERE cb.ean = ? AND pr.activo = 1
+    )
+    ORDER BY prio
+    LIMIT 1
+'''
+
+# totales del catálogo por filtros (ver ProductoService.contar_productos);
+# se vacía cada vez que el servicio crea, modifica o borra productos
+_totales_cache: Dict[tuple, int] = {}
+_totales_lock = threading.Lock()
+# sube con cada cambio del catálogo; las pantallas que se conservan abiertas
+# lo comparan al volver a mostrarse (ver version_catalogo)
+_version_catalogo = 0
+
+
+def _invalidar_totales():
+    global _version_catalogo
+    with _totales_lock:
+        _totales_cache.clear()
+        _version_catalogo += 1
+    # los botones del selector sin código se recargan en la próxima lectura
+    indice_botones.invalidar()
+
+
+def version_catalogo() -> int:
+    """Contador de cambios del catálogo hechos por ProductoService en este proceso."""
+    return _version_catalogo
+
 
 class ProductoService:
     """Service for product lookups used by the UI/services.
@@ -23,27 +70,62 @@ class ProductoService:
         return {k: row[k] for k in row.keys()}
 
     def buscar_por_codigo(self, codigo: str) -> Optional[Dict[str, Any]]:
-        """Search product by exact SKU or EAN. Returns a dict or None."""
+        """Search product by exact SKU or EAN. Returns a dict or None.
+
+        Tries the in-memory `indice_codigos` first and falls back to SQL on a miss.
+        """
+        prod = indice_codigos.buscar(codigo)
+        if prod:
+            return prod
         try:
             with database.connect() as conn:
                 conn.row_factory = sqlite3.Row
                 cur = conn.cursor()
-                cur.execute('''
-                    SELECT p.nombre, pr.pvp AS precio, p.sku, p.tipo_iva, p.id, COALESCE(p.pvp_variable,0) as pvp_variable
-                    FROM productos p
-                    JOIN precios pr ON p.id = pr.producto_id
-                    LEFT JOIN codigos_barras cb ON p.id = cb.producto_id
-                    WHERE (p.sku = ? OR cb.ean = ?) AND pr.activo = 1
-                    LIMIT 1
-                ''', (codigo, codigo))
+                cur.execute(SQL_BUSCAR_POR_CODIGO, (codigo, codigo))
                 row = cur.fetchone()
-                return self._row_to_dict(row)
+            prod = self._row_to_dict(row)
+            if prod and indice_codigos.cargado:
+                indice_codigos.actualizar_producto(prod['id'])
+            return prod
         except Exception:
             logger.exception('Error buscando producto por código: %s', codigo)
             return None
 
     def buscar_por_nombre(self, texto: str, limit: int = 30) -> List[Dict[str, Any]]:
-        """Search products by name or sku using LIKE. Returns list of dicts."""
+        """Search products by name, button name, sku, EAN, category or provider.
+
+        Uses the FTS5 index (ranked, prefix-as-you-type, accent-insensitive);
+        if no word matches, tries the trigram index for partial SKU/EAN text.
+        Falls back to LIKE on name/sku when the index is not available.
+        """
+        if busqueda.disponible():
+            try:
+                pesos = ', '.join(str(w) for w in busqueda.PESOS_FTS)
+                consultas = (
+                    (busqueda.expresion_fts(texto), f'SELECT rowid AS id, bm25(productos_fts, {pesos}) AS rank FROM productos_fts WHERE productos_fts MATCH ?'),
+                    (busqueda.expresion_trigram(texto), 'SELECT rowid AS id, rank FROM productos_tri WHERE productos_tri MATCH ?'),
+                )
+                with database.connect() as conn:
+                    conn.row_factory = sqlite3.Row
+                    cur = conn.cursor()
+                    for expr, sql_ids in consultas:
+                        if not expr:
+                            continue
+                        cur.execute(f'''
+                            SELECT p.nombre, pr.pvp AS precio, p.sku, p.tipo_iva, p.id, COALESCE(p.pvp_variable,0) as pvp_variable
+                            FROM ({sql_ids}) r
+                            JOIN productos p ON p.id = r.id
+                            JOIN precios pr ON p.id = pr.producto_id
+                            WHERE pr.activo = 1
+                            ORDER BY r.rank
+                            LIMIT ?
+                        ''', (expr, limit))
+                        rows = cur.fetchall()
+                        if rows:
+                            return [self._row_to_dict(r) for r in rows]
+                    return []
+            except sqlite3.OperationalError:
+                logger.exception('Error en búsqueda FTS de productos: %s; se usa LIKE', texto)
         try:
             like = f"%{texto}%"
             with database.connect() as conn:
@@ -82,6 +164,46 @@ class ProductoService:
             logger.exception('Error obteniendo producto id=%s', producto_id)
             return None
 
+    def obtener_atributos_fidelizacion(self, ids: List[Any], skus: List[str]) -> Dict[str, Dict[Any, Dict[str, Any]]]:
+        """Bulk fetch of categoria/tipo/fide_puntos_fijos for the given ids and SKUs.
+
+        Returns {'por_id': {id: attrs}, 'por_sku': {sku: attrs}}; ids that are
+        not integers (discount lines) are ignored. One query for the whole cart.
+        """
+        out = {'por_id': {}, 'por_sku': {}}
+        ids_ok = []
+        for i in ids or []:
+            try:
+                ids_ok.append(int(i))
+            except (TypeError, ValueError):
+                continue
+        skus_ok = [str(s) for s in (skus or []) if s]
+        if not ids_ok and not skus_ok:
+            return out
+        try:
+            cols = database.table_columns('productos')
+            select = ['id', 'sku'] + [
+                (c if c in cols else f'NULL AS {c}') for c in ('categoria', 'tipo', 'fide_puntos_fijos')
+            ]
+            # los parámetros se pasan como JSON para no depender del número de variables
+            with database.connect() as conn:
+                conn.row_factory = sqlite3.Row
+                cur = conn.cursor()
+                cur.execute(
+                    f"SELECT {', '.join(select)} FROM productos "
+                    "WHERE id IN (SELECT value FROM json_each(?)) OR sku IN (SELECT value FROM json_each(?))",
+                    (json.dumps(ids_ok), json.dumps(skus_ok)),
+                )
+                for r in cur.fetchall():
+                    d = self._row_to_dict(r)
+                    out['por_id'][d['id']] = d
+                    if d.get('sku'):
+                        out['por_sku'][str(d['sku'])] = d
+            return out
+        except Exception:
+            logger.exception('Error obteniendo atributos de fidelización de %s productos', len(ids_ok) + len(skus_ok))
+            return out
+
     def guardar_producto(self, datos_producto: Dict[str, Any], lista_eans: List[str], lista_imagenes: List[str]) -> Optional[int]:
         """Guarda o actualiza un producto de forma transaccional.
 
@@ -115,12 +237,9 @@ class ProductoService:
 
             with database.connect() as conn:
                 cur = conn.cursor()
-                # inspeccionar columnas existentes para operaciones condicionales
-                try:
-                    cur.execute('PRAGMA table_info(productos)')
-                    cols = [c[1] for c in cur.fetchall()]
-                except Exception:
-                    cols = []
+                # columnas existentes (cacheadas en database) para operaciones condicionales
+                schema = database.product_schema()
+                cols = schema['columns']
 
                 # Inserción/actualización base (sin campos opcionales que pueden no existir)
                 if not prod_id:
@@ -165,15 +284,12 @@ class ProductoService:
 
                 # Lógica dinámica para campo 'tipo' (buscar column candidates y actualizar)
                 tipo_val = datos_producto.get('tipo') or datos_producto.get('tipo_sel') or datos_producto.get('tipo_id')
-                if tipo_val is not None:
-                    tipo_candidates = ['tipo', 'tipo_id', 'id_tipo', 'tipo_shop']
-                    for tc in tipo_candidates:
-                        if tc in cols:
-                            try:
-                                cur.execute(f'UPDATE productos SET {tc}=? WHERE id=?', (tipo_val, prod_id))
-                            except Exception:
-                                logger.debug('No se pudo actualizar columna tipo %s para producto %s', tc, prod_id)
-                            break
+                tc = schema['tipo_col']
+                if tipo_val is not None and tc:
+                    try:
+                        cur.execute(f'UPDATE productos SET {tc}=? WHERE id=?', (tipo_val, prod_id))
+                    except Exception:
+                        logger.debug('No se pudo actualizar columna tipo %s para producto %s', tc, prod_id)
 
                 # Precios: desactivar antiguos e insertar nuevo registro
                 try:
@@ -212,6 +328,8 @@ class ProductoService:
                     conn.commit()
                 except Exception:
                     logger.debug('No se pudo hacer commit explicito para producto id=%s', prod_id)
+            indice_codigos.actualizar_producto(int(prod_id))
+            _invalidar_totales()
             return int(prod_id)
         except Exception:
             logger.exception('Error guardando producto: %s', datos_producto.get('sku') if isinstance(datos_producto, dict) else datos_producto)
@@ -228,12 +346,6 @@ class ProductoService:
                 prod_row = cur.fetchone()
                 producto = dict(prod_row) if prod_row else {}
 
-                # inspeccionar columnas
-                try:
-                    cur.execute('PRAGMA table_info(productos)')
-                    cols = [c[1] for c in cur.fetchall()]
-                except Exception:
-                    cols = []
 
                 # precio activo
                 precio = None
@@ -273,22 +385,9 @@ class ProductoService:
                 except Exception:
                     historial = []
 
-                # valor del campo tipo si existe
-                tipo_val = None
-                try:
-                    tipo_candidates = ['tipo', 'tipo_id', 'id_tipo', 'tipo_shop']
-                    for tc in tipo_candidates:
-                        if tc in cols:
-                            try:
-                                cur.execute(f'SELECT {tc} FROM productos WHERE id=? LIMIT 1', (producto_id,))
-                                tr = cur.fetchone()
-                                if tr:
-                                    tipo_val = tr[0] if not isinstance(tr, sqlite3.Row) else tr[tc]
-                            except Exception:
-                                tipo_val = None
-                            break
-                except Exception:
-                    tipo_val = None
+                # valor del campo tipo si existe (ya viene en SELECT *)
+                tc = database.product_schema()['tipo_col']
+                tipo_val = producto.get(tc) if tc else None
 
                 return {
                     'producto': producto,
@@ -351,15 +450,13 @@ class ProductoService:
         """Obtiene todos los nombres de columna de la tabla `productos`.
 
         Retorna una lista de strings con los nombres de columna en el orden
-        reportado por PRAGMA table_info(productos).
+        reportado por PRAGMA table_info(productos) (cacheado en `database`).
         """
         try:
             with database.connect() as conn:
                 cur = conn.cursor()
                 try:
-                    cur.execute('PRAGMA table_info(productos)')
-                    rows = cur.fetchall()
-                    cols = [r[1] for r in rows]
+                    cols = database.table_columns('productos')
                     # Si existe una tabla de códigos de barras, exponer una columna virtual
                     # `codigo_barras` que agrupa los EANs asociados (soportado por
                     # `obtener_productos_por_ids_columnas` mediante LEFT JOIN + GROUP_CONCAT)
@@ -394,12 +491,8 @@ class ProductoService:
                 conn.row_factory = sqlite3.Row
                 cur = conn.cursor()
 
-                # detectar columnas reales de la tabla productos
-                try:
-                    cur.execute('PRAGMA table_info(productos)')
-                    prod_cols = [r[1] for r in cur.fetchall()]
-                except Exception:
-                    prod_cols = []
+                # columnas reales de la tabla productos
+                prod_cols = database.table_columns('productos')
 
                 select_parts = []
                 join_cb = False
@@ -464,166 +557,96 @@ class ProductoService:
                     conn.commit()
                 except Exception:
                     logger.debug('No se pudo hacer commit explicito al eliminar producto id=%s', producto_id)
+            indice_codigos.eliminar([producto_id])
+            _invalidar_totales()
             return True
         except Exception:
             logger.exception('Error eliminando producto id=%s', producto_id)
             return False
 
+    @staticmethod
+    def _filtros_catalogo(filtros: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            'search': filtros.get('search') or filtros.get('nombre') or '',
+            'proveedor': filtros.get('proveedor') or '',
+            'categoria': filtros.get('categoria') or '',
+            'tipo': filtros.get('tipo') or '',
+        }
+
     def obtener_productos_paginados(self, filtros: Dict[str, Any]) -> List[Dict[str, Any]]:
         """Devuelve una lista de productos paginada según los filtros.
 
         `filtros` puede contener: 'search'|'nombre' (texto), 'proveedor', 'categoria',
         'tipo', 'pagina' (int), 'tamaño_pagina'|'page_size' (int), 'orden'|'sort_by', 'orden_desc'|'sort_desc' (bool).
+
+        Pagina con OFFSET; para recorrer el catálogo usar `obtener_pagina_productos`,
+        que no se ralentiza en las páginas profundas.
         """
         try:
-            page = int(filtros.get('pagina') or filtros.get('page') or 1)
-            page_size = int(filtros.get('tamaño_pagina') or filtros.get('page_size') or filtros.get('pageSize') or 100)
-            search = filtros.get('search') or filtros.get('nombre') or ''
-            proveedor = filtros.get('proveedor') or ''
-            categoria = filtros.get('categoria') or ''
-            tipo = filtros.get('tipo') or ''
-            sort_by = filtros.get('orden') or filtros.get('sort_by')
-            sort_desc = bool(filtros.get('orden_desc') or filtros.get('sort_desc') or False)
-
-            with database.connect() as conn:
-                conn.row_factory = sqlite3.Row
-                cur = conn.cursor()
-
-                # detectar columnas disponibles
-                try:
-                    cur.execute("PRAGMA table_info(productos)")
-                    prod_cols = [r[1] for r in cur.fetchall()]
-                except Exception:
-                    prod_cols = []
-
-                name_col = 'nombre' if 'nombre' in prod_cols else ('name' if 'name' in prod_cols else None)
-                sku_col = None
-                for sc in ['sku', 'codigo', 'codigo_barra', 'codigo_barras']:
-                    if sc in prod_cols:
-                        sku_col = sc
-                        break
-
-                select_parts = ['p.id']
-                if name_col:
-                    select_parts.append(f'p.{name_col} as nombre')
-                else:
-                    select_parts.append("'' as nombre")
-                if sku_col:
-                    select_parts.append(f'p.{sku_col} as sku')
-                else:
-                    select_parts.append("'' as sku")
-
-                select_parts.extend([
-                    'p.categoria as categoria_raw',
-                    'COALESCE(cat.nombre, p.categoria, "") as categoria_nombre',
-                    'p.proveedor as proveedor_raw',
-                    'COALESCE(prov.nombre, p.proveedor, "") as proveedor_nombre',
-                    'pr.pvp as pvp',
-                    'pr.coste as coste'
-                ])
-
-                tipo_col = None
-                for tc in ['tipo', 'tipo_id', 'id_tipo', 'tipo_shop']:
-                    if tc in prod_cols:
-                        tipo_col = tc
-                        break
-                if tipo_col:
-                    # insertar antes de pvp/coste
-                    select_parts.insert(-2, f'p.{tipo_col} as tipo_raw')
-                    select_parts.insert(-2, f'COALESCE(t.nombre, p.{tipo_col}, "") as tipo_nombre')
+            return dao_articulos.get_products_page(
+                None,
+                page=int(filtros.get('pagina') or filtros.get('page') or 1),
+                page_size=int(filtros.get('tamaño_pagina') or filtros.get('page_size') or filtros.get('pageSize') or 100),
+                sort_by=filtros.get('orden') or filtros.get('sort_by'),
+                sort_desc=bool(filtros.get('orden_desc') or filtros.get('sort_desc') or False),
+                **self._filtros_catalogo(filtros),
+            )
+        except Exception:
+            logger.exception('Error preparando filtros para obtener productos paginados')
+            return []
 
-                sql = 'SELECT ' + ', '.join(select_parts) + ' FROM productos p '
-                sql += 'LEFT JOIN precios pr ON p.id = pr.producto_id AND pr.activo = 1 '
-                sql += 'LEFT JOIN categorias cat ON (p.categoria = cat.nombre OR p.categoria = cat.id) '
-                sql += 'LEFT JOIN proveedores prov ON (p.proveedor = prov.nombre OR p.proveedor = prov.id) '
-                if tipo_col:
-                    sql += f'LEFT JOIN tipos t ON (p.{tipo_col} = t.nombre OR p.{tipo_col} = t.id) '
-
-                params = []
-                where_clauses = []
-                if search:
-                    qlike = f"%{search}%"
-                    sub = []
-                    if name_col:
-                        sub.append(f'p.{name_col} LIKE ?')
-                    if sku_col:
-                        sub.append(f'p.{sku_col} LIKE ?')
-                    if sub:
-                        where_clauses.append('(' + ' OR '.join(sub) + ')')
-                        for _ in sub:
-                            params.append(qlike)
-
-                def _apply_filter_expr(expr, value):
-                    if not value:
-                        return
-                    where_clauses.append(expr)
-                    params.extend([value, value])
-
-                _apply_filter_expr('(LOWER(p.proveedor) = LOWER(?) OR LOWER(prov.nombre) = LOWER(?))', proveedor)
-                _apply_filter_expr('(LOWER(p.categoria) = LOWER(?) OR LOWER(cat.nombre) = LOWER(?))', categoria)
-                if tipo_col:
-                    _apply_filter_expr(f'(LOWER(p.{tipo_col}) = LOWER(?) OR LOWER(t.nombre) = LOWER(?))', tipo)
-
-                if where_clauses:
-                    sql += ' WHERE ' + ' AND '.join(where_clauses)
-
-                if sort_by:
-                    sort_map = {
-                        'nombre': 'nombre',
-                        'categoria': 'categoria_nombre',
-                        'proveedor': 'proveedor_nombre',
-                        'tipo': 'tipo_nombre'
-                    }
-                    sort_col = sort_map.get(sort_by, 'nombre')
-                    sql += f" ORDER BY {sort_col} {'DESC' if sort_desc else 'ASC'}"
-
-                if page_size:
-                    offset = (max(1, page) - 1) * page_size
-                    sql += f" LIMIT {page_size} OFFSET {offset}"
+    def obtener_pagina_productos(self, filtros: Dict[str, Any], cursor: Optional[str] = None,
+                                 incluir_total: bool = False) -> Dict[str, Any]:
+        """Página del catálogo por keyset (orden, id) en lugar de OFFSET.
 
-                try:
-                    cur.execute(sql, params)
-                    rows = cur.fetchall()
-                except Exception:
-                    logger.exception('Error ejecutando consulta paginada de productos')
-                    return []
+        `filtros` como en `obtener_productos_paginados` (sin 'pagina'). `cursor`
+        es el `cursor_siguiente` de la página anterior (None = primera página);
+        un cursor de otro orden se ignora y se empieza desde el principio.
 
-                items = []
-                for r in rows:
-                    try:
-                        _id = r['id'] if 'id' in r.keys() else r[0]
-                        nombre = r['nombre'] if 'nombre' in r.keys() else (r[1] if len(r) > 1 else '')
-                        sku = r['sku'] if 'sku' in r.keys() else (r[2] if len(r) > 2 else '')
-                        categoria_nombre = r['categoria_nombre'] if 'categoria_nombre' in r.keys() else ''
-                        proveedor_nombre = r['proveedor_nombre'] if 'proveedor_nombre' in r.keys() else ''
-                        tipo_nombre = r['tipo_nombre'] if 'tipo_nombre' in r.keys() else ''
-                    except Exception:
-                        # fallback por índice si no es Row
-                        _id = r[0]
-                        nombre = r[1] if len(r) > 1 else ''
-                        sku = r[2] if len(r) > 2 else ''
-                        categoria_nombre = r[4] if len(r) > 4 else ''
-                        proveedor_nombre = r[6] if len(r) > 6 else ''
-                        tipo_nombre = r[8] if len(r) > 8 else ''
-                    items.append({
-                        'id': _id,
-                        'nombre': nombre or '',
-                        'sku': sku or '',
-                        'categoria': categoria_nombre or '',
-                        'proveedor': proveedor_nombre or '',
-                        'tipo': tipo_nombre or ''
-                    })
-
-                return items
+        Devuelve {'items', 'has_next', 'cursor_siguiente', 'total'}; `total` sólo
+        se calcula con `incluir_total` y sale de `contar_productos` (cacheado).
+        """
+        res = {'items': [], 'has_next': False, 'cursor_siguiente': None, 'total': None}
+        try:
+            pagina = dao_articulos.get_products_keyset(
+                None,
+                cursor=cursor,
+                page_size=int(filtros.get('tamaño_pagina') or filtros.get('page_size') or filtros.get('pageSize') or 100),
+                sort_by=filtros.get('orden') or filtros.get('sort_by'),
+                sort_desc=bool(filtros.get('orden_desc') or filtros.get('sort_desc') or False),
+                **self._filtros_catalogo(filtros),
+            )
+            res.update(items=pagina['items'], has_next=pagina['has_next'], cursor_siguiente=pagina['next_cursor'])
         except Exception:
-            logger.exception('Error preparando filtros para obtener productos paginados')
-            return []
+            logger.exception('Error obteniendo página de productos')
+            return res
+        if incluir_total:
+            res['total'] = self.contar_productos(filtros)
+        return res
+
+    def contar_productos(self, filtros: Dict[str, Any]) -> Optional[int]:
+        """Número de productos que cumplen los filtros (cacheado hasta que el servicio cambie el catálogo)."""
+        f = self._filtros_catalogo(filtros)
+        clave = (database.DB_PATH, f['search'], f['proveedor'].lower(), f['categoria'].lower(), f['tipo'].lower())
+        with _totales_lock:
+            if clave in _totales_cache:
+                return _totales_cache[clave]
+        try:
+            total = dao_articulos.count_products(None, **f)
+        except Exception:
+            logger.exception('Error contando productos')
+            return None
+        with _totales_lock:
+            _totales_cache[clave] = total
+        return total
 
     def obtener_valores_unicos(self, columna: str) -> List[str]:
         """Devuelve valores distintos para la columna indicada (para usar en filtros).
 
         Para 'categoria', 'proveedor' y 'tipo' intenta primero las tablas maestras
         ('categorias','proveedores','tipos') y si no existen, hace DISTINCT desde productos.
+        Con las claves enteras (`categoria_id`...) devuelve los nombres de la maestra
+        más los textos de productos que no enlazan con ninguna fila.
         """
         try:
             with database.connect() as conn:
@@ -631,6 +654,25 @@ class ProductoService:
                 cur = conn.cursor()
 
                 col = columna.lower()
+                # (columna de productos, tabla maestra) por nombre aceptado
+                rel = {
+                    'proveedor': ('proveedor', 'proveedores'), 'proveedores': ('proveedor', 'proveedores'),
+                    'categoria': ('categoria', 'categorias'), 'categorias': ('categoria', 'categorias'),
+                    'tipo': ('tipo', 'tipos'), 'tipos': ('tipo', 'tipos'),
+                }.get(col)
+                if rel and f'{rel[0]}_id' in database.product_schema()['columns']:
+                    campo, tabla = rel
+                    try:
+                        cur.execute(f'''
+                            SELECT nombre FROM {tabla} WHERE nombre IS NOT NULL AND nombre != ''
+                            UNION
+                            SELECT {campo} FROM productos WHERE {campo}_id IS NULL AND {campo} IS NOT NULL AND {campo} != ''
+                            ORDER BY 1
+                        ''')
+                        return [r[0] for r in cur.fetchall()]
+                    except Exception:
+                        pass
+
                 # proveedores
                 if col in ('proveedor', 'proveedores'):
                     try:
@@ -670,13 +712,7 @@ class ProductoService:
                         pass
                     # fallback: detectar columna tipo en productos
                     try:
-                        cur.execute('PRAGMA table_info(productos)')
-                        prod_cols = [r[1] for r in cur.fetchall()]
-                        tipo_col = None
-                        for tc in ['tipo', 'tipo_id', 'id_tipo', 'tipo_shop']:
-                            if tc in prod_cols:
-                                tipo_col = tc
-                                break
+                        tipo_col = database.product_schema()['tipo_col']
                         if tipo_col:
                             cur.execute(f"SELECT DISTINCT {tipo_col} FROM productos WHERE {tipo_col} IS NOT NULL AND {tipo_col} != '' ORDER BY {tipo_col}")
                             return [r[0] for r in cur.fetchall()]
@@ -745,6 +781,8 @@ class ProductoService:
                     conn.commit()
                 except Exception:
                     logger.debug('No se pudo hacer commit explicito en eliminar_productos_por_id ids=%s', ids)
+            indice_codigos.eliminar(ids)
+            _invalidar_totales()
             return True
         except Exception:
             logger.exception('Error eliminando productos por id ids=%s', ids)
@@ -768,7 +806,9 @@ class ProductoService:
 
                 # Realizar el commit al final; si falla queremos que la excepción se propague
                 conn.commit()
-                return True
+            indice_codigos.vaciar()
+            _invalidar_totales()
+            return True
         except Exception:
             logger.exception('Error vaciando inventario completo')
             raise
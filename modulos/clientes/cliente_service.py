@@ -8,16 +8,44 @@ Design notes:
 - Returns rows as dictionaries by setting `conn.row_factory = sqlite3.Row`.
 - Methods handle exceptions and log errors; they return None/False on failure
   or appropriate empty collections.
+- Lists (`obtener_todos`, `buscar_clientes`) are paged and only carry the
+  columns the list screens show; `obtener_por_id` returns the full row.
 """
-from typing import List, Dict, Optional, Any
+from typing import List, Dict, Optional, Any, Sequence, Tuple
+import re
 import sqlite3
 import logging
 from datetime import datetime
 
 import database
+from modulos.almacen.busqueda import expresion_fts
 
 logger = logging.getLogger(__name__)
 
+# columnas de las listas de clientes (selector de la caja y gestión)
+COLUMNAS_LISTA = ('id', 'nombre', 'telefono', 'dni', 'puntos_fidelidad')
+LIMITE_LISTA = 50
+# prefijos internacionales con que se guardan los móviles: '600 12' debe
+# encontrar '+34 600 12 34 56' sin recorrer la tabla
+PREFIJOS_PAIS = ('34', '0034')
+
+_NO_TELEFONO = re.compile(r'[^0-9\s\-.+()/]')
+
+
+def normalizar_telefono(texto: Optional[str]) -> str:
+    """'+34 600-12 34' -> '346001234' (misma regla que clientes.telefono_norm)."""
+    return re.sub(r'\D', '', texto or '')
+
+
+def normalizar_dni(texto: Optional[str]) -> str:
+    """' x-1234.567l ' -> 'X1234567L' (misma regla que clientes.dni_norm)."""
+    return re.sub(r'[\s\-.]', '', texto or '').upper()
+
+
+def _rango_prefijo(prefijo: str) -> Tuple[str, str]:
+    """(desde, hasta) tales que `col >= desde AND col < hasta` es `col LIKE prefijo%` con índice."""
+    return prefijo, prefijo[:-1] + chr(ord(prefijo[-1]) + 1)
+
 
 class ClienteService:
     """Encapsula operaciones CRUD y utilidades para clientes."""
@@ -31,37 +59,86 @@ class ClienteService:
             return None
         return {k: row[k] for k in row.keys()}
 
-    def obtener_todos(self) -> List[Dict[str, Any]]:
-        """Devuelve todos los clientes como lista de diccionarios."""
+    def _select_lista(self, columnas: Optional[Sequence[str]]) -> str:
+        cols = database.table_columns('clientes')
+        elegidas = [c for c in (columnas or COLUMNAS_LISTA) if c in cols] if cols else []
+        if 'id' not in elegidas:
+            elegidas.insert(0, 'id')
+        return 'SELECT ' + ', '.join(elegidas) + ' FROM clientes'
+
+    @staticmethod
+    def _limite_sql(limite: Optional[int], pagina: int) -> str:
+        if not limite:
+            return ''
+        return f' LIMIT {int(limite)} OFFSET {(max(1, int(pagina)) - 1) * int(limite)}'
+
+    def obtener_todos(self, limite: Optional[int] = LIMITE_LISTA, pagina: int = 1,
+                      columnas: Optional[Sequence[str]] = COLUMNAS_LISTA) -> List[Dict[str, Any]]:
+        """Clientes por orden alfabético, de `limite` en `limite` (None = todos).
+
+        Sólo trae `columnas` (más el id); el orden usa idx_clientes_nombre_nocase.
+        """
         try:
             with database.connect() as conn:
                 conn.row_factory = sqlite3.Row
                 cur = conn.cursor()
-                cur.execute("SELECT * FROM clientes ORDER BY nombre COLLATE NOCASE")
+                cur.execute(self._select_lista(columnas) + " ORDER BY nombre COLLATE NOCASE" + self._limite_sql(limite, pagina))
                 rows = cur.fetchall()
                 return [self._row_to_dict(r) for r in rows]
         except Exception as e:
             logger.exception("Error obteniendo todos los clientes: %s", e)
             return []
 
-    def buscar_clientes(self, termino: str) -> List[Dict[str, Any]]:
-        """Busca clientes por nombre, telefono o dni (LIKE, case-insensitive).
+    def buscar_clientes(self, termino: str, limite: Optional[int] = LIMITE_LISTA, pagina: int = 1,
+                        columnas: Optional[Sequence[str]] = COLUMNAS_LISTA) -> List[Dict[str, Any]]:
+        """Busca clientes por teléfono, DNI o palabras del nombre.
+
+        - teléfono (sólo dígitos) y DNI (mayúsculas, sin separadores) por
+          prefijo sobre `telefono_norm` / `dni_norm`, con índice; el
+          teléfono también tras los `PREFIJOS_PAIS` (se teclea sin el +34);
+        - nombre: cada palabra como prefijo, sin acentos (`clientes_fts`).
 
-        `termino` se utiliza con comodines por ambas partes.
+        Las coincidencias exactas de teléfono o DNI van primero; el resto
+        por nombre. Sin término equivale a `obtener_todos`. Bases de datos
+        sin las claves normalizadas usan el LIKE de siempre.
         """
+        termino = (termino or '').strip()
+        if not termino:
+            return self.obtener_todos(limite, pagina, columnas)
         try:
-            like = f"%{termino}%"
+            cols = database.table_columns('clientes')
+            conds, params = [], []
+            tel = normalizar_telefono(termino) if not _NO_TELEFONO.search(termino) else ''
+            dni = normalizar_dni(termino)
+            if 'telefono_norm' in cols and 'dni_norm' in cols:
+                telefonos = [tel] + [p + tel for p in PREFIJOS_PAIS if not tel.startswith(p)] if tel else []
+                for t in telefonos:
+                    conds.append('(telefono_norm >= ? AND telefono_norm < ?)')
+                    params.extend(_rango_prefijo(t))
+                # un DNI/NIE siempre lleva cifras
+                if re.search(r'\d', dni):
+                    conds.append('(dni_norm >= ? AND dni_norm < ?)')
+                    params.extend(_rango_prefijo(dni))
+                fts = expresion_fts(termino)
+                if fts and database.table_columns('clientes_fts'):
+                    conds.append('id IN (SELECT rowid FROM clientes_fts WHERE clientes_fts MATCH ?)')
+                    params.append(fts)
+                else:
+                    conds.append('nombre LIKE ?')
+                    params.append(f"%{termino}%")
+                exactos = telefonos or [None]
+                orden = f"(telefono_norm IN ({', '.join('?' * len(exactos))}) OR dni_norm = ?) DESC, nombre COLLATE NOCASE"
+                params.extend(exactos + [dni or None])
+            else:
+                like = f"%{termino}%"
+                conds.append('(nombre LIKE ? OR telefono LIKE ? OR dni LIKE ?)')
+                params.extend([like, like, like])
+                orden = 'nombre COLLATE NOCASE'
+            sql = self._select_lista(columnas) + ' WHERE ' + ' OR '.join(conds) + ' ORDER BY ' + orden + self._limite_sql(limite, pagina)
             with database.connect() as conn:
                 conn.row_factory = sqlite3.Row
                 cur = conn.cursor()
-                cur.execute(
-                    """
-                    SELECT * FROM clientes
-                    WHERE nombre LIKE ? OR telefono LIKE ? OR dni LIKE ?
-                    ORDER BY nombre COLLATE NOCASE
-                    """,
-                    (like, like, like),
-                )
+                cur.execute(sql, params)
                 rows = cur.fetchall()
                 return [self._row_to_dict(r) for r in rows]
         except Exception as e:
@@ -4,7 +4,7 @@ from typing import Optional, Dict, Any
 import customtkinter as ctk
 import re
 
-from modulos.clientes.cliente_service import ClienteService
+from modulos.clientes.cliente_service import ClienteService, LIMITE_LISTA
 
 class GestionClientesView(ctk.CTkFrame):
     def __init__(self, parent, controller=None):
@@ -12,6 +12,8 @@ class GestionClientesView(ctk.CTkFrame):
         self.controller = controller
         self.service = ClienteService()
         self.selected_id: Optional[int] = None
+        # páginas de LIMITE_LISTA clientes cargadas en la lista
+        self._paginas = 1
 
         # Configuración del Grid Principal (3 columnas)
         self.grid_rowconfigure(0, weight=1)
@@ -53,6 +55,9 @@ class GestionClientesView(ctk.CTkFrame):
         vsb.grid(row=0, column=1, sticky="ns")
         self.tree.bind("<<TreeviewSelect>>", lambda e: self._on_select())
 
+        self.btn_mas = ctk.CTkButton(self.left_panel, text="Cargar más clientes", fg_color="#95a5a6", command=self._cargar_mas)
+        self.btn_mas.grid(row=4, column=0, sticky="ew", padx=10, pady=(0, 10))
+
         # --- SEPARADOR ---
         linea = ctk.CTkFrame(self, width=2, fg_color="#444444")
         linea.grid(row=0, column=1, sticky="ns", pady=10)
@@ -132,16 +137,42 @@ class GestionClientesView(ctk.CTkFrame):
         self.btn_mod_puntos = ctk.CTkButton(self.points_frame, text="Modificar Puntos", width=120, command=self._modificar_puntos)
         self.btn_mod_puntos.pack(side="right", padx=20, pady=10)
 
-    def _load_clients(self):
+    def _load_clients(self, paginas: int = 1):
+        """Recarga la lista con las primeras `paginas` páginas de clientes."""
         for item in self.tree.get_children(): self.tree.delete(item)
-        term = self.search_entry.get().strip()
-        clientes = self.service.buscar_clientes(term) if term else self.service.obtener_todos()
+        self._paginas = paginas
+        limite = LIMITE_LISTA * paginas
+        clientes = self.service.buscar_clientes(self.search_entry.get().strip(), limite=limite)
+        self._insertar(clientes, len(clientes) >= limite)
+
+    def _cargar_mas(self):
+        self._paginas += 1
+        clientes = self.service.buscar_clientes(self.search_entry.get().strip(), pagina=self._paginas)
+        self._insertar(clientes, len(clientes) >= LIMITE_LISTA)
+
+    def _insertar(self, clientes, hay_mas: bool):
         for c in clientes:
-            self.tree.insert("", "end", iid=str(c['id']), values=(c['nombre'], c['telefono']))
+            if not self.tree.exists(str(c['id'])):
+                self.tree.insert("", "end", iid=str(c['id']), values=(c['nombre'], c['telefono']))
+        # una página llena puede tener continuación
+        if hay_mas:
+            self.btn_mas.grid()
+        else:
+            self.btn_mas.grid_remove()
 
     def _on_search(self):
         self._load_clients()
 
+    def on_show(self):
+        # la vista se conserva entre navegaciones; los puntos pueden haber cambiado en caja
+        self._load_clients(self._paginas)
+        if self.selected_id is not None:
+            if self.tree.exists(str(self.selected_id)):
+                # <<TreeviewSelect>> vuelve a leer la ficha
+                self.tree.selection_set(str(self.selected_id))
+            else:
+                self.seleccionar_cliente(self.selected_id)
+
     def _on_select(self):
         sel = self.tree.selection()
         if sel: self.seleccionar_cliente(int(sel[0]))
@@ -3,7 +3,8 @@ from tkinter import ttk
 import customtkinter as ctk
 from typing import Optional, Dict, Any, List
 
-from modulos.clientes.cliente_service import ClienteService
+from modulos.clientes.cliente_service import ClienteService, LIMITE_LISTA
+from modulos.consulta_diferida import ConsultaDiferida
 
 
 class SelectorCliente(ctk.CTkToplevel):
@@ -23,7 +24,12 @@ class SelectorCliente(ctk.CTkToplevel):
         self.resizable(False, False)
 
         self._service = ClienteService()
+        # búsquedas en el hilo de consultas: teclear nunca bloquea la ventana
+        self._consultas = ConsultaDiferida(self, espera_ms=250)
         self.result: Optional[Dict[str, Any]] = None
+        # la lista se pide de LIMITE_LISTA en LIMITE_LISTA ("Más resultados")
+        self._termino = ''
+        self._pagina = 1
 
         self._build_ui()
         self._populate([])
@@ -85,6 +91,10 @@ class SelectorCliente(ctk.CTkToplevel):
         self.btn_cancel = ctk.CTkButton(btn_frame, text="Cancelar", fg_color="#888888", hover_color="#777777", command=self._on_cancel)
         self.btn_cancel.grid(row=0, column=1, sticky="ew", padx=(6, 6))
 
+        self.btn_mas = ctk.CTkButton(btn_frame, text="Más resultados", fg_color="#95a5a6", command=self._cargar_mas)
+        self.btn_mas.grid(row=0, column=2, sticky="ew", padx=(6, 0))
+        self.btn_mas.configure(state="disabled")
+
         # Ajuste visual compacto
         for child in frame.winfo_children():
             try:
@@ -93,21 +103,37 @@ class SelectorCliente(ctk.CTkToplevel):
                 pass
 
     def _on_search_change(self, event=None):
-        # Llamada rápida al teclear; no complicada gestión de debounce para mantener simple
-        self._on_search()
+        # al teclear se espera a que el usuario pare; una tecla nueva sustituye la búsqueda anterior
+        self._buscar(self._consultas.espera_ms)
 
     def _on_search(self):
-        termino = self.var_search.get().strip()
-        try:
-            results = self._service.buscar_clientes(termino)
-        except Exception:
-            results = []
-        self._populate(results)
+        self._buscar(0)
 
-    def _populate(self, items: List[Dict[str, Any]]):
-        # Limpiar
-        for r in self.tree.get_children():
-            self.tree.delete(r)
+    def _buscar(self, espera_ms: int):
+        termino = self.var_search.get().strip()
+        self._termino, self._pagina = termino, 1
+        self._consultas.lanzar(
+            lambda: self._service.buscar_clientes(termino),
+            self._populate,
+            espera_ms=espera_ms,
+            al_fallar=lambda e: self._populate([]),
+        )
+
+    def _cargar_mas(self):
+        termino, pagina = self._termino, self._pagina + 1
+        self._consultas.lanzar(
+            lambda: self._service.buscar_clientes(termino, pagina=pagina),
+            lambda items: self._populate(items, pagina=pagina),
+            espera_ms=0,
+        )
+
+    def _populate(self, items: List[Dict[str, Any]], pagina: int = 1):
+        self._pagina = pagina
+        if pagina == 1:
+            for r in self.tree.get_children():
+                self.tree.delete(r)
+        # una página llena puede tener continuación
+        self.btn_mas.configure(state="normal" if len(items) >= LIMITE_LISTA else "disabled")
 
         for it in items:
             display = (
@@ -117,6 +143,8 @@ class SelectorCliente(ctk.CTkToplevel):
             )
             # guardamos id en iid para recuperar luego
             iid = str(it.get("id") or "")
+            if self.tree.exists(iid):
+                continue
             self.tree.insert("", "end", iid=iid, values=display)
 
     def _get_selected_item(self) -> Optional[Dict[str, Any]]:
@@ -1,12 +1,71 @@
 from typing import Optional, List, Dict, Any
 import sqlite3
 import logging
+import threading
 
 import database
 
 logger = logging.getLogger(__name__)
 
 
+class _CacheConfiguracion:
+    """Copia en memoria de la tabla `configuracion` (clave/valor).
+
+    Se carga entera con una consulta y se sirve desde memoria. Para enterarse
+    de cambios hechos por otra conexión (otro TPV, un script) mantiene una
+    conexión propia y mira `PRAGMA data_version`, que cambia cuando otra
+    conexión confirma escrituras en la base de datos; sólo entonces recarga.
+    Las escrituras de `ConfigService` actualizan la copia al momento.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._db_path: Optional[str] = None
+        self._version = None
+        self._valores: Dict[str, Any] = {}
+
+    def _vigentes(self) -> Dict[str, Any]:
+        """Devuelve el dict de valores, recargándolo si la BD cambió (llamar con el lock)."""
+        path = database.DB_PATH
+        if self._conn is None or path != self._db_path:
+            self._cerrar()
+            self._conn = sqlite3.connect(path, timeout=5.0, check_same_thread=False)
+            self._db_path = path
+        version = self._conn.execute('PRAGMA data_version').fetchone()[0]
+        if version != self._version:
+            rows = self._conn.execute('SELECT clave, valor FROM configuracion').fetchall()
+            self._valores = {clave: valor for clave, valor in rows}
+            self._version = version
+        return self._valores
+
+    def _cerrar(self):
+        try:
+            if self._conn is not None:
+                self._conn.close()
+        except Exception:
+            pass
+        self._conn = None
+        self._version = None
+
+    def obtener(self, clave: str):
+        """Valor de `clave` o KeyError si no existe."""
+        with self._lock:
+            return self._vigentes()[clave]
+
+    def todos(self) -> Dict[str, Any]:
+        with self._lock:
+            return dict(self._vigentes())
+
+    def poner(self, clave: str, valor):
+        with self._lock:
+            if self._db_path == database.DB_PATH:
+                self._valores[clave] = valor
+
+
+_cache = _CacheConfiguracion()
+
+
 class ConfigService:
     """Servicio para configuración global, categorías y promociones de fidelización."""
 
@@ -21,26 +80,26 @@ class ConfigService:
     # ---------- Configuración global (clave/valor) ----------
     def get_valor(self, clave: str, default: Optional[str] = None) -> Optional[str]:
         try:
-            conn = database.connect()
-            conn.row_factory = sqlite3.Row
-            cur = conn.cursor()
-            cur.execute('SELECT valor FROM configuracion WHERE clave=? LIMIT 1', (clave,))
-            row = cur.fetchone()
-            try:
-                cur.close()
-            except Exception:
-                pass
-            try:
-                conn.close()
-            except Exception:
-                pass
-            if row:
-                return row['valor']
+            return _cache.obtener(clave)
+        except KeyError:
             return default
         except Exception as e:
             logger.exception('Error leyendo configuración %s: %s', clave, e)
             return default
 
+    def get_many(self, claves, default: Optional[str] = None) -> Dict[str, Optional[str]]:
+        """Lee varias claves de una vez. Devuelve {clave: valor o `default`}.
+
+        `claves` puede ser una lista o un dict {clave: default propio}.
+        """
+        defaults = dict(claves) if isinstance(claves, dict) else {clave: default for clave in claves}
+        try:
+            valores = _cache.todos()
+        except Exception as e:
+            logger.exception('Error leyendo configuración %s: %s', list(defaults), e)
+            valores = {}
+        return {clave: valores.get(clave, dflt) for clave, dflt in defaults.items()}
+
     def set_valor(self, clave: str, valor: str) -> bool:
         try:
             conn = database.connect()
@@ -48,6 +107,7 @@ class ConfigService:
             try:
                 cur.execute('INSERT OR REPLACE INTO configuracion (clave, valor) VALUES (?, ?)', (clave, valor))
                 conn.commit()
+                _cache.poner(clave, valor)
                 return True
             finally:
                 try:
@@ -69,24 +129,9 @@ class ConfigService:
         Devuelve True si coinciden, False en caso contrario o en error.
         """
         try:
-            conn = database.connect()
-            conn.row_factory = sqlite3.Row
-            cur = conn.cursor()
-            try:
-                cur.execute('SELECT valor FROM configuracion WHERE clave=? LIMIT 1', ('config_pass_global',))
-                row = cur.fetchone()
-            finally:
-                try:
-                    cur.close()
-                except Exception:
-                    pass
-                try:
-                    conn.close()
-                except Exception:
-                    pass
-
-            if row and row['valor'] is not None:
-                return str(row['valor']) == str(password_intento)
+            valor = ConfigService().get_valor('config_pass_global')
+            if valor is not None:
+                return str(valor) == str(password_intento)
             return False
         except Exception:
             logger.exception('Error validando password de configuración')
@@ -104,6 +149,7 @@ class ConfigService:
             try:
                 cur.execute('INSERT OR REPLACE INTO configuracion (clave, valor) VALUES (?, ?)', ('config_pass_global', nueva_password))
                 conn.commit()
+                _cache.poner('config_pass_global', nueva_password)
                 return True
             finally:
                 try:
@@ -220,23 +266,9 @@ class ConfigService:
             out: Dict[str, Any] = {}
             # config
             try:
-                conn = database.connect()
-                conn.row_factory = sqlite3.Row
-                cur = conn.cursor()
-                cur.execute('SELECT clave, valor FROM configuracion')
-                rows = cur.fetchall()
-                cfg = {r['clave']: r['valor'] for r in rows} if rows else {}
+                cfg = _cache.todos()
             except Exception:
                 cfg = {}
-            finally:
-                try:
-                    cur.close()
-                except Exception:
-                    pass
-                try:
-                    conn.close()
-                except Exception:
-                    pass
 
             out['config'] = cfg
             out['categorias'] = self.listar_categorias_fide()
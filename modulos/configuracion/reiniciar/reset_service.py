@@ -1,5 +1,5 @@
 import logging
-from database import connect
+from database import connect, reiniciar_turno
 from modulos.almacen.producto_service import ProductoService
 
 logger = logging.getLogger(__name__)
@@ -25,6 +25,10 @@ class ResetService:
             cur.execute('DELETE FROM ticket_lines')
             cur.execute('DELETE FROM tickets')
             cur.execute('DELETE FROM cierres_caja')
+            try:
+                reiniciar_turno(cur)
+            except Exception:
+                pass
             try:
                 cur.execute("UPDATE ticket_seq SET val = 0 WHERE name='ticket_no'")
             except Exception:
@@ -4,6 +4,7 @@ import customtkinter as ctk
 from typing import Optional, Dict, Any
 
 from modulos.configuracion.config_service import ConfigService
+from modulos.tpv.fidelizacion_service import invalidar_reglas
 
 class UIConfigFidelizacion(ctk.CTkFrame):
     def __init__(self, parent, controller=None):
@@ -79,15 +80,15 @@ class UIConfigFidelizacion(ctk.CTkFrame):
         container = ctk.CTkFrame(self.content_frame, fg_color="white", corner_radius=15)
         container.pack(fill="both", expand=True, padx=40, pady=40)
         
-        f_activa = self.service.get_valor("fide_activa", "1")
-        self.var_activa = tk.IntVar(value=int(f_activa))
+        cfg = self.service.get_many({"fide_activa": "1", "fide_porcentaje_general": "5"})
+        self.var_activa = tk.IntVar(value=int(cfg["fide_activa"]))
         
         ctk.CTkLabel(container, text="Estado del Sistema", font=("Arial", 16, "bold"), text_color="black").pack(pady=(30,10))
         ctk.CTkSwitch(container, text="Fidelización Activada", variable=self.var_activa, text_color="black", font=("Arial", 14)).pack(pady=10)
 
         ctk.CTkLabel(container, text="Porcentaje de puntos general (%)", text_color="black").pack(pady=(20,0))
         self.ent_pct = ctk.CTkEntry(container, width=200, fg_color="#f2f2f2", text_color="black")
-        self.ent_pct.insert(0, self.service.get_valor("fide_porcentaje_general", "5"))
+        self.ent_pct.insert(0, cfg["fide_porcentaje_general"])
         self.ent_pct.pack(pady=5)
 
         ctk.CTkButton(container, text="Guardar Cambios", fg_color="#2ecc71", command=self._guardar_general).pack(pady=40)
@@ -160,6 +161,7 @@ class UIConfigFidelizacion(ctk.CTkFrame):
     def _guardar_general(self):
         self.service.set_valor("fide_activa", str(self.var_activa.get()))
         self.service.set_valor("fide_porcentaje_general", self.ent_pct.get())
+        invalidar_reglas()
         messagebox.showinfo("Éxito", "Ajustes generales actualizados")
 
     def _guardar_mosaico(self):
@@ -170,6 +172,7 @@ class UIConfigFidelizacion(ctk.CTkFrame):
             for tid, ent in self.tipo_entries.items():
                 v = ent.get().strip()
                 self.service.actualizar_porcentaje_tipo(tid, float(v) if v else None)
+            invalidar_reglas()
             messagebox.showinfo("Éxito", "Porcentajes actualizados correctamente")
         except ValueError: messagebox.showerror("Error", "Por favor, introduce solo números")
 
@@ -197,13 +200,13 @@ class UIConfigFidelizacion(ctk.CTkFrame):
         try:
             d = {"id": self.selected_promo_id, "nombre": self.en_p_nom.get(), "fecha_inicio": self.en_p_ini.get(),
                  "fecha_fin": self.en_p_fin.get(), "multiplicador": float(self.en_p_mul.get() or 1.0), "activa": 1}
-            self.service.guardar_promocion(d); self._cargar_promos_list()
+            self.service.guardar_promocion(d); invalidar_reglas(); self._cargar_promos_list()
             messagebox.showinfo("Éxito", "Promoción guardada")
         except: messagebox.showerror("Error", "Revisa los datos de la promoción")
 
     def _eliminar_promo(self):
         if self.selected_promo_id and messagebox.askyesno("Confirmar", "¿Eliminar promoción?"):
-            self.service.eliminar_promocion(self.selected_promo_id)
+            self.service.eliminar_promocion(self.selected_promo_id); invalidar_reglas()
             self._cargar_promos_list(); self._nueva_promo()
 
     def _on_volver(self):
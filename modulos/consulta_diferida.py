@@ -0,0 +1,137 @@
+"""Consultas de la UI fuera del hilo de Tk, con espera al teclear y descarte de las superadas.
+
+Cada pantalla crea su `ConsultaDiferida(widget)` y llama a `lanzar(funcion,
+al_terminar)` cada vez que cambia lo que hay que mostrar (una tecla, un
+filtro, un orden):
+
+  1. la petición espera `espera_ms` en el hilo de Tk; otra petición antes de
+     que venza la sustituye (debounce),
+  2. pasa a un único hilo de fondo compartido por todas las pantallas; si
+     aún no había empezado y llega otra del mismo ejecutor, sólo queda la
+     última,
+  3. el resultado vuelve al hilo de Tk con `after(0, ...)` y `al_terminar`
+     sólo se llama si la petición sigue siendo la vigente (número de
+     generación).
+
+La consulta que ya está corriendo no se interrumpe (sqlite no se puede
+cortar a medias con seguridad), pero su resultado se descarta.
+"""
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class _Trabajador:
+    """Hilo único que ejecuta la última petición pendiente de cada ejecutor."""
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        # id(ejecutor) -> (ejecutor, generacion, funcion); una entrada por ejecutor
+        self._pendientes: "OrderedDict[int, tuple]" = OrderedDict()
+        self._hilo: Optional[threading.Thread] = None
+
+    def enviar(self, ejecutor: 'ConsultaDiferida', generacion: int, funcion: Callable[[], Any]):
+        with self._cond:
+            self._pendientes.pop(id(ejecutor), None)
+            self._pendientes[id(ejecutor)] = (ejecutor, generacion, funcion)
+            if self._hilo is None or not self._hilo.is_alive():
+                self._hilo = threading.Thread(target=self._bucle, name='consulta-diferida', daemon=True)
+                self._hilo.start()
+            self._cond.notify()
+
+    def _bucle(self):
+        while True:
+            with self._cond:
+                while not self._pendientes:
+                    self._cond.wait()
+                _, (ejecutor, generacion, funcion) = self._pendientes.popitem(last=False)
+            if not ejecutor.vigente(generacion):
+                continue
+            try:
+                resultado, error = funcion(), None
+            except Exception as e:
+                logger.exception('Error en consulta diferida')
+                resultado, error = None, e
+            ejecutor._devolver(generacion, resultado, error)
+
+
+_trabajador = _Trabajador()
+
+
+class ConsultaDiferida:
+    """Ejecutor de consultas de una pantalla (ver el docstring del módulo)."""
+
+    def __init__(self, widget, espera_ms: int = 250):
+        self.widget = widget
+        self.espera_ms = espera_ms
+        self._generacion = 0
+        self._after_id = None
+        self._al_terminar: Optional[Callable[[Any], None]] = None
+        self._al_fallar: Optional[Callable[[Exception], None]] = None
+
+    # --- lado UI (hilo de Tk) ---
+    def lanzar(self, funcion: Callable[[], Any], al_terminar: Callable[[Any], None],
+               espera_ms: Optional[int] = None, al_fallar: Optional[Callable[[Exception], None]] = None) -> int:
+        """Programa `funcion()` y entrega su resultado a `al_terminar` si nada la ha superado.
+
+        `espera_ms` (por defecto la del ejecutor; 0 = sin espera) es el debounce.
+        `al_fallar(excepcion)` recibe los errores; sin él se registran y ya.
+        Devuelve la generación asignada.
+        """
+        self._cancelar_espera()
+        self._generacion += 1
+        generacion = self._generacion
+        self._al_terminar = al_terminar
+        self._al_fallar = al_fallar
+        espera = self.espera_ms if espera_ms is None else espera_ms
+        if espera and espera > 0:
+            try:
+                self._after_id = self.widget.after(espera, lambda: self._enviar(generacion, funcion))
+                return generacion
+            except Exception:
+                self._after_id = None
+        self._enviar(generacion, funcion)
+        return generacion
+
+    def cancelar(self):
+        """Descarta la petición en espera y el resultado de la que esté en curso."""
+        self._cancelar_espera()
+        self._generacion += 1
+
+    def vigente(self, generacion: int) -> bool:
+        return generacion == self._generacion
+
+    # --- helpers ---
+    def _cancelar_espera(self):
+        if self._after_id is not None:
+            try:
+                self.widget.after_cancel(self._after_id)
+            except Exception:
+                pass
+            self._after_id = None
+
+    def _enviar(self, generacion: int, funcion: Callable[[], Any]):
+        self._after_id = None
+        if self.vigente(generacion):
+            _trabajador.enviar(self, generacion, funcion)
+
+    def _devolver(self, generacion: int, resultado: Any, error: Optional[Exception]):
+        # llamado desde el hilo de fondo: sólo se programa, Tk se toca en _entregar
+        try:
+            self.widget.after(0, lambda: self._entregar(generacion, resultado, error))
+        except Exception:
+            # ventana ya destruida
+            pass
+
+    def _entregar(self, generacion: int, resultado: Any, error: Optional[Exception]):
+        if not self.vigente(generacion):
+            return
+        if error is not None:
+            if self._al_fallar:
+                self._al_fallar(error)
+            return
+        if self._al_terminar:
+            self._al_terminar(resultado)
@@ -0,0 +1,164 @@
+"""Pantallas de la aplicación que se conservan vivas entre navegaciones.
+
+`AppTPV` ya no destruye el contenido del contenedor al cambiar de pantalla:
+las pantallas registradas con `cachear=True` se ocultan (`pack_forget`) y al
+volver se recolocan y se traen al frente con `tkraise`, sin reconstruir sus
+widgets. Cada pantalla puede definir:
+
+  on_show(**kwargs)  al volver a mostrarse (no al crearse): recarga sólo lo
+                     que haya cambiado mientras estaba oculta,
+  on_hide()          al ocultarse (p. ej. soltar atajos de teclado globales).
+
+Las pantallas que dependen de sus argumentos (editar un producto, los tickets
+de un día...) se siguen creando cada vez y se destruyen al salir.
+
+Para no acumular memoria, las pantallas ocultas cuentan sus widgets al
+ocultarse y, si el total supera `PRESUPUESTO_WIDGETS`, se destruyen las
+usadas hace más tiempo (salvo las `fijas`).
+"""
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+# widgets que pueden quedar vivos en pantallas ocultas
+PRESUPUESTO_WIDGETS = 6000
+
+
+def _contar_widgets(widget) -> int:
+    total = 0
+    pendientes = [widget]
+    while pendientes:
+        w = pendientes.pop()
+        total += 1
+        try:
+            pendientes.extend(w.winfo_children())
+        except Exception:
+            pass
+    return total
+
+
+def _viva(widget) -> bool:
+    try:
+        return bool(widget.winfo_exists())
+    except Exception:
+        return False
+
+
+class GestorPantallas:
+    """Muestra una pantalla cada vez dentro de `container`, conservando las cacheadas."""
+
+    def __init__(self, container, presupuesto_widgets: int = PRESUPUESTO_WIDGETS, fijas: Iterable[str] = ()):
+        self.container = container
+        self.presupuesto_widgets = presupuesto_widgets
+        self.fijas = set(fijas)
+        # nombre -> pantalla, de la usada hace más tiempo a la más reciente
+        self._cache: "OrderedDict[str, Any]" = OrderedDict()
+        self._widgets: Dict[str, int] = {}
+        self.actual = None
+        self.nombre_actual: Optional[str] = None
+
+    def mostrar(self, nombre: str, crear: Callable[[], Any], cachear: bool = True, **kwargs):
+        """Muestra la pantalla `nombre`, creándola con `crear()` si no está en caché.
+
+        `kwargs` se pasan a `on_show` cuando se reutiliza una pantalla ya creada.
+        Devuelve la pantalla mostrada.
+        """
+        inicio = time.perf_counter()
+        pantalla = self._cache.get(nombre) if cachear else None
+        if pantalla is not None and not _viva(pantalla):
+            self._quitar(nombre)
+            pantalla = None
+        if pantalla is not None and pantalla is self.actual:
+            self._avisar(pantalla, 'on_show', **kwargs)
+            return pantalla
+
+        self._ocultar_actual()
+        if pantalla is None:
+            pantalla = crear()
+            # las pantallas se empaquetan solas al construirse; por si alguna no lo hace
+            if not pantalla.winfo_manager():
+                pantalla.pack(fill='both', expand=True)
+            if cachear:
+                self._cache[nombre] = pantalla
+        else:
+            self._cache.move_to_end(nombre)
+            pantalla.pack(fill='both', expand=True)
+            pantalla.tkraise()
+            self._avisar(pantalla, 'on_show', **kwargs)
+        self.actual = pantalla
+        self.nombre_actual = nombre
+        self._recortar()
+        logger.debug('Pantalla %s en %.1f ms', nombre, (time.perf_counter() - inicio) * 1000)
+        return pantalla
+
+    def olvidar(self, nombre: str):
+        """Destruye la pantalla cacheada `nombre` (se volverá a crear al mostrarla)."""
+        pantalla = self._cache.get(nombre)
+        if pantalla is None:
+            return
+        if pantalla is self.actual:
+            self.actual = None
+            self.nombre_actual = None
+        self._quitar(nombre)
+
+    def vaciar(self):
+        """Destruye todas las pantallas, cacheadas o no."""
+        for nombre in list(self._cache):
+            self._quitar(nombre)
+        self._destruir_sueltas()
+        self.actual = None
+        self.nombre_actual = None
+
+    # --- helpers ---
+    def _avisar(self, pantalla, metodo: str, **kwargs):
+        fn = getattr(pantalla, metodo, None)
+        if fn is None:
+            return
+        try:
+            fn(**kwargs)
+        except Exception:
+            logger.exception('Error en %s de %s', metodo, type(pantalla).__name__)
+
+    def _ocultar_actual(self):
+        actual, nombre = self.actual, self.nombre_actual
+        self.actual = None
+        self.nombre_actual = None
+        if actual is not None and self._cache.get(nombre) is actual and _viva(actual):
+            self._avisar(actual, 'on_hide')
+            actual.pack_forget()
+            self._widgets[nombre] = _contar_widgets(actual)
+        # lo que no esté en caché (pantallas de un solo uso) se destruye como siempre
+        self._destruir_sueltas()
+
+    def _destruir_sueltas(self):
+        cacheadas = set(map(str, self._cache.values()))
+        for w in self.container.winfo_children():
+            if str(w) not in cacheadas:
+                try:
+                    w.destroy()
+                except Exception:
+                    pass
+
+    def _quitar(self, nombre: str):
+        pantalla = self._cache.pop(nombre, None)
+        self._widgets.pop(nombre, None)
+        if pantalla is not None:
+            try:
+                pantalla.destroy()
+            except Exception:
+                pass
+
+    def _recortar(self):
+        """Destruye pantallas ocultas (las menos recientes primero) hasta caber en el presupuesto."""
+        total = sum(n for nombre, n in self._widgets.items() if self._cache.get(nombre) is not self.actual)
+        for nombre in list(self._cache):
+            if total <= self.presupuesto_widgets:
+                break
+            if nombre in self.fijas or self._cache[nombre] is self.actual:
+                continue
+            total -= self._widgets.get(nombre, 0)
+            logger.info('Pantalla %s liberada (%s widgets en pantallas ocultas)', nombre, total)
+            self._quitar(nombre)
@@ -1,4 +1,22 @@
 # modulos/impresion/ticket_generator.py
+from dinero import Dinero, centimos
+
+
+def _totales(carrito):
+    """(base, {tipo: cuota}, total) del carrito, sumados en céntimos."""
+    por_iva = {}
+    for item in carrito:
+        precio = item['precio_cent'] if item.get('precio_cent') is not None else centimos(item['precio'])
+        tipo_iva = item['iva']
+        por_iva[tipo_iva] = por_iva.get(tipo_iva, Dinero()) + Dinero(precio) * item['cantidad']
+    base = Dinero()
+    cuotas = {}
+    for tipo_iva, importe in por_iva.items():
+        b, c = importe.desglose(tipo_iva)
+        base += b
+        cuotas[tipo_iva] = c.euros()
+    return base.euros(), cuotas, sum(por_iva.values(), Dinero()).euros()
+
 
 def generar_ticket(carrito, efectivo, cambio, nombre_tienda="KOOL DREAMS", cajero="EGON"):
     from datetime import datetime
@@ -42,19 +60,8 @@ def generar_ticket(carrito, efectivo, cambio, nombre_tienda="KOOL DREAMS", cajer
     
     lineas.append("-" * 30)
     
-    # Totales
-    total_pagar = sum(item['cantidad'] * item['precio'] for item in carrito)
-    iva_desglose = {}
-    for item in carrito:
-        tipo_iva = item['iva']
-        subtotal = item['cantidad'] * item['precio']
-        divisor = 1 + (tipo_iva / 100)
-        iva_item = subtotal - (subtotal / divisor)
-        if tipo_iva not in iva_desglose:
-            iva_desglose[tipo_iva] = 0.0
-        iva_desglose[tipo_iva] += iva_item
-    
-    total_base = total_pagar - sum(iva_desglose.values())
+    # Totales (en céntimos: subtotal + IVA == TOTAL al céntimo)
+    total_base, iva_desglose, total_pagar = _totales(carrito)
     lineas.append(f"Subtotal:".ljust(23) + f"{total_base:>7.2f}")
     for tipo in sorted(iva_desglose.keys()):
         lineas.append(f"IVA ({int(tipo)}%):".ljust(23) + f"{iva_desglose[tipo]:>7.2f}")
@@ -75,6 +75,15 @@ class PantallaInicio(ctk.CTkFrame):
                                        command=self.controller.destroy)
         self.btn_salir.grid(row=4, column=0, pady=20)
 
+    def on_show(self):
+        """Al volver a la pantalla (se conserva entre navegaciones), empezar desde el menú principal."""
+        self.last_submenu = None
+        self.limpiar_submenu()
+        self.limpiar_tercer_nivel()
+        self.lbl_instruccion = ctk.CTkLabel(self.tercer_nivel_frame, text="Selecciona una opción arriba para empezar",
+                                            font=("Arial", 16), text_color="gray")
+        self.lbl_instruccion.place(relx=0.5, rely=0.5, anchor="center")
+
     # --- FUNCIONES DE LIMPIEZA ---
     def limpiar_submenu(self):
         for widget in self.submenu_frame.winfo_children():
@@ -0,0 +1,103 @@
+"""Medición del arranque (`python main.py --profile-startup`).
+
+Con `activar()` se cronometra cada módulo importado por primera vez (tiempo
+propio y acumulado con sus dependencias) y cada paso marcado con
+`paso(nombre)` (esquema, ventana, pantallas...). `informe()` devuelve el
+resumen, que main.py imprime y registra al quedar la ventana ociosa por
+primera vez. Sin activar, `paso()` no mide nada y no cuesta nada.
+
+Sólo se cronometran los imports del hilo principal; los de los hilos de
+precarga (la caja, los índices en memoria) no entran en el informe.
+"""
+import builtins
+import importlib.util
+import logging
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import List, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class PerfilArranque:
+    """Tiempos de imports y pasos del arranque."""
+
+    def __init__(self):
+        self.activo = False
+        self.inicio = time.perf_counter()
+        # (nombre, ms) en orden de ejecución
+        self.pasos: List[Tuple[str, float]] = []
+        # (módulo, ms propios, ms acumulados)
+        self.imports: List[Tuple[str, float, float]] = []
+        self.informado = False
+        self._import_original = None
+        self._hilo = threading.main_thread()
+        # tiempo de los imports anidados del import en curso
+        self._pila: List[float] = []
+
+    def activar(self):
+        if self.activo:
+            return
+        self.activo = True
+        self.inicio = time.perf_counter()
+        self._import_original = builtins.__import__
+        builtins.__import__ = self._import
+
+    def desactivar(self):
+        if self._import_original is not None:
+            builtins.__import__ = self._import_original
+            self._import_original = None
+        self.activo = False
+
+    @contextmanager
+    def paso(self, nombre: str):
+        if not self.activo:
+            yield
+            return
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            ms = (time.perf_counter() - t0) * 1000
+            self.pasos.append((nombre, ms))
+            if self.informado:
+                # pasos posteriores al informe (pantallas abiertas más tarde)
+                logger.info('Perfil: %s %.1f ms', nombre, ms)
+
+    def informe(self, limite_imports: int = 25) -> str:
+        total = (time.perf_counter() - self.inicio) * 1000
+        self.informado = True
+        lineas = [f'Arranque: {total:.0f} ms hasta la primera espera de la ventana', '', 'Pasos (ms):']
+        lineas += [f'  {ms:9.1f}  {nombre}' for nombre, ms in self.pasos]
+        lineas += ['', f'Imports más lentos (ms propios / acumulados, {len(self.imports)} módulos):']
+        for modulo, propio, acumulado in sorted(self.imports, key=lambda i: i[1], reverse=True)[:limite_imports]:
+            lineas.append(f'  {propio:9.1f}  {acumulado:9.1f}  {modulo}')
+        return '\n'.join(lineas)
+
+    # --- helpers ---
+    def _import(self, name, globals=None, locals=None, fromlist=(), level=0):
+        original = self._import_original
+        if threading.current_thread() is not self._hilo:
+            return original(name, globals, locals, fromlist, level)
+        try:
+            modulo = importlib.util.resolve_name('.' * level + name, (globals or {}).get('__package__')) if level else name
+        except Exception:
+            modulo = name
+        if modulo in sys.modules:
+            return original(name, globals, locals, fromlist, level)
+        t0 = time.perf_counter()
+        self._pila.append(0.0)
+        try:
+            return original(name, globals, locals, fromlist, level)
+        finally:
+            anidados = self._pila.pop()
+            acumulado = (time.perf_counter() - t0) * 1000
+            if self._pila:
+                self._pila[-1] += acumulado
+            self.imports.append((modulo, acumulado - anidados, acumulado))
+
+
+# Instancia del proceso (ver main.py)
+perfil = PerfilArranque()
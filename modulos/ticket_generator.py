@@ -1,4 +1,6 @@
 # modulos/impresion/ticket_generator.py
+from modulos.impresion.ticket_generator import _totales
+
 
 def generar_ticket(carrito, efectivo, cambio, nombre_tienda="KOOL DREAMS", cajero="EGON", ticket_id: int = None):
     from datetime import datetime
@@ -42,44 +44,20 @@ def generar_ticket(carrito, efectivo, cambio, nombre_tienda="KOOL DREAMS", cajer
     
     lineas.append("-" * 30)
     
-    # Totales
-    total_pagar = sum(item['cantidad'] * item['precio'] for item in carrito)
+    # Totales (en céntimos)
+    total_base, iva_desglose_map, total_pagar = _totales(carrito)
 
     # Prefer using centralized service for tax breakdown when ticket_id is given
-    iva_desglose_map = {}
     try:
         if ticket_id is not None:
             from modulos.tpv.cierre_service import CierreService
             svc = CierreService()
             impuestos = svc.desglose_impuestos_ticket(ticket_id)
-            for imp in impuestos:
-                iva_desglose_map[imp['iva']] = imp['cuota']
+            iva_desglose_map = {imp['iva']: imp['cuota'] for imp in impuestos}
             total_base = sum(imp.get('base', 0.0) for imp in impuestos)
-        else:
-            iva_desglose = {}
-            for item in carrito:
-                tipo_iva = item['iva']
-                subtotal = item['cantidad'] * item['precio']
-                divisor = 1 + (tipo_iva / 100)
-                iva_item = subtotal - (subtotal / divisor)
-                if tipo_iva not in iva_desglose:
-                    iva_desglose[tipo_iva] = 0.0
-                iva_desglose[tipo_iva] += iva_item
-            iva_desglose_map = iva_desglose
-            total_base = total_pagar - sum(iva_desglose_map.values())
-
     except Exception:
         # fallback to local calc
-        iva_desglose_map = {}
-        for item in carrito:
-            tipo_iva = item['iva']
-            subtotal = item['cantidad'] * item['precio']
-            divisor = 1 + (tipo_iva / 100)
-            iva_item = subtotal - (subtotal / divisor)
-            if tipo_iva not in iva_desglose_map:
-                iva_desglose_map[tipo_iva] = 0.0
-            iva_desglose_map[tipo_iva] += iva_item
-        total_base = total_pagar - sum(iva_desglose_map.values())
+        total_base, iva_desglose_map, total_pagar = _totales(carrito)
 
     lineas.append(f"Subtotal:".ljust(23) + f"{total_base:>7.2f}")
     for tipo in sorted(iva_desglose_map.keys()):
@@ -0,0 +1,196 @@
+"""Modelo del carrito de la caja.
+
+Las líneas son dicts con las claves de siempre (id, sku, nombre, precio,
+cantidad, iva) y se guardan en orden de entrada; un índice por id de
+producto permite sumar una unidad a una línea existente sin recorrer el
+carrito. El total se lleva acumulado por tipo de IVA como `Dinero`
+(céntimos enteros, a partir del `precio_cent` de cada línea), así que ni el
+visor ni el cobro vuelven a recorrer las líneas y los totales cuadran al
+céntimo.
+
+Cada cambio se notifica a los suscriptores con
+`fn(evento, indice, linea)`:
+
+  'alta'    línea nueva en `indice` (siempre al final),
+  'cambio'  la línea `indice` cambió de cantidad o precio,
+  'baja'    se quitó la línea `indice` (las siguientes suben una posición),
+  'vacio'   el carrito se vació (`indice` y `linea` son None).
+"""
+import logging
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from dinero import Dinero, centimos, a_euros
+
+logger = logging.getLogger(__name__)
+
+
+def _precio(valor, linea) -> float:
+    if valor is None:
+        logger.warning('Producto sin precio en el carrito: SKU=%s id=%s', linea.get('sku'), linea.get('id'))
+    try:
+        return float(valor or 0.0)
+    except Exception:
+        return 0.0
+
+
+def _cantidad(valor) -> int:
+    try:
+        return int(valor)
+    except Exception:
+        try:
+            return int(float(valor))
+        except Exception:
+            return 0
+
+
+def _iva(valor) -> float:
+    try:
+        return float(valor or 0.0)
+    except Exception:
+        return 0.0
+
+
+class Carrito:
+    """Líneas de la venta en curso con totales acumulados por tipo de IVA."""
+
+    def __init__(self):
+        self._lineas: List[Dict[str, Any]] = []
+        # id de producto -> posición en _lineas (sólo líneas que se fusionan)
+        self._pos: Dict[Any, int] = {}
+        # tipo de IVA -> importe IVA incluido
+        self._por_iva: Dict[float, Dinero] = {}
+        self._suscriptores: List[Callable[[str, Optional[int], Optional[Dict[str, Any]]], None]] = []
+
+    # --- lectura ---
+    def __len__(self):
+        return len(self._lineas)
+
+    def __bool__(self):
+        return bool(self._lineas)
+
+    def __iter__(self):
+        return iter(self._lineas)
+
+    def __getitem__(self, indice: int) -> Dict[str, Any]:
+        return self._lineas[indice]
+
+    def lineas(self) -> List[Dict[str, Any]]:
+        """Copia de las líneas, para encolar la venta o calcular puntos."""
+        return [dict(ln) for ln in self._lineas]
+
+    def importe(self) -> Dinero:
+        return sum(self._por_iva.values(), Dinero())
+
+    def total_centimos(self) -> int:
+        return self.importe().centimos
+
+    def total(self) -> float:
+        return self.importe().euros()
+
+    def desglose(self) -> Tuple[float, float]:
+        """(base imponible, cuota de IVA) del carrito, desglosadas por tipo."""
+        base = sum((importe.desglose(iva)[0] for iva, importe in self._por_iva.items()), Dinero())
+        return base.euros(), (self.importe() - base).euros()
+
+    @staticmethod
+    def subtotal_centimos(linea: Dict[str, Any]) -> int:
+        return linea['precio_cent'] * linea['cantidad']
+
+    @staticmethod
+    def subtotal(linea: Dict[str, Any]) -> float:
+        return a_euros(linea['precio_cent'] * linea['cantidad'])
+
+    # --- suscriptores ---
+    def suscribir(self, fn: Callable[[str, Optional[int], Optional[Dict[str, Any]]], None]):
+        self._suscriptores.append(fn)
+
+    def _avisar(self, evento: str, indice: Optional[int], linea: Optional[Dict[str, Any]]):
+        for fn in list(self._suscriptores):
+            try:
+                fn(evento, indice, linea)
+            except Exception:
+                logger.exception('Error notificando cambio del carrito (%s)', evento)
+
+    # --- cambios ---
+    def _acumular(self, linea: Dict[str, Any], signo: int):
+        iva = _iva(linea.get('iva'))
+        self._por_iva[iva] = self._por_iva.get(iva, Dinero()) + Dinero(signo * self.subtotal_centimos(linea))
+
+    def agregar(self, producto: Dict[str, Any], fusionar: bool = True) -> int:
+        """Añade `producto` (una línea con 'cantidad', 1 si falta) y devuelve su posición.
+
+        Con `fusionar`, si ya hay una línea del mismo id se suma la cantidad
+        a esa línea en lugar de abrir otra.
+        """
+        pid = producto.get('id')
+        cantidad = _cantidad(producto.get('cantidad', 1))
+        if fusionar and pid is not None and pid in self._pos:
+            indice = self._pos[pid]
+            linea = self._lineas[indice]
+            self._acumular(linea, -1)
+            linea['cantidad'] += cantidad
+            self._acumular(linea, 1)
+            self._avisar('cambio', indice, linea)
+            return indice
+
+        linea = dict(producto)
+        linea['precio_cent'] = centimos(_precio(producto.get('precio'), producto))
+        linea['precio'] = a_euros(linea['precio_cent'])
+        linea['cantidad'] = cantidad
+        self._lineas.append(linea)
+        indice = len(self._lineas) - 1
+        if fusionar and pid is not None:
+            self._pos[pid] = indice
+        self._acumular(linea, 1)
+        self._avisar('alta', indice, linea)
+        return indice
+
+    def restaurar(self, lineas: List[Dict[str, Any]]):
+        """Vuelve a añadir líneas tal como salieron de `lineas()` (p. ej. una venta que no se guardó).
+
+        Ninguna se fusiona con otra, así que los descuentos repetidos siguen
+        siendo líneas separadas; la primera línea de cada id vuelve al índice
+        para que un nuevo escaneo del producto sume a ella.
+        """
+        for producto in lineas:
+            pid = producto.get('id')
+            indice = self.agregar(producto, fusionar=False)
+            if pid is not None and pid not in self._pos:
+                self._pos[pid] = indice
+
+    def quitar_unidad(self, indice: int):
+        """Resta una unidad a la línea `indice`; con una sola unidad, la quita."""
+        linea = self._lineas[indice]
+        if linea['cantidad'] > 1:
+            self._acumular(linea, -1)
+            linea['cantidad'] -= 1
+            self._acumular(linea, 1)
+            self._avisar('cambio', indice, linea)
+        else:
+            self.quitar(indice)
+
+    def quitar(self, indice: int):
+        linea = self._lineas.pop(indice)
+        self._acumular(linea, -1)
+        if self._pos.get(linea.get('id')) == indice:
+            del self._pos[linea.get('id')]
+        # las líneas siguientes suben una posición
+        for pid, pos in self._pos.items():
+            if pos > indice:
+                self._pos[pid] = pos - 1
+        self._avisar('baja', indice, linea)
+
+    def quitar_id(self, pid) -> bool:
+        """Quita todas las líneas con ese id (p. ej. el descuento por puntos)."""
+        quitadas = False
+        for indice in range(len(self._lineas) - 1, -1, -1):
+            if self._lineas[indice].get('id') == pid:
+                self.quitar(indice)
+                quitadas = True
+        return quitadas
+
+    def vaciar(self):
+        self._lineas = []
+        self._pos = {}
+        self._por_iva = {}
+        self._avisar('vacio', None, None)
@@ -2,7 +2,7 @@ import logging
 from datetime import date, datetime
 from typing import Optional, Dict, Any, List
 
-from database import connect
+from database import connect, rango_dia, rango_dias, agregar_tickets, leer_ventas_dia, TURNO_ABIERTO
 
 
 class CierreService:
@@ -36,38 +36,17 @@ class CierreService:
         fecha_iso = self._normalize_fecha(fecha)
         try:
             conn = connect()
-            cur = conn.cursor()
-
-            ticket_where = "date(created_at)=? AND (cierre_id IS NULL)"
 
-            cur.execute(f"SELECT COUNT(*), COALESCE(SUM(total),0) FROM tickets WHERE {ticket_where}", (fecha_iso,))
-            row = cur.fetchone()
-            if row:
-                num_ventas = int(row[0])
-                total_ingresos = float(row[1] or 0.0)
-            else:
-                num_ventas = 0
-                total_ingresos = 0.0
-
-            # Desglose por forma de pago
-            val_efectivo = 0.0
-            val_tarjeta = 0.0
-            val_web = 0.0
-            cur.execute(f"SELECT forma_pago, SUM(total) FROM tickets WHERE {ticket_where} GROUP BY forma_pago", (fecha_iso,))
-            for forma, total in cur.fetchall():
-                f = (forma or "").upper()
-                if f == 'EFECTIVO':
-                    val_efectivo = float(total or 0)
-                elif f == 'TARJETA':
-                    val_tarjeta = float(total or 0)
-                elif f == 'WEB':
-                    val_web = float(total or 0)
-
-            # Fidelización
-            cur.execute(f"SELECT COALESCE(SUM(puntos_ganados),0), COALESCE(SUM(puntos_canjeados),0) FROM tickets WHERE {ticket_where}", (fecha_iso,))
-            pts_row = cur.fetchone() or (0, 0)
-            pts_ganados = int(pts_row[0] or 0)
-            pts_canjeados = int(pts_row[1] or 0)
+            # los mismos tickets que cerraría el Z de ese día
+            ticket_where = f"{TURNO_ABIERTO} AND created_at < ?"
+            agregados = agregar_tickets(conn, ticket_where, rango_dia(fecha_iso)[1:], por_lineas=False)
+            num_ventas = int(agregados['count_tickets'])
+            total_ingresos = float(agregados['total'])
+            val_efectivo = agregados['total_efectivo']
+            val_tarjeta = agregados['total_tarjeta']
+            val_web = agregados['total_web']
+            pts_ganados = int(agregados['puntos_ganados'])
+            pts_canjeados = int(agregados['puntos_canjeados'])
 
             return {
                 'fecha': fecha_iso,
@@ -102,7 +81,7 @@ class CierreService:
         try:
             conn = connect()
             cur = conn.cursor()
-            cur.execute("SELECT * FROM cierres_caja WHERE date(fecha_hora) BETWEEN ? AND ? ORDER BY fecha_hora ASC", (desde_iso, hasta_iso))
+            cur.execute("SELECT * FROM cierres_caja WHERE fecha_hora >= ? AND fecha_hora < ? ORDER BY fecha_hora ASC", rango_dias(desde_iso, hasta_iso))
             rows = cur.fetchall()
             return [dict(r) for r in rows]
         except Exception:
@@ -114,6 +93,29 @@ class CierreService:
             except Exception:
                 pass
 
+    def resumen_periodo(self, fecha_desde: Any, fecha_hasta: Any, limite_articulos: Optional[int] = 10) -> Dict[str, Any]:
+        """Sales figures between two dates (inclusive) from the daily rollup.
+
+        Same keys as `database.agregar_tickets` (totals, por_forma_pago,
+        por_cajero, impuestos, por_categoria, por_tipo, por_articulo). Only
+        days closed with a Z are counted; returns {} if there are none.
+        """
+        desde_iso = self._normalize_fecha(fecha_desde)
+        hasta_iso = self._normalize_fecha(fecha_hasta)
+        conn = None
+        try:
+            conn = connect()
+            return leer_ventas_dia(conn, 'fecha >= ? AND fecha <= ?', (desde_iso, hasta_iso), limite_articulos=limite_articulos) or {}
+        except Exception:
+            logging.exception('Error al obtener resumen del periodo')
+            return {}
+        finally:
+            try:
+                if conn:
+                    conn.close()
+            except Exception:
+                pass
+
     def obtener_detalle_cierre(self, cierre_id: int) -> Optional[Dict[str, Any]]:
         """Return the cierre_caja record matching `cierre_id` or None if not found."""
         try:
@@ -140,51 +142,24 @@ class CierreService:
             where_from = prev_dt
             where_to = cierre.get('fecha_hora')
 
-            # Now compute ticket-level aggregates used by the UI. These queries were
-            # previously in the UI; centralize them here so the UI has no SQL.
-            por_categoria = []
-            por_tipo = []
-            por_articulo = []
-            por_forma_pago = []
-            try:
-                # categories
-                cur.execute(
-                    "SELECT COALESCE(p.categoria,''), SUM(tl.cantidad) as qty, COALESCE(SUM(tl.cantidad * tl.precio),0) as total "
-                    "FROM ticket_lines tl JOIN tickets t ON tl.ticket_id = t.id JOIN productos p ON tl.sku = p.sku "
-                    "WHERE t.created_at > ? AND t.created_at <= ? GROUP BY p.categoria",
-                    (where_from, where_to)
-                )
-                por_categoria = [{'categoria': r[0], 'qty': r[1], 'total': r[2]} for r in cur.fetchall()]
-            except Exception:
-                por_categoria = []
-
-            try:
-                cur.execute(
-                    "SELECT COALESCE(p.tipo,''), SUM(tl.cantidad) as qty, COALESCE(SUM(tl.cantidad * tl.precio),0) as total "
-                    "FROM ticket_lines tl JOIN tickets t ON tl.ticket_id = t.id JOIN productos p ON tl.sku = p.sku "
-                    "WHERE t.created_at > ? AND t.created_at <= ? GROUP BY p.tipo",
-                    (where_from, where_to)
-                )
-                por_tipo = [{'tipo': r[0], 'qty': r[1], 'total': r[2]} for r in cur.fetchall()]
-            except Exception:
-                por_tipo = []
-
-            try:
-                cur.execute(
-                    "SELECT tl.nombre, SUM(tl.cantidad) as qty, COALESCE(SUM(tl.cantidad * tl.precio),0) as total "
-                    "FROM ticket_lines tl JOIN tickets t ON tl.ticket_id = t.id "
-                    "WHERE t.created_at > ? AND t.created_at <= ? GROUP BY tl.nombre ORDER BY qty DESC LIMIT 10",
-                    (where_from, where_to)
-                )
-                por_articulo = [{'nombre': r[0], 'qty': r[1], 'total': r[2]} for r in cur.fetchall()]
-            except Exception:
-                por_articulo = []
-
+            # Desgloses del cierre: del resumen diario que guardó el Z; los X
+            # (y cierres anteriores al resumen) se agregan desde los tickets
+            agregados = None
             try:
-                cur.execute("SELECT forma_pago, COUNT(*), COALESCE(SUM(total),0) FROM tickets WHERE created_at > ? AND created_at <= ? GROUP BY forma_pago", (where_from, where_to))
-                por_forma_pago = [{'forma': r[0] or '', 'count': r[1], 'total': r[2]} for r in cur.fetchall()]
+                agregados = leer_ventas_dia(conn, 'cierre_id = ?', (cierre_id,), limite_articulos=10)
             except Exception:
-                por_forma_pago = []
+                logging.exception('Error leyendo resumen diario del cierre id=%s', cierre_id)
+            if agregados is None:
+                try:
+                    agregados = agregar_tickets(conn, "created_at > ? AND created_at <= ?", (where_from, where_to),
+                                                por_categoria=True, por_tipo=True, por_articulo=True, limite_articulos=10)
+                except Exception:
+                    logging.exception('Error agregando tickets del cierre id=%s', cierre_id)
+                    agregados = {}
+            por_categoria = agregados.get('por_categoria', [])
+            por_tipo = agregados.get('por_tipo', [])
+            por_articulo = agregados.get('por_articulo', [])
+            por_forma_pago = agregados.get('por_forma_pago', [])
 
             cierre['por_categoria'] = por_categoria
             cierre['por_tipo'] = por_tipo
@@ -1,5 +1,6 @@
 from typing import List, Dict, Optional
 import logging
+import threading
 from datetime import date
 
 from modulos.configuracion.config_service import ConfigService
@@ -8,6 +9,106 @@ from modulos.almacen.producto_service import ProductoService
 logger = logging.getLogger(__name__)
 
 
+def _float_o_none(valor) -> Optional[float]:
+    if valor is None or valor == '':
+        return None
+    try:
+        return float(valor)
+    except Exception:
+        return None
+
+
+class ReglasFidelizacion:
+    """Reglas de fidelización ya resueltas para un día concreto.
+
+    Se construyen una vez con `ConfigService.obtener_todo_fide()` (config
+    global, % por categoría y tipo, promociones) y se evalúan en memoria.
+    """
+
+    def __init__(self, datos: Dict, hoy: Optional[date] = None):
+        self.fecha = hoy or date.today()
+        cfg = datos.get('config') or {}
+        try:
+            self.activa = int(cfg.get('fide_activa', '1')) == 1
+        except Exception:
+            self.activa = True
+        try:
+            self.pct_general = float(cfg.get('fide_porcentaje_general', '5') or 0)
+        except Exception:
+            self.pct_general = 0.0
+        try:
+            self.puntos_por_euro = float(cfg.get('fide_puntos_valor_euro', '1') or 1)
+        except Exception:
+            self.puntos_por_euro = 1.0
+
+        self.pct_categoria = {}
+        for c in datos.get('categorias') or []:
+            pct = _float_o_none(c.get('fide_porcentaje') or None)
+            if pct is not None:
+                self.pct_categoria[c.get('nombre') or ''] = pct
+        self.pct_tipo = {}
+        for t in datos.get('tipos') or []:
+            pct = _float_o_none(t.get('fide_porcentaje') or None)
+            if pct is not None:
+                self.pct_tipo[t.get('nombre') or ''] = pct
+
+        # promociones activas hoy -> multiplicador máximo
+        self.multiplicador = 1.0
+        for p in datos.get('promociones') or []:
+            try:
+                if int(p.get('activa') or 0) != 1:
+                    continue
+                valid = True
+                for campo, fuera in (('fecha_inicio', lambda d: d > self.fecha), ('fecha_fin', lambda d: d < self.fecha)):
+                    if p.get(campo):
+                        try:
+                            if fuera(date.fromisoformat(p.get(campo))):
+                                valid = False
+                        except Exception:
+                            pass
+                if valid:
+                    m = float(p.get('multiplicador') or 1.0)
+                    if m > self.multiplicador:
+                        self.multiplicador = m
+            except Exception:
+                continue
+
+    def puntos_linea(self, precio: float, cantidad: float, categoria=None, tipo=None, puntos_fijos=None) -> float:
+        """Puntos de una línea antes del multiplicador de promoción."""
+        # 0 / vacío = sin puntos fijos (igual que los porcentajes)
+        fijos = _float_o_none(puntos_fijos)
+        if fijos:
+            return fijos * cantidad
+        # tipo > categoría > porcentaje general
+        if tipo and tipo in self.pct_tipo:
+            pct = self.pct_tipo[tipo]
+        elif categoria and categoria in self.pct_categoria:
+            pct = self.pct_categoria[categoria]
+        else:
+            pct = self.pct_general
+        return (precio * cantidad) * (pct / 100.0) * self.puntos_por_euro
+
+
+_reglas: Optional[ReglasFidelizacion] = None
+_reglas_lock = threading.Lock()
+
+
+def obtener_reglas() -> ReglasFidelizacion:
+    """Devuelve las reglas compiladas (se recompilan al cambiar de día o tras `invalidar_reglas`)."""
+    global _reglas
+    with _reglas_lock:
+        if _reglas is None or _reglas.fecha != date.today():
+            _reglas = ReglasFidelizacion(ConfigService().obtener_todo_fide())
+        return _reglas
+
+
+def invalidar_reglas():
+    """Descarta las reglas compiladas; llamar tras guardar la configuración de fidelización."""
+    global _reglas
+    with _reglas_lock:
+        _reglas = None
+
+
 class FidelizacionService:
     """Encapsula la lógica de cálculo de puntos por una venta.
 
@@ -22,63 +123,24 @@ class FidelizacionService:
 
     def calcular_puntos(self, carrito: List[Dict], cliente: Optional[Dict] = None) -> float:
         try:
-            fide_activa = self.cfg.get_valor('fide_activa', '1')
-            try:
-                if int(fide_activa) != 1:
-                    return 0.0
-            except Exception:
-                pass
-
-            try:
-                pct_general = float(self.cfg.get_valor('fide_porcentaje_general', '5') or 0)
-            except Exception:
-                pct_general = 0.0
-            try:
-                puntos_por_euro = float(self.cfg.get_valor('fide_puntos_valor_euro', '1') or 1)
-            except Exception:
-                puntos_por_euro = 1.0
-
-            # promociones activas hoy -> obtener multiplicador máximo
-            mult = 1.0
-            try:
-                promos = self.cfg.listar_promociones() or []
-                hoy = date.today()
-                for p in promos:
-                    try:
-                        if int(p.get('activa') or 0) != 1:
-                            continue
-                        fi = p.get('fecha_inicio')
-                        ff = p.get('fecha_fin')
-                        valid = True
-                        if fi:
-                            try:
-                                if date.fromisoformat(fi) > hoy:
-                                    valid = False
-                            except Exception:
-                                pass
-                        if ff:
-                            try:
-                                if date.fromisoformat(ff) < hoy:
-                                    valid = False
-                            except Exception:
-                                pass
-                        if valid:
-                            try:
-                                m = float(p.get('multiplicador') or 1.0)
-                                if m > mult:
-                                    mult = m
-                            except Exception:
-                                pass
-                    except Exception:
-                        continue
-            except Exception:
-                mult = 1.0
+            reglas = obtener_reglas()
+            if not reglas.activa:
+                return 0.0
 
-            cats = { (c.get('nombre') or ''): (c.get('fide_porcentaje') or None) for c in self.cfg.listar_categorias_fide() }
-            tipos = { (t.get('nombre') or ''): (t.get('fide_porcentaje') or None) for t in self.cfg.listar_tipos_fide() }
+            # atributos que falten en el carrito: una sola consulta para todos los productos
+            faltan = [
+                item for item in carrito or []
+                if (item.get('categoria') is None or item.get('tipo') is None or item.get('fide_puntos_fijos') is None)
+                and (item.get('id') or item.get('sku'))
+            ]
+            attrs = {'por_id': {}, 'por_sku': {}}
+            if faltan:
+                attrs = self.prod_svc.obtener_atributos_fidelizacion(
+                    [item.get('id') for item in faltan if item.get('id')],
+                    [item.get('sku') for item in faltan if not item.get('id')],
+                )
 
             total_points = 0.0
-
             for item in carrito or []:
                 try:
                     price = float(item.get('precio') or 0.0)
@@ -92,57 +154,26 @@ class FidelizacionService:
                 prod_categoria = item.get('categoria')
                 prod_tipo = item.get('tipo')
                 prod_fide_fixed = item.get('fide_puntos_fijos')
-
-                if (prod_categoria is None or prod_tipo is None or prod_fide_fixed is None) and (item.get('id') or item.get('sku')):
-                    try:
-                        if item.get('id'):
-                            p = self.prod_svc.obtener_por_id(item.get('id'))
-                        else:
-                            p = self.prod_svc.buscar_por_codigo(item.get('sku'))
-                        if p:
-                            if prod_categoria is None:
-                                prod_categoria = p.get('categoria')
-                            if prod_tipo is None:
-                                prod_tipo = p.get('tipo')
-                            if prod_fide_fixed is None:
-                                prod_fide_fixed = p.get('fide_puntos_fijos')
-                    except Exception:
-                        pass
-
-                # compute points for this item
-                item_points = 0.0
-                # 1) promotion multiplier applies to entire sale later; per-item we compute base
-                if prod_fide_fixed is not None and prod_fide_fixed != '':
-                    try:
-                        item_points = float(prod_fide_fixed) * qty
-                    except Exception:
-                        item_points = 0.0
-                else:
-                    # fallback to tipo/categoria/general percentages
-                    applied_pct = None
-                    try:
-                        if prod_tipo and tipos.get(prod_tipo) is not None:
-                            applied_pct = float(tipos.get(prod_tipo))
-                        elif prod_categoria and cats.get(prod_categoria) is not None:
-                            applied_pct = float(cats.get(prod_categoria))
-                        else:
-                            applied_pct = float(pct_general)
-                    except Exception:
-                        applied_pct = float(pct_general)
+                p = None
+                if item.get('id'):
                     try:
-                        item_points = (price * qty) * (applied_pct / 100.0) * puntos_por_euro
-                    except Exception:
-                        item_points = 0.0
-
-                total_points += item_points
+                        p = attrs['por_id'].get(int(item.get('id')))
+                    except (TypeError, ValueError):
+                        p = None
+                elif item.get('sku'):
+                    p = attrs['por_sku'].get(str(item.get('sku')))
+                if p:
+                    if prod_categoria is None:
+                        prod_categoria = p.get('categoria')
+                    if prod_tipo is None:
+                        prod_tipo = p.get('tipo')
+                    if prod_fide_fixed is None:
+                        prod_fide_fixed = p.get('fide_puntos_fijos')
+
+                total_points += reglas.puntos_linea(price, qty, prod_categoria, prod_tipo, prod_fide_fixed)
 
             # apply promotion multiplier
-            total_points = total_points * mult
-
-            try:
-                return float(total_points)
-            except Exception:
-                return 0.0
+            return float(total_points * reglas.multiplicador)
         except Exception:
             logger.exception('Error calculando puntos de fidelización')
             return 0.0
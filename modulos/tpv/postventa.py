@@ -0,0 +1,256 @@
+"""Cola post-venta: guarda, actualiza cliente e imprime fuera del hilo de Tk.
+
+`CajaVentas.limpiar_tras_venta` sólo toma una foto de la venta (carrito,
+cajero, cliente, forma de pago) y la encola; el carrito se limpia al
+momento mostrando un número de ticket previsto. Un único hilo de fondo
+procesa las ventas en orden de llegada:
+
+  1. calcula los puntos de fidelización,
+  2. guarda en una sola transacción el ticket, el canje, los puntos
+     ganados y el gasto del cliente (`TicketService.finalizar_venta`),
+  3. compone el texto del ticket e imprime.
+
+Los resultados se dejan en una cola que la UI vacía con `recoger()` desde un
+`after(...)`; cualquier cosa que toque Tk (la vista previa en ventana de
+macOS, avisos de error) se hace allí, nunca desde el hilo de fondo. Si una
+venta no se pudo guardar, su resultado lleva la foto encolada ('venta') para
+que la UI pueda reintentarla o devolverla al carrito.
+"""
+import copy
+import logging
+import queue
+import sqlite3
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Optional, List, Dict, Any
+
+import database
+from modulos.tpv.ticket_service import TicketService
+
+logger = logging.getLogger(__name__)
+
+CABECERA_TICKET = "KOOL DREAMS\nC/Juan Sebastián Elcano, 2\n43850 Cambrils\nNIF: 39887072N\n"
+
+
+def _fmt_importe(valor) -> str:
+    try:
+        return f"{float(valor):.2f}"
+    except Exception:
+        return f"{valor}"
+
+
+def construir_texto_ticket(meta: Dict[str, Any], lineas: List[Dict[str, Any]], fidelidad: Optional[Dict[str, Any]] = None) -> str:
+    """Compone el texto imprimible de un ticket.
+
+    `meta` usa las mismas claves que la tabla `tickets` (ticket_no, created_at,
+    cajero, cliente, total, forma_pago, pagado, cambio) y `lineas` las de
+    `ticket_lines`. `fidelidad` ({'canjeados', 'ganados', 'saldo'}) añade el
+    bloque de puntos cuando la venta tiene cliente.
+    """
+    created_at = meta.get('created_at')
+    partes = [CABECERA_TICKET, "-" * 30 + "\n", f"FACTURA Nº: {meta.get('ticket_no') or meta.get('id') or ''}\n"]
+    try:
+        if created_at:
+            partes.append(f"Fecha: {datetime.fromisoformat(created_at).strftime('%d/%m/%Y %H:%M')}\n")
+    except Exception:
+        partes.append(f"Fecha: {created_at or ''}\n")
+    partes.append(f"Cajero: {meta.get('cajero') or ''}\n")
+    partes.append(f"Cliente: {meta.get('cliente') or ''}\n")
+    partes.append("-" * 30 + "\n")
+
+    for ln in lineas:
+        cantidad = ln.get('cantidad', 0)
+        if isinstance(cantidad, float) and cantidad.is_integer():
+            cantidad = int(cantidad)
+        partes.append(f"{cantidad}x {ln.get('nombre') or ''}  {_fmt_importe(ln.get('precio', 0))}\n")
+
+    partes.append("-" * 30 + "\n")
+    partes.append(f"TOTAL: {_fmt_importe(meta.get('total') or 0.0)}\n")
+    if meta.get('pagado') is not None:
+        partes.append(f"{meta.get('forma_pago') or ''}: {_fmt_importe(meta.get('pagado'))}\n")
+    if meta.get('cambio') is not None:
+        partes.append(f"CAMBIO: {_fmt_importe(meta.get('cambio'))}\n")
+    partes.append("\n¡Gracias por tu compra!\n")
+
+    if fidelidad is not None:
+        partes.append('\n' + ('-' * 20) + '\n')
+        if float(fidelidad.get('canjeados') or 0) > 0:
+            partes.append(f"Puntos canjeados: -{float(fidelidad['canjeados']):.2f} pts\n")
+        if float(fidelidad.get('ganados') or 0) > 0:
+            partes.append(f"Puntos ganados en esta compra: {float(fidelidad['ganados']):.2f}\n")
+        saldo = fidelidad.get('saldo')
+        partes.append(f"Saldo total de puntos: {_fmt_importe(saldo)}\n" if saldo is not None else "Saldo total de puntos: \n")
+    return ''.join(partes)
+
+
+class ColaPostVenta:
+    """Procesa las ventas cerradas en un único hilo de fondo, en orden."""
+
+    def __init__(self):
+        # un solo worker: las ventas se guardan en el orden en que se cobraron
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='postventa')
+        self._resultados: "queue.Queue[Dict[str, Any]]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._pendientes = 0
+        self._ultimo_no: Optional[int] = None
+        self._fidelizacion = None
+
+    # --- lado UI (hilo de Tk) ---
+    def encolar(self, venta: Dict[str, Any]) -> Optional[int]:
+        """Encola una venta y devuelve el número de ticket previsto.
+
+        `venta` lleva 'datos_ticket' (sin puntos), 'carrito', 'cliente',
+        'puntos_canjear' e 'imprimir'. Se copia, así que la UI puede
+        vaciar su carrito en cuanto vuelve.
+        """
+        venta = copy.deepcopy(venta)
+        with self._lock:
+            if self._ultimo_no is None:
+                self._ultimo_no = self._leer_ultimo_numero()
+            previsto = (self._ultimo_no + self._pendientes + 1) if self._ultimo_no is not None else None
+            self._pendientes += 1
+        venta['numero_previsto'] = previsto
+        self._executor.submit(self._procesar, venta)
+        return previsto
+
+    def recoger(self) -> List[Dict[str, Any]]:
+        """Devuelve (sin bloquear) los resultados terminados desde la última llamada."""
+        res = []
+        while True:
+            try:
+                res.append(self._resultados.get_nowait())
+            except queue.Empty:
+                return res
+
+    def pendientes(self) -> int:
+        with self._lock:
+            return self._pendientes
+
+    def esperar(self):
+        """Termina las ventas encoladas y para el hilo (al cerrar la app)."""
+        self._executor.shutdown(wait=True)
+
+    # --- helpers ---
+    def _leer_ultimo_numero(self) -> Optional[int]:
+        conn = None
+        try:
+            conn = database.connect()
+            cur = conn.cursor()
+            try:
+                cur.execute("SELECT val FROM ticket_seq WHERE name='ticket_no'")
+                row = cur.fetchone()
+            except sqlite3.OperationalError:
+                row = None
+            if row is None:
+                cur.execute('SELECT COALESCE(MAX(ticket_no),0) FROM tickets')
+                row = cur.fetchone()
+            return int(row[0] or 0)
+        except Exception:
+            logger.exception('Error leyendo el último número de ticket')
+            return None
+        finally:
+            try:
+                if conn:
+                    conn.close()
+            except Exception:
+                pass
+
+    def _calcular_puntos(self, carrito, cliente) -> float:
+        try:
+            if self._fidelizacion is None:
+                from modulos.tpv.fidelizacion_service import FidelizacionService
+                self._fidelizacion = FidelizacionService()
+            return float(self._fidelizacion.calcular_puntos(carrito, cliente) or 0.0)
+        except Exception:
+            logger.exception('Error calculando puntos de fidelización')
+            return 0.0
+
+    def _procesar(self, venta: Dict[str, Any]):
+        resultado = {
+            'numero_previsto': venta.get('numero_previsto'),
+            'ticket_id': None,
+            'ticket_no': None,
+            'texto': None,
+            'preview': False,
+            'error': None,
+        }
+        try:
+            resultado.update(self.procesar_venta(venta))
+        except Exception as e:
+            logger.exception('Error en la cola post-venta')
+            resultado['error'] = str(e) or e.__class__.__name__
+        finally:
+            if resultado.get('error'):
+                resultado['venta'] = venta
+            # el resultado entra en la cola antes de dejar de contar como
+            # pendiente: quien vea pendientes() == 0 ya lo encuentra en recoger()
+            with self._lock:
+                self._resultados.put(resultado)
+                self._pendientes -= 1
+                if resultado.get('ticket_no') is not None:
+                    self._ultimo_no = int(resultado['ticket_no'])
+
+    def procesar_venta(self, venta: Dict[str, Any]) -> Dict[str, Any]:
+        """Guarda la venta, actualiza el cliente e imprime. Se ejecuta en el worker."""
+        datos = dict(venta.get('datos_ticket') or {})
+        carrito = venta.get('carrito') or []
+        cliente = venta.get('cliente')
+        cliente_id = cliente.get('id') if cliente else None
+
+        # 1) puntos (sólo con cliente asignado)
+        if cliente:
+            puntos_ganados = self._calcular_puntos(carrito, cliente)
+            try:
+                puntos_canjeados = float(venta.get('puntos_canjear') or 0.0)
+            except Exception:
+                puntos_canjeados = 0.0
+        else:
+            puntos_ganados = 0.0
+            puntos_canjeados = 0.0
+
+        datos.update({
+            'puntos_ganados': puntos_ganados,
+            'puntos_canjeados': puntos_canjeados,
+        })
+
+        # 2) ticket + líneas + puntos y gasto del cliente, en una sola transacción
+        ticket_svc = TicketService()
+        res = ticket_svc.finalizar_venta(datos, carrito, cliente_id=cliente_id)
+        if not res:
+            return {'error': 'No se pudo guardar el ticket en la base de datos'}
+        ticket_id = res['ticket_id']
+        ticket_no = res['ticket_no']
+
+        fidelidad = None
+        if cliente:
+            fidelidad = {'canjeados': puntos_canjeados, 'ganados': puntos_ganados, 'saldo': res.get('saldo_puntos')}
+
+        # 3) texto e impresión
+        meta = dict(datos, ticket_no=ticket_no, id=ticket_id)
+        texto = construir_texto_ticket(meta, carrito, fidelidad)
+        preview = False
+        if venta.get('imprimir'):
+            if sys.platform == 'darwin':
+                # la vista previa es una ventana Tk: la abre la UI al recoger el resultado
+                preview = True
+            else:
+                try:
+                    from modulos.impresion.impresora import imprimir_ticket_y_abrir_cajon
+                    imprimir_ticket_y_abrir_cajon(texto)
+                except Exception:
+                    logger.exception('Error imprimiendo ticket %s', ticket_no)
+                    try:
+                        from modulos.tpv.preview_imprimir import preview_ticket
+                        preview_ticket(None, texto, modo='terminal')
+                    except Exception:
+                        pass
+        else:
+            print('Impresión automática desactivada; ticket guardado en BD.')
+
+        return {'ticket_id': ticket_id, 'ticket_no': ticket_no, 'texto': texto, 'preview': preview}
+
+
+# Instancia compartida por el proceso (ver CajaVentas y main.py)
+cola_postventa = ColaPostVenta()
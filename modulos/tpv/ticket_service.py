@@ -1,7 +1,9 @@
 import logging
+import sqlite3
 from typing import Optional, List, Dict
 
-from database import connect
+from database import connect, rango_dia, dias_con_tickets, acumular_turno, reiniciar_turno, table_columns, atributos_lineas
+from dinero import Dinero, centimos
 
 logger = logging.getLogger(__name__)
 
@@ -19,31 +21,51 @@ class TicketService:
         Args:
             datos_ticket: Dict with keys like `total`, `cajero`, `cliente`,
                 `forma_pago`, `pagado`, `cambio`, `puntos_ganados`, `puntos_canjeados`, etc.
-            lineas_carrito: List of dicts with keys `sku`, `nombre`, `cantidad`, `precio`, `iva`.
+            lineas_carrito: List of dicts with keys `sku`, `nombre`, `cantidad`, `precio`, `iva`
+                and, for catalogue products, `id` (stored as `producto_id` together
+                with the product's current category and type).
 
         Returns:
             The created `ticket_id` on success, or `None` on failure.
         """
+        res = self.finalizar_venta(datos_ticket, lineas_carrito)
+        return res['ticket_id'] if res else None
+
+    def finalizar_venta(self, datos_ticket: Dict, lineas_carrito: List[Dict], cliente_id: Optional[int] = None) -> Optional[Dict]:
+        """Persist a whole sale atomically: one transaction, one commit.
+
+        Writes the ticket, its lines and the open-shift totals and, when
+        `cliente_id` is given, the client's points movement
+        (`-puntos_canjeados + puntos_ganados`) and spend (`total_gastado`).
+        In that case `puntos_total_momento` is the client's balance after
+        the sale, read inside the same transaction.
+
+        Returns:
+            Dict `{'ticket_id', 'ticket_no', 'saldo_puntos'}` on success
+            (`saldo_puntos` is None without client), or `None` on failure
+            (nothing is written).
+        """
         conn = None
         try:
             conn = connect()
             cur = conn.cursor()
 
-            # Begin explicit transaction
-            try:
-                conn.execute('BEGIN')
-            except Exception:
-                # Some wrappers/isolation levels may already have started a transaction
-                pass
+            # Take the write lock up front: a sale either waits for the lock here
+            # (connect() timeout) or not at all, never halfway through the inserts.
+            if not conn.in_transaction:
+                conn.execute('BEGIN IMMEDIATE')
 
-            # Compute next ticket_no using ticket_seq for atomic increments
+            # Compute next ticket_no using ticket_seq (one statement with RETURNING)
+            next_no = None
             try:
-                # increment sequence atomically within the transaction
-                cur.execute("UPDATE ticket_seq SET val = val + 1 WHERE name='ticket_no'")
-                cur.execute("SELECT val FROM ticket_seq WHERE name='ticket_no'")
-                row = cur.fetchone()
-                next_no = int(row[0]) if row and row[0] is not None else 1
-            except Exception:
+                cur.execute("UPDATE ticket_seq SET val = val + 1 WHERE name='ticket_no' RETURNING val")
+                rows = cur.fetchall()
+                if rows and rows[0][0] is not None:
+                    next_no = int(rows[0][0])
+            except sqlite3.OperationalError:
+                # sequence table missing (or very old SQLite without RETURNING)
+                next_no = None
+            if next_no is None:
                 # fallback to older strategy if sequence is missing
                 try:
                     cur.execute('SELECT COALESCE(MAX(ticket_no),0)+1 FROM tickets')
@@ -58,6 +80,26 @@ class TicketService:
 
                 created_at = datetime.now().isoformat()
 
+            # Loyalty client: points movement and spend, same transaction as the ticket
+            saldo_puntos = None
+            puntos_total_momento = datos_ticket.get('puntos_total_momento')
+            if cliente_id:
+                cur.execute(
+                    'UPDATE clientes SET puntos_fidelidad = COALESCE(puntos_fidelidad,0) + ?, '
+                    'total_gastado = COALESCE(total_gastado,0) + ? WHERE id=? RETURNING puntos_fidelidad',
+                    (
+                        float(datos_ticket.get('puntos_ganados') or 0.0) - float(datos_ticket.get('puntos_canjeados') or 0.0),
+                        float(datos_ticket.get('total', 0.0)),
+                        cliente_id,
+                    ),
+                )
+                rows = cur.fetchall()
+                if rows:
+                    saldo_puntos = float(rows[0][0] or 0.0)
+                    puntos_total_momento = saldo_puntos
+                else:
+                    logger.warning('Client id=%s not found; sale saved without loyalty update', cliente_id)
+
             ticket_params = (
                 created_at,
                 float(datos_ticket.get('total', 0.0)),
@@ -69,36 +111,93 @@ class TicketService:
                 datos_ticket.get('cambio'),
                 datos_ticket.get('puntos_ganados'),
                 datos_ticket.get('puntos_canjeados'),
-                datos_ticket.get('puntos_total_momento'),
+                puntos_total_momento,
             )
 
+            columnas_ticket = ['created_at', 'total', 'cajero', 'cliente', 'ticket_no', 'forma_pago', 'pagado', 'cambio',
+                               'puntos_ganados', 'puntos_canjeados', 'puntos_total_momento']
+            valores_ticket = list(ticket_params)
+            # the cart sends its exact total in cents; older callers only the float total
+            if datos_ticket.get('total_cent') is not None:
+                importe = Dinero(datos_ticket['total_cent'])
+            else:
+                importe = Dinero.de_euros(datos_ticket.get('total', 0.0))
+            total_cent = importe.centimos
+            if 'total_cent' in table_columns('tickets'):
+                # exact cents of the cart total in the same INSERT (the trigger only fills them when missing)
+                columnas_ticket.append('total_cent')
+                valores_ticket.append(total_cent)
             cur.execute(
-                'INSERT INTO tickets (created_at, total, cajero, cliente, ticket_no, forma_pago, pagado, cambio, puntos_ganados, puntos_canjeados, puntos_total_momento) VALUES (?,?,?,?,?,?,?,?,?,?,?)',
-                ticket_params,
+                f"INSERT INTO tickets ({', '.join(columnas_ticket)}) VALUES ({','.join('?' * len(columnas_ticket))})",
+                valores_ticket,
             )
 
             ticket_id = cur.lastrowid
 
-            # Insert ticket lines
-            for line in lineas_carrito:
+            # Insert ticket lines in one batch
+            filas = [
+                (
+                    ticket_id,
+                    line.get('sku'),
+                    line.get('nombre'),
+                    line.get('cantidad'),
+                    line.get('precio'),
+                    line.get('iva'),
+                )
+                for line in lineas_carrito
+            ]
+            columnas = ['ticket_id', 'sku', 'nombre', 'cantidad', 'precio', 'iva']
+            cols_lineas = table_columns('ticket_lines')
+            if 'producto_id' in cols_lineas:
+                # product id plus its category/type as of now, so close-out
+                # breakdowns never need to join productos again
+                try:
+                    snapshots = atributos_lineas(cur, lineas_carrito)
+                except sqlite3.Error:
+                    logger.exception('Error reading product attributes for ticket %s', ticket_id)
+                    snapshots = [(None, None, None)] * len(filas)
+                filas = [f + snap for f, snap in zip(filas, snapshots)]
+                columnas += ['producto_id', 'categoria', 'tipo']
+            if 'precio_cent' in cols_lineas:
+                # exact cents from the cart (Carrito keeps them per line)
+                filas = [
+                    f + (line['precio_cent'] if line.get('precio_cent') is not None else centimos(line.get('precio')),)
+                    for f, line in zip(filas, lineas_carrito)
+                ]
+                columnas.append('precio_cent')
+            sql_lineas = f"INSERT INTO ticket_lines ({', '.join(columnas)}) VALUES ({','.join('?' * len(columnas))})"
+            try:
+                cur.executemany(sql_lineas, filas)
+            except Exception:
+                logger.exception('Error inserting %s ticket lines for ticket %s', len(filas), ticket_id)
+                raise
+
+            # Running totals of the open shift, same transaction as the ticket.
+            # If that fails the sale still commits; the accumulator is emptied
+            # so the cash-up screen rebuilds it from tickets.
+            try:
+                cur.execute('SAVEPOINT turno')
+                acumular_turno(cur, {
+                    'total': ticket_params[1],
+                    'total_cent': total_cent,
+                    'cajero': ticket_params[2],
+                    'ticket_no': next_no,
+                    'forma_pago': ticket_params[5],
+                    'puntos_ganados': ticket_params[8],
+                    'puntos_canjeados': ticket_params[9],
+                }, lineas_carrito)
+                cur.execute('RELEASE SAVEPOINT turno')
+            except Exception:
+                logger.exception('Error updating turno_actual for ticket %s', ticket_id)
                 try:
-                    cur.execute(
-                        'INSERT INTO ticket_lines (ticket_id, sku, nombre, cantidad, precio, iva) VALUES (?,?,?,?,?,?)',
-                        (
-                            ticket_id,
-                            line.get('sku'),
-                            line.get('nombre'),
-                            line.get('cantidad'),
-                            line.get('precio'),
-                            line.get('iva'),
-                        ),
-                    )
+                    cur.execute('ROLLBACK TO SAVEPOINT turno')
+                    cur.execute('RELEASE SAVEPOINT turno')
+                    reiniciar_turno(cur)
                 except Exception:
-                    logger.exception('Error inserting ticket line: %s', line)
-                    raise
+                    pass
 
             conn.commit()
-            return ticket_id
+            return {'ticket_id': ticket_id, 'ticket_no': next_no, 'saldo_puntos': saldo_puntos}
 
         except Exception:
             logger.exception('Error saving ticket')
@@ -132,6 +231,10 @@ class TicketService:
                 pass
             cur.execute('DELETE FROM ticket_lines')
             cur.execute('DELETE FROM tickets')
+            try:
+                reiniciar_turno(cur)
+            except Exception:
+                pass
             # reset sequence
             try:
                 cur.execute("UPDATE ticket_seq SET val = 0 WHERE name='ticket_no'")
@@ -221,7 +324,7 @@ class TicketService:
         try:
             conn = connect()
             cur = conn.cursor()
-            cur.execute('SELECT id, created_at, ticket_no, cajero, total FROM tickets WHERE date(created_at)=? ORDER BY created_at ASC', (fecha_str,))
+            cur.execute('SELECT id, created_at, ticket_no, cajero, total FROM tickets WHERE created_at >= ? AND created_at < ? ORDER BY created_at ASC', rango_dia(fecha_str))
             rows = cur.fetchall()
             results = []
             for r in rows:
@@ -240,6 +343,14 @@ class TicketService:
             except Exception:
                 logger.exception('Error closing DB connection')
 
+    def listar_dias(self) -> List[str]:
+        """Return the days (YYYY-MM-DD) that have tickets, newest first."""
+        try:
+            return dias_con_tickets()
+        except Exception:
+            logger.exception('Error listing ticket days')
+            return []
+
     def resumen_dia(self, fecha_str: str):
         """Return a summary dict for the given date string (YYYY-MM-DD).
 
@@ -249,9 +360,10 @@ class TicketService:
         try:
             conn = connect()
             cur = conn.cursor()
-            cur.execute("SELECT MIN(ticket_no), MAX(ticket_no), COUNT(*), COALESCE(SUM(total),0) FROM tickets WHERE date(created_at)=?", (fecha_str,))
+            rango = rango_dia(fecha_str)
+            cur.execute("SELECT MIN(ticket_no), MAX(ticket_no), COUNT(*), COALESCE(SUM(total),0) FROM tickets WHERE created_at >= ? AND created_at < ?", rango)
             min_no, max_no, count_tickets, sum_total = cur.fetchone()
-            cur.execute("SELECT forma_pago, COUNT(*), COALESCE(SUM(total),0) FROM tickets WHERE date(created_at)=? GROUP BY forma_pago", (fecha_str,))
+            cur.execute("SELECT forma_pago, COUNT(*), COALESCE(SUM(total),0) FROM tickets WHERE created_at >= ? AND created_at < ? GROUP BY forma_pago", rango)
             pagos = cur.fetchall()
             return {
                 'fecha': fecha_str,
@@ -2,7 +2,7 @@ import customtkinter as ctk
 from tkinter import ttk
 from tkinter import messagebox as _mb
 from datetime import datetime
-from database import connect, close_day
+from database import connect, close_day, agregar_tickets, leer_turno, reconstruir_turno, TURNO_ABIERTO
 try:
     from modulos.tpv.preview_imprimir import preview_ticket
 except Exception:
@@ -91,100 +91,42 @@ class CierreCajaView(ctk.CTkFrame):
         self._update_footer_cierre()
         self._load_tickets_since_last_cierre()
 
-    def _get_last_cierre_id(self):
-        # legacy: still available but prefer datetime-based last cierre
-        conn = connect()
-        cur = conn.cursor()
-        try:
-            # Prefer the `cierres_caja` sequence for last cierre id
-            cur.execute('SELECT MAX(id) FROM cierres_caja')
-            r = cur.fetchone()
-            return r[0] if r and r[0] is not None else None
-        except Exception:
-            return None
-        finally:
-            try:
-                cur.close()
-            except Exception:
-                pass
+    def _get_last_cierre(self, refrescar=False):
+        """(id, fecha_hora) del último cierre, leído una vez y cacheado en la vista."""
+        if refrescar or not hasattr(self, '_last_cierre'):
+            conn = connect()
             try:
-                conn.close()
+                cur = conn.cursor()
+                cur.execute('SELECT id, fecha_hora FROM cierres_caja ORDER BY id DESC LIMIT 1')
+                r = cur.fetchone()
+                self._last_cierre = (r[0], r[1]) if r else (None, None)
             except Exception:
-                pass
+                self._last_cierre = (None, None)
+            finally:
+                try:
+                    conn.close()
+                except Exception:
+                    pass
+        return self._last_cierre
 
-    def _get_last_cierre_datetime(self):
-        """Return ISO datetime string of last cierre stored in `cierres_caja`, or None.
+    def _get_last_cierre_id(self):
+        # legacy: still available but prefer datetime-based last cierre
+        return self._get_last_cierre()[0]
 
-        Only reads from `cierres_caja`.
-        """
-        conn = connect()
-        cur = conn.cursor()
-        try:
-            cur.execute("SELECT MAX(fecha_hora) FROM cierres_caja")
-            r = cur.fetchone()
-            return r[0] if r and r[0] else None
-        finally:
-            try:
-                cur.close()
-            except Exception:
-                pass
-            try:
-                conn.close()
-            except Exception:
-                pass
+    def _get_last_cierre_datetime(self):
+        """Return ISO datetime string of last cierre stored in `cierres_caja`, or None."""
+        return self._get_last_cierre()[1] or None
 
     def _get_next_cierre_num(self):
-        conn = connect()
-        cur = conn.cursor()
-        try:
-            # Use `cierres_caja` id sequence for the next cierre number
-            cur.execute('SELECT MAX(id) FROM cierres_caja')
-            r = cur.fetchone()
-            last = r[0] if r and r[0] is not None else 0
-            return int(last) + 1
-        except Exception:
-            return 1
-        finally:
-            try:
-                cur.close()
-            except Exception:
-                pass
-            try:
-                conn.close()
-            except Exception:
-                pass
+        last = self._get_last_cierre()[0]
+        return int(last or 0) + 1
 
     def _update_footer_cierre(self):
-        # Query cierres_caja for last id and fecha
-        conn = connect()
-        cur = conn.cursor()
-        try:
-            cur.execute("SELECT MAX(id), fecha_hora FROM cierres_caja")
-            r = cur.fetchone()
-            if r and r[0] is not None:
-                last_id = r[0]
-                # try to get fecha_hora for that id
-                try:
-                    cur.execute('SELECT fecha_hora FROM cierres_caja WHERE id=?', (last_id,))
-                    fr = cur.fetchone()
-                    fecha = fr[0] if fr and fr[0] else 'N/D'
-                except Exception:
-                    fecha = 'N/D'
-                next_id = int(last_id) + 1
-                text = f"Último Cierre: Nº {last_id} ({fecha}) | Próximo Cierre será: Nº {next_id}"
-            else:
-                text = "Último Cierre: NINGUNO | Próximo Cierre será: Nº 1"
-        except Exception:
+        last_id, fecha = self._get_last_cierre(refrescar=True)
+        if last_id is not None:
+            text = f"Último Cierre: Nº {last_id} ({fecha or 'N/D'}) | Próximo Cierre será: Nº {int(last_id) + 1}"
+        else:
             text = "Último Cierre: NINGUNO | Próximo Cierre será: Nº 1"
-        finally:
-            try:
-                cur.close()
-            except Exception:
-                pass
-            try:
-                conn.close()
-            except Exception:
-                pass
 
         try:
             self.lbl_footer.configure(text=text)
@@ -397,135 +339,42 @@ class CierreCajaView(ctk.CTkFrame):
         return ''.join(lines)
 
     def _aggregate_for_selected(self):
-        # build where clause based on last cierre datetime
+        # the open shift: tickets without a Z close (same rule as close_day)
         last_dt = self._get_last_cierre_datetime()
         now_dt = datetime.now().isoformat()
         conn = connect()
-        cur = conn.cursor()
         try:
-            if last_dt:
-                where = "created_at > ? AND created_at <= ?"
-                params = (last_dt, now_dt)
-            else:
-                where = "created_at <= ?"
-                params = (now_dt,)
-
-            # Try to include fidelity columns if present; fallback if table doesn't have them
-            try:
-                cur.execute(f"SELECT MIN(ticket_no), MAX(ticket_no), COUNT(*), COALESCE(SUM(total),0), COALESCE(SUM(puntos_ganados),0), COALESCE(SUM(puntos_canjeados),0) FROM tickets WHERE {where}", params)
-                min_no, max_no, count_tickets, sum_total, sum_puntos_ganados, sum_puntos_canjeados = cur.fetchone()
-            except Exception:
-                cur.execute(f"SELECT MIN(ticket_no), MAX(ticket_no), COUNT(*), COALESCE(SUM(total),0) FROM tickets WHERE {where}", params)
-                min_no, max_no, count_tickets, sum_total = cur.fetchone()
-                sum_puntos_ganados = 0.0
-                sum_puntos_canjeados = 0.0
-
-            cur.execute(f"SELECT forma_pago, COUNT(*), COALESCE(SUM(total),0) FROM tickets WHERE {where} GROUP BY forma_pago", params)
-            pagos = [{"forma": r[0] or '', "count": r[1], "total": r[2] or 0.0} for r in cur.fetchall()]
-
-            # Totales por forma de pago (EFECTIVO / TARJETA)
-            try:
-                cur.execute(f"SELECT COALESCE(SUM(total),0) FROM tickets WHERE {where} AND forma_pago = ?", params + ('EFECTIVO',))
-                total_efectivo = float(cur.fetchone()[0] or 0.0)
-            except Exception:
-                total_efectivo = 0.0
-
-            try:
-                cur.execute(f"SELECT COALESCE(SUM(total),0) FROM tickets WHERE {where} AND forma_pago = ?", params + ('TARJETA',))
-                total_tarjeta = float(cur.fetchone()[0] or 0.0)
-            except Exception:
-                total_tarjeta = 0.0
-            # total for WEB payments
-            try:
-                cur.execute(f"SELECT COALESCE(SUM(total),0) FROM tickets WHERE {where} AND forma_pago = ?", params + ('WEB',))
-                total_web = float(cur.fetchone()[0] or 0.0)
-            except Exception:
-                total_web = 0.0
-
-            resumen = {
+            where, params = TURNO_ABIERTO, ()
+
+            # cifras del turno abierto: acumuladas en turno_actual al guardar cada ticket
+            resumen = leer_turno(conn)
+            if resumen is None:
+                reconstruir_turno(conn)
+                conn.commit()
+                resumen = leer_turno(conn)
+            if resumen is None:
+                resumen = agregar_tickets(conn, where, params, por_lineas=True)
+            # desgloses opcionales: una pasada sobre las líneas del turno
+            por_categoria = bool(self.opt_cat.get())
+            por_tipo = bool(self.opt_top.get())
+            por_articulo = bool(self.opt_lines.get())
+            if por_categoria or por_tipo or por_articulo:
+                extra = agregar_tickets(conn, where, params, por_tickets=False, por_categoria=por_categoria,
+                                        por_tipo=por_tipo, por_articulo=por_articulo)
+                for key in ('por_categoria', 'por_tipo', 'por_articulo'):
+                    if key in extra:
+                        resumen[key] = extra[key]
+            resumen.update({
                 'fecha_desde': last_dt,
                 'fecha_hasta': now_dt,
-                'tickets_from': min_no,
-                'tickets_to': max_no,
-                'count_tickets': count_tickets,
-                'total': float(sum_total or 0.0),
-                'por_forma_pago': pagos,
                 'numero': self._get_next_cierre_num(),
-                'puntos_ganados': float(sum_puntos_ganados or 0.0),
-                'puntos_canjeados': float(sum_puntos_canjeados or 0.0),
-                'total_efectivo': float(total_efectivo or 0.0),
-                'total_tarjeta': float(total_tarjeta or 0.0),
-                'total_web': float(total_web or 0.0),
-            }
-
-            # impuestos por tipo de IVA
-            # cuando hacemos JOIN con ticket_lines/tickets usamos t.created_at en el WHERE
-            where_t = where.replace('created_at', 't.created_at')
-            cur.execute(f"SELECT tl.iva, COALESCE(SUM(tl.cantidad * tl.precio),0) as subtotal FROM ticket_lines tl JOIN tickets t ON tl.ticket_id = t.id WHERE {where_t} GROUP BY tl.iva", params)
-            impuestos = []
-            for iva_rate, subtotal in cur.fetchall():
-                try:
-                    iva_f = float(iva_rate or 0.0)
-                    subtotal_f = float(subtotal or 0.0)
-                    divisor = 1 + (iva_f / 100.0) if iva_f != 0 else 1.0
-                    base = subtotal_f / divisor
-                    cuota = subtotal_f - base
-                except Exception:
-                    base = 0.0
-                    cuota = 0.0
-                impuestos.append({'iva': iva_f, 'base': base, 'cuota': cuota, 'total': subtotal_f})
-            resumen['impuestos'] = impuestos
-
-            # ventas por cajero
-            cur.execute(f"SELECT cajero, COUNT(*), COALESCE(SUM(total),0) FROM tickets WHERE {where} GROUP BY cajero", params)
-            resumen['por_cajero'] = [{'cajero': r[0] or 'N/D', 'count': r[1], 'total': r[2]} for r in cur.fetchall()]
-
-            # aperturas de cajón sin venta: no hay trazado en BD -> devolver 0
-            resumen['aperturas_cajon_sin_venta'] = 0
-
-            # condicionales: categorias, tipos, articulos
-            if self.opt_cat.get():
-                cur.execute(f"""
-                    SELECT COALESCE(p.categoria, ''), SUM(tl.cantidad) as qty, SUM(tl.cantidad * tl.precio) as total
-                    FROM ticket_lines tl
-                    JOIN tickets t ON tl.ticket_id = t.id
-                    JOIN productos p ON tl.sku = p.sku
-                    WHERE {where_t}
-                    GROUP BY p.categoria
-                """, params)
-                resumen['por_categoria'] = [{"categoria": r[0], "qty": r[1], "total": r[2]} for r in cur.fetchall()]
-
-            if self.opt_top.get():
-                # Resumen Tipos (agrupado por producto.tipo)
-                cur.execute(f"""
-                    SELECT COALESCE(p.tipo, ''), SUM(tl.cantidad) as qty, SUM(tl.cantidad * tl.precio) as total
-                    FROM ticket_lines tl
-                    JOIN tickets t ON tl.ticket_id = t.id
-                    JOIN productos p ON tl.sku = p.sku
-                    WHERE {where_t}
-                    GROUP BY p.tipo
-                """, params)
-                resumen['por_tipo'] = [{"tipo": r[0], "qty": r[1], "total": r[2]} for r in cur.fetchall()]
-
-            if self.opt_lines.get():
-                cur.execute(f"""
-                    SELECT tl.nombre, SUM(tl.cantidad) as qty, SUM(tl.cantidad * tl.precio) as total
-                    FROM ticket_lines tl
-                    JOIN tickets t ON tl.ticket_id = t.id
-                    WHERE {where_t}
-                    GROUP BY tl.nombre
-                    ORDER BY qty DESC
-                """, params)
-                resumen['por_articulo'] = [{"nombre": r[0], "qty": r[1], "total": r[2]} for r in cur.fetchall()]
-
+                # aperturas de cajón sin venta: no hay trazado en BD -> devolver 0
+                'aperturas_cajon_sin_venta': 0,
+            })
             return resumen
         except Exception:
             return None
         finally:
-            try:
-                cur.close()
-            except Exception:
-                pass
             try:
                 conn.close()
             except Exception:
@@ -573,7 +422,9 @@ class CierreCajaView(ctk.CTkFrame):
                 # delegate persistence to central `close_day` (no direct DB access here)
                 try:
                     cierre_cajero = self.cajero_activo.get('nombre') if getattr(self, 'cajero_activo', None) else None
-                    resumen = close_day(fecha=self.current_date, tipo='Z', cajero=cierre_cajero)
+                    resumen = close_day(fecha=self.current_date, tipo='Z', cajero=cierre_cajero,
+                                        include_category=bool(self.opt_cat.get() or self.opt_top.get()),
+                                        include_products=bool(self.opt_lines.get()))
                 except Exception as e:
                     _mb.showerror('Error', f'Error ejecutando cierre: {e}')
                     return
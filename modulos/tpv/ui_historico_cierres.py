@@ -88,6 +88,13 @@ class HistoricoCierresView(ctk.CTkFrame):
         self.ent_hasta.insert(0, hasta.isoformat())
         self._query_and_populate(desde.isoformat(), hasta.isoformat())
 
+    def on_show(self):
+        # la vista se conserva entre navegaciones: volver a listar el periodo por si hay cierres nuevos
+        d = self.ent_desde.get().strip()
+        h = self.ent_hasta.get().strip()
+        if self._valid_date(d) and self._valid_date(h):
+            self._query_and_populate(d, h)
+
     def _valid_date(self, s: str) -> bool:
         try:
             datetime.strptime(s, "%Y-%m-%d")
@@ -126,6 +133,17 @@ class HistoricoCierresView(ctk.CTkFrame):
             total_sum = sum(float(r.get("total_ingresos") or 0.0) for r in rows)
             self.detalle_txt.delete("0.0", "end")
             self.detalle_txt.insert("end", f"Cierres: {len(rows)}\nTotal ingresos: {total_sum:.2f} €\n")
+            # Desglose del periodo desde el resumen diario (sólo días cerrados con Z)
+            periodo = self.cierre_service.resumen_periodo(desde, hasta)
+            if periodo:
+                lineas = ["\nPOR FORMA DE PAGO:\n"]
+                for f in periodo.get('por_forma_pago', []):
+                    lineas.append(f"{(f.get('forma') or 'N/D')[:18]:<18} {int(f.get('count') or 0):>4} {float(f.get('total') or 0.0):>9.2f}€\n")
+                if periodo.get('por_categoria'):
+                    lineas.append("\nPOR CATEGORÍAS:\n")
+                    for c in sorted(periodo['por_categoria'], key=lambda c: c.get('total') or 0.0, reverse=True):
+                        lineas.append(f"{(c.get('categoria') or 'N/D')[:18]:<18} {int(c.get('qty') or 0):>4} {float(c.get('total') or 0.0):>9.2f}€\n")
+                self.detalle_txt.insert("end", "".join(lineas))
         except Exception:
             logging.exception("Error en _query_and_populate")
 
@@ -1,6 +1,6 @@
 import customtkinter as ctk
 import sqlite3
-from database import connect
+from database import connect, rango_dia, dias_con_tickets
 from datetime import datetime
 from tkinter import ttk
 try:
@@ -100,23 +100,11 @@ class TicketsView(ctk.CTkFrame):
         self._show_day(self.day_index)
 
     def _load_days(self):
-        conn = connect()
-        cur = conn.cursor()
         try:
-            cur.execute("SELECT DISTINCT date(created_at) as dia FROM tickets ORDER BY dia DESC")
-            rows = cur.fetchall()
-            self.days = [r[0] for r in rows]
+            # un salto por día sobre idx_tickets_created_at (más reciente primero)
+            self.days = dias_con_tickets()
         except Exception:
             self.days = []
-        finally:
-            try:
-                cur.close()
-            except Exception:
-                pass
-            try:
-                conn.close()
-            except Exception:
-                pass
 
     def _show_day(self, index):
         if not self.days:
@@ -133,7 +121,7 @@ class TicketsView(ctk.CTkFrame):
         conn = connect()
         cur = conn.cursor()
         try:
-            cur.execute("SELECT id, created_at, total, ticket_no, forma_pago, cajero, pagado, cambio, cliente FROM tickets WHERE date(created_at)=? ORDER BY created_at ASC", (self.current_date,))
+            cur.execute("SELECT id, created_at, total, ticket_no, forma_pago, cajero, pagado, cambio, cliente FROM tickets WHERE created_at >= ? AND created_at < ? ORDER BY created_at ASC", rango_dia(self.current_date))
             rows = cur.fetchall()
         except Exception:
             rows = []
@@ -10,12 +10,15 @@ from modulos.configuracion.config_service import ConfigService
 from modulos.clientes.cliente_service import ClienteService
 from modulos.clientes.ui_selector_cliente import SelectorCliente
 from modulos.configuracion.ui_login_cajero import LoginCajero
+from dinero import Dinero
 try:
     from modulos.tpv.preview_imprimir import preview_ticket
 except Exception:
     preview_ticket = None
 
 from modulos.tpv.ticket_service import TicketService
+from modulos.tpv.postventa import cola_postventa
+from modulos.tpv.carrito import Carrito
 
 class CajaVentas(ctk.CTkFrame):
     def __init__(self, parent, controller):
@@ -26,7 +29,8 @@ class CajaVentas(ctk.CTkFrame):
         self.ticket_service = TicketService()
         
         # --- CARRITO ---
-        self.carrito = [] 
+        # modelo con fusión por id y totales acumulados; el visor se actualiza por eventos
+        self.carrito = Carrito()
         self._awaiting_final_confirmation = False
         # Cliente actual (dict) asignado a la venta
         self.cliente_actual = None
@@ -127,6 +131,7 @@ class CajaVentas(ctk.CTkFrame):
         
         self.lbl_iva = ctk.CTkLabel(self.frame_totales, text="Base: 0.00€ | IVA: 0.00€", font=("Arial", 14), text_color="white")
         self.lbl_iva.pack()
+        self.carrito.suscribir(self._on_carrito_cambio)
 
         # Elementos para entrada de efectivo (inicialmente ocultos)
         self.lbl_efectivo = ctk.CTkLabel(self.frame_totales, text="Introducir efectivo entregado:", font=("Arial", 14), text_color="red")
@@ -282,6 +287,25 @@ class CajaVentas(ctk.CTkFrame):
         ctk.CTkButton(self.frame_botones, text="🔒 CERRAR DÍA", height=30, fg_color="darkred", command=self._on_cerrar_dia).grid(row=8, column=0, sticky="ew", padx=5, pady=(20,5))
         ctk.CTkButton(self.frame_botones, text="🔓 CAJÓN", height=30, fg_color="#555555").grid(row=8, column=1, sticky="ew", padx=5, pady=(20,5))
 
+    def on_show(self):
+        """La caja se conserva entre navegaciones (venta en curso incluida): recuperar atajos y cajero."""
+        try:
+            self.controller.bind_all("<Key>", self._on_global_key)
+        except Exception:
+            pass
+        self._actualizar_interfaz_cajero()
+        try:
+            self.entry_codigo.focus_set()
+        except Exception:
+            pass
+
+    def on_hide(self):
+        # con la caja oculta, las teclas numéricas no deben ir al efectivo
+        try:
+            self.controller.unbind_all("<Key>")
+        except Exception:
+            pass
+
     def actualizar_reloj(self):
         ahora = datetime.now().strftime("%d/%m/%Y %H:%M:%S")
         self.lbl_reloj.configure(text=ahora)
@@ -399,11 +423,7 @@ class CajaVentas(ctk.CTkFrame):
                     return
                 # aplicar descuento como línea negativa
                 descuento_item = {"id": "MAN_DESC", "nombre": "DESC. MANUAL", "precio": -round(float(monto or 0.0), 2), "cantidad": 1, "iva": 0}
-                self.carrito.append(descuento_item)
-                try:
-                    self.actualizar_visor()
-                except Exception:
-                    pass
+                self.carrito.agregar(descuento_item, fusionar=False)
             except Exception:
                 pass
 
@@ -529,7 +549,7 @@ class CajaVentas(ctk.CTkFrame):
             if not hasattr(self, 'fidelizacion_service'):
                 from modulos.tpv.fidelizacion_service import FidelizacionService
                 self.fidelizacion_service = FidelizacionService()
-            return float(self.fidelizacion_service.calcular_puntos(getattr(self, 'carrito', []), getattr(self, 'cliente_actual', None)) or 0.0)
+            return float(self.fidelizacion_service.calcular_puntos(self.carrito.lineas(), getattr(self, 'cliente_actual', None)) or 0.0)
         except Exception:
             logging.exception('Error delegando cálculo de puntos a FidelizacionService')
             return 0.0
@@ -649,23 +669,17 @@ class CajaVentas(ctk.CTkFrame):
 
             # remove any existing discount line
             try:
-                self.carrito = [it for it in self.carrito if it.get('id') != 'DESC']
+                self.carrito.quitar_id('DESC')
             except Exception:
                 pass
 
-            # aplicar descuento como línea negativa
+            # aplicar descuento como línea negativa (el visor se actualiza con el evento)
             try:
                 descuento_item = {"id": "DESC", "nombre": "DESC. PUNTOS", "precio": -round(descuento_euros, 2), "cantidad": 1, "iva": 0}
-                self.carrito.append(descuento_item)
+                self.carrito.agregar(descuento_item, fusionar=False)
                 self.puntos_a_canjear = pts
             except Exception:
                 pass
-
-            # actualizar visor para reflejar descuento
-            try:
-                self.actualizar_visor()
-            except Exception:
-                pass
         except Exception:
             logging.exception('Error en canje de puntos')
 
@@ -992,17 +1006,8 @@ class CajaVentas(ctk.CTkFrame):
                     "cantidad": 1
                 }
 
-                encontrado = False
-                for item in self.carrito:
-                    if item['id'] == producto['id']:
-                        item['cantidad'] += 1
-                        encontrado = True
-                        break
-
-                if not encontrado:
-                    self.carrito.append(producto)
-
-                self.actualizar_visor()
+                # misma referencia: suma una unidad a su línea
+                self.carrito.agregar(producto)
                 self.entry_codigo.delete(0, 'end')
                 return
 
@@ -1055,15 +1060,7 @@ class CajaVentas(ctk.CTkFrame):
                             precio_base = 0.0
                         iva_val = row.get('tipo_iva') if isinstance(row, dict) else None
                         producto = {"nombre": nombre, "precio": precio_base, "sku": sku, "iva": iva_val or 21, "id": pid, "cantidad": 1}
-                        encontrado = False
-                        for item in self.carrito:
-                            if item['id'] == producto['id']:
-                                item['cantidad'] += 1
-                                encontrado = True
-                                break
-                        if not encontrado:
-                            self.carrito.append(producto)
-                        self.actualizar_visor()
+                        self.carrito.agregar(producto)
                     return _cmd
 
                 btn = ctk.CTkButton(self.selector_area, text=f"{nombre} — {sku} — {float(pvp):.2f}€", command=_make_cmd())
@@ -1074,67 +1071,55 @@ class CajaVentas(ctk.CTkFrame):
         except Exception as e:
             print(f"Error búsqueda global: {e}")
 
+    # los productos empiezan en la línea 3 del visor (1: cabecera, 2: separador)
+    VISOR_PRIMERA_LINEA = 3
+
+    def _linea_visor(self, item) -> str:
+        return f"{item['cantidad']}x    {(item.get('nombre') or '')[:22]:<25} {item['precio']:>8.2f}€ {Carrito.subtotal(item):>9.2f}€"
+
     def actualizar_visor(self):
+        """Redibuja el visor entero (al vaciar el carrito); los cambios sueltos van por `_on_carrito_cambio`."""
         self.lista_productos.configure(state="normal")
         self.lista_productos.delete("0.0", "end")
-        
-        total_pagar = 0.0
-        total_base = 0.0
-        total_iva = 0.0
 
         self.lista_productos.insert("end", f"{'CANT':<5} {'PRODUCTO':<25} {'PRECIO':>10} {'TOTAL':>10}\n")
         self.lista_productos.insert("end", "-"*55 + "\n")
-
-        for idx, item in enumerate(self.carrito):
-            # proteger valores: precio y cantidad pueden ser None o strings
-            precio_raw = item.get('precio')
-            cantidad_raw = item.get('cantidad', 0)
-            if precio_raw is None:
-                try:
-                    logging.warning('Producto sin precio al renderizar visor: SKU=%s id=%s', item.get('sku'), item.get('id'))
-                except Exception:
-                    logging.warning('Producto sin precio al renderizar visor: id=%s', item.get('id'))
-            try:
-                precio = float(precio_raw or 0.0)
-            except Exception:
-                precio = 0.0
-            try:
-                cantidad = int(cantidad_raw)
-            except Exception:
-                try:
-                    cantidad = int(float(cantidad_raw))
-                except Exception:
-                    cantidad = 0
-
-            subtotal = precio * cantidad
-            try:
-                iva_val = float(item.get('iva') or 0.0)
-            except Exception:
-                iva_val = 0.0
-            divisor = 1 + (iva_val / 100)
-            base_item = subtotal / divisor if divisor != 0 else 0.0
-            iva_item = subtotal - base_item
-
-            total_pagar += subtotal
-            total_base += base_item
-            total_iva += iva_item
-
-            linea = f"{cantidad}x    {item.get('nombre','')[:22]:<25} {precio:>8.2f}€ {subtotal:>9.2f}€\n"
-            # insertar y etiquetar la línea para selección
-            self.lista_productos.insert("end", linea)
-            line_no = 3 + idx
-            try:
-                self.lista_productos._textbox.tag_remove(f"item_{idx}", f"{line_no}.0", f"{line_no}.end")
-            except Exception:
-                pass
-            try:
-                self.lista_productos._textbox.tag_add(f"item_{idx}", f"{line_no}.0", f"{line_no}.end")
-            except Exception:
-                pass
+        for item in self.carrito:
+            self.lista_productos.insert("end", self._linea_visor(item) + "\n")
 
         self.lista_productos.configure(state="disabled")
-        self.lbl_total.configure(text=f"TOTAL: {total_pagar:.2f} €")
-        self.lbl_iva.configure(text=f"Base Imponible: {total_base:.2f}€ | Total IVA: {total_iva:.2f}€")
+        self._actualizar_totales()
+
+    def _actualizar_totales(self):
+        base, iva = self.carrito.desglose()
+        self.lbl_total.configure(text=f"TOTAL: {self.carrito.total():.2f} €")
+        self.lbl_iva.configure(text=f"Base Imponible: {base:.2f}€ | Total IVA: {iva:.2f}€")
+
+    def _on_carrito_cambio(self, evento, indice, linea):
+        """Aplica al visor sólo la línea afectada y refresca los totales."""
+        if evento == 'vacio' or (evento == 'alta' and len(self.carrito) == 1):
+            # carrito nuevo: cabecera + primera línea
+            self.actualizar_visor()
+            return
+        n = self.VISOR_PRIMERA_LINEA + indice
+        box = self.lista_productos
+        box.configure(state="normal")
+        try:
+            if evento == 'alta':
+                box.insert("end", self._linea_visor(linea) + "\n")
+            elif evento == 'cambio':
+                box.delete(f"{n}.0", f"{n}.end")
+                box.insert(f"{n}.0", self._linea_visor(linea))
+                if getattr(self, '_selected_carrito_index', None) == indice:
+                    try:
+                        box._textbox.tag_add('selected', f"{n}.0", f"{n}.end")
+                    except Exception:
+                        pass
+            elif evento == 'baja':
+                box.delete(f"{n}.0", f"{n + 1}.0")
+        finally:
+            box.configure(state="disabled")
+        self._actualizar_totales()
 
     def _update_impr_button(self):
         try:
@@ -1154,36 +1139,12 @@ class CajaVentas(ctk.CTkFrame):
             pass
 
     def _total_carrito(self) -> float:
-        """Calcula el total del carrito de forma segura, evitando None en precio/cantidad.
-
-        Registra un warning si encuentra un producto sin precio (para identificar SKU/id).
-        """
-        total = 0.0
+        """Total del carrito (acumulado por el modelo, sin recorrer las líneas)."""
         try:
-            for it in getattr(self, 'carrito', []) or []:
-                precio_raw = it.get('precio')
-                cantidad_raw = it.get('cantidad', 0)
-                if precio_raw is None:
-                    try:
-                        logging.warning('Producto sin precio al calcular total: SKU=%s id=%s', it.get('sku'), it.get('id'))
-                    except Exception:
-                        logging.warning('Producto sin precio al calcular total: id=%s', it.get('id'))
-                try:
-                    precio = float(precio_raw or 0.0)
-                except Exception:
-                    precio = 0.0
-                try:
-                    cantidad = int(cantidad_raw)
-                except Exception:
-                    try:
-                        cantidad = int(float(cantidad_raw))
-                    except Exception:
-                        cantidad = 0
-                total += precio * cantidad
+            return self.carrito.total()
         except Exception:
             logging.exception('Error calculando total seguro del carrito')
             return 0.0
-        return total
 
     def _on_text_click(self, event):
         try:
@@ -1221,17 +1182,16 @@ class CajaVentas(ctk.CTkFrame):
             if 0 <= idx < len(self.carrito):
                 # si hay más de 1 unidad, decrementar en 1; si no, eliminar la línea
                 if self.carrito[idx].get('cantidad', 1) > 1:
-                    self.carrito[idx]['cantidad'] -= 1
                     # mantener la selección en la misma línea
+                    self.carrito.quitar_unidad(idx)
                 else:
-                    del self.carrito[idx]
                     # limpiar selección si el item desaparece
+                    self._selected_carrito_index = None
+                    self.carrito.quitar_unidad(idx)
                     try:
                         self.lista_productos._textbox.tag_remove('selected', '1.0', 'end')
                     except Exception:
                         pass
-                    self._selected_carrito_index = None
-                self.actualizar_visor()
         except Exception as e:
             print(f"Error al eliminar item: {e}")
 
@@ -1401,8 +1361,9 @@ class CajaVentas(ctk.CTkFrame):
 
             efectivo = float(self.entry_efectivo.get())
             total = self._total_carrito()
-            if efectivo >= total:
-                cambio = efectivo - total
+            entregado = Dinero.de_euros(efectivo)
+            if entregado >= self.carrito.importe():
+                cambio = (entregado - self.carrito.importe()).euros()
                 # specify payment method as EFECTIVO
                 self.limpiar_tras_venta(efectivo, cambio, forma_pago='EFECTIVO')
                 # Ocultar entrada
@@ -1418,14 +1379,13 @@ class CajaVentas(ctk.CTkFrame):
 
     def limpiar_tras_venta(self, efectivo, cambio, forma_pago='EFECTIVO'):
         print("¡Venta completada!")
-        
-        # Generar el texto del ticket
+
+        # Foto de la venta y a la cola post-venta: guardar, puntos del cliente
+        # e impresión van en un hilo de fondo para no congelar la caja.
+        previsto = None
+        total = 0.0
         if self.carrito:
-                # First: save ticket and lines using TicketService
             try:
-                from datetime import datetime
-                now = datetime.now().isoformat()
-
                 total = self._total_carrito()
 
                 # cajero text extraction (same logic as before)
@@ -1452,324 +1412,133 @@ class CajaVentas(ctk.CTkFrame):
                 except Exception:
                     cajero_txt = ''
 
+                cliente = getattr(self, 'cliente_actual', None) or None
                 cliente_nombre = None
                 try:
-                    if getattr(self, 'cliente_actual', None):
-                        cliente_nombre = self.cliente_actual.get('nombre')
+                    if cliente:
+                        cliente_nombre = cliente.get('nombre')
                 except Exception:
                     cliente_nombre = None
 
-                if cliente_nombre:
-                    try:
-                        if not hasattr(self, 'fidelizacion_service'):
-                            from modulos.tpv.fidelizacion_service import FidelizacionService
-                            self.fidelizacion_service = FidelizacionService()
-                        puntos_ganados = float(self.fidelizacion_service.calcular_puntos(self.carrito, getattr(self, 'cliente_actual', None)) or 0.0)
-                    except Exception:
-                        puntos_ganados = 0.0
-                    try:
-                        puntos_canjeados = float(getattr(self, 'puntos_a_canjear', 0.0) or 0.0)
-                    except Exception:
-                        puntos_canjeados = 0.0
-                else:
-                    puntos_ganados = 0.0
-                    puntos_canjeados = 0.0
-
-                try:
-                    puntos_total_momento = None
-                    cliente_id = None
-                    if getattr(self, 'cliente_actual', None):
-                        try:
-                            cliente_id = self.cliente_actual.get('id')
-                        except Exception:
-                            cliente_id = None
-                    if cliente_id:
-                        try:
-                            svc = ClienteService()
-                            datos_cli = svc.obtener_por_id(cliente_id) or {}
-                            saldo_actual = float(datos_cli.get('puntos_fidelidad') or 0.0)
-                            puntos_total_momento = float(saldo_actual) - float(puntos_canjeados) + float(puntos_ganados)
-                        except Exception:
-                            puntos_total_momento = float(0.0)
-                    else:
-                        puntos_total_momento = float(0.0)
-                except Exception:
-                    puntos_total_momento = float(0.0)
-
-                datos_ticket = {
-                    'created_at': now,
-                    'total': total,
-                    'cajero': cajero_txt,
-                    'cliente': cliente_nombre,
-                    'forma_pago': forma_pago,
-                    'pagado': efectivo,
-                    'cambio': cambio,
-                    'puntos_ganados': puntos_ganados,
-                    'puntos_canjeados': puntos_canjeados,
-                    'puntos_total_momento': puntos_total_momento,
-                }
-
-                ticket_id = self.ticket_service.guardar_ticket(datos_ticket, self.carrito)
-
+                previsto = cola_postventa.encolar({
+                    'datos_ticket': {
+                        'created_at': datetime.now().isoformat(),
+                        'total': total,
+                        'total_cent': self.carrito.total_centimos(),
+                        'cajero': cajero_txt,
+                        'cliente': cliente_nombre,
+                        'forma_pago': forma_pago,
+                        'pagado': efectivo,
+                        'cambio': cambio,
+                    },
+                    'carrito': self.carrito.lineas(),
+                    'cliente': cliente if cliente_nombre else None,
+                    'puntos_canjear': getattr(self, 'puntos_a_canjear', 0.0) or 0.0,
+                    'imprimir': bool(getattr(self.controller, 'imprimir_tickets_enabled', False)),
+                })
+                self._programar_postventa()
             except Exception:
-                ticket_id = None
-
-            except Exception as e:
-                print(f"Error guardando ticket en BD: {e}")
-
-                # Then: print/preview only if printing is enabled in controller
-            try:
-                # Fetch saved ticket and lines via TicketService to avoid SQL in UI
-                try:
-                    datos = self.ticket_service.obtener_ticket_completo(ticket_id)
-                    if datos:
-                        meta = datos.get('meta') or {}
-                        lines = datos.get('lineas') or []
-                    else:
-                        meta = None
-                        lines = []
-                except Exception:
-                    meta = None
-                    lines = []
+                logging.exception('Error encolando la venta')
+                messagebox.showerror('Error', 'No se pudo registrar la venta')
+                return
 
-                # Build textual ticket (header + lines + totals + pagado/cambio)
-                try:
-                    if meta:
-                        try:
-                            created_at = meta.get('created_at')
-                        except Exception:
-                            created_at = None
-                        try:
-                            cajero_meta = meta.get('cajero') or ''
-                        except Exception:
-                            cajero_meta = ''
-                        try:
-                            total_meta = float(meta.get('total') or 0.0)
-                        except Exception:
-                            total_meta = total
-                        try:
-                            ticket_no_meta = meta.get('ticket_no') or meta.get('id') or ticket_id
-                        except Exception:
-                            ticket_no_meta = ticket_id
-                        try:
-                            forma_meta = meta.get('forma_pago') or forma_pago
-                        except Exception:
-                            forma_meta = forma_pago
-                        try:
-                            pagado_meta = meta.get('pagado')
-                        except Exception:
-                            pagado_meta = efectivo
-                        try:
-                            cambio_meta = meta.get('cambio')
-                        except Exception:
-                            cambio_meta = cambio
-                        try:
-                            cliente_meta = meta.get('cliente') or ''
-                        except Exception:
-                            cliente_meta = ''
-                    else:
-                        created_at = None
-                        cajero_meta = ''
-                        total_meta = total
-                        ticket_no_meta = ticket_id
-                        forma_meta = forma_pago
-                        pagado_meta = efectivo
-                        cambio_meta = cambio
-                        cliente_meta = ''
-                except Exception:
-                    created_at = None
-                    cajero_meta = ''
-                    total_meta = total
-                    ticket_no_meta = ticket_id
-                    forma_meta = forma_pago
-                    pagado_meta = efectivo
-                    cambio_meta = cambio
-                    cliente_meta = ''
-
-                header_lines = []
-                header_lines.append("KOOL DREAMS\nC/Juan Sebastián Elcano, 2\n43850 Cambrils\nNIF: 39887072N\n")
-                header_lines.append("-"*30 + "\n")
-                header_lines.append(f"FACTURA Nº: {ticket_no_meta}\n")
-                try:
-                    if created_at:
-                        dt_disp = datetime.fromisoformat(created_at).strftime("%d/%m/%Y %H:%M")
-                        header_lines.append(f"Fecha: {dt_disp}\n")
-                except Exception:
-                    header_lines.append(f"Fecha: {created_at or ''}\n")
-                header_lines.append(f"Cajero: {cajero_meta}\n")
-                header_lines.append(f"Cliente: {cliente_meta or ''}\n")
-                header_lines.append("-"*30 + "\n")
+        # Limpiar carrito
+        # Reset puntos_a_canjear antes de limpiar carrito y vistas
+        try:
+            self.puntos_a_canjear = 0
+        except Exception:
+            pass
+        self.carrito.vaciar()
+        try:
+            self._desvincular_cliente()
+        except Exception:
+            pass
+        if previsto is not None:
+            self._ultimo_ticket_previsto = previsto
+            self._mostrar_ultimo_ticket(previsto, total)
 
-                body_lines = []
-                for ln in lines:
-                    try:
-                        sku = ln.get('sku') if isinstance(ln, dict) else (ln[0] if len(ln) > 0 else None)
-                        nombre = ln.get('nombre') if isinstance(ln, dict) else (ln[1] if len(ln) > 1 else '')
-                        cantidad_l = ln.get('cantidad') if isinstance(ln, dict) else (ln[2] if len(ln) > 2 else 0)
-                        precio_l = ln.get('precio') if isinstance(ln, dict) else (ln[3] if len(ln) > 3 else 0)
-                        iva_l = ln.get('iva') if isinstance(ln, dict) else (ln[4] if len(ln) > 4 else 0)
-                    except Exception:
-                        nombre = ''
-                        cantidad_l = 0
-                        precio_l = 0
-                    try:
-                        cantidad_show = int(cantidad_l) if isinstance(cantidad_l, float) and float(cantidad_l).is_integer() else cantidad_l
-                    except Exception:
-                        cantidad_show = cantidad_l
-                    try:
-                        body_lines.append(f"{cantidad_show}x {nombre}  {float(precio_l):.2f}\n")
-                    except Exception:
-                        body_lines.append(f"{cantidad_show}x {nombre}  {precio_l}\n")
+    def _mostrar_ultimo_ticket(self, numero, total):
+        try:
+            self.lbl_iva.configure(text=f"Último ticket Nº {numero} · {total:.2f}€")
+        except Exception:
+            pass
 
-                totals_lines = []
-                totals_lines.append("-"*30 + "\n")
+    def _programar_postventa(self):
+        """Arranca (si no lo está ya) el sondeo de resultados de la cola post-venta."""
+        if not getattr(self, '_postventa_programada', False):
+            self._postventa_programada = True
+            self.after(100, self._recoger_postventa)
+
+    def _recoger_postventa(self):
+        """Procesa en el hilo de Tk los resultados de las ventas ya guardadas."""
+        self._postventa_programada = False
+        for res in cola_postventa.recoger():
+            if res.get('error'):
+                logging.error('Venta (ticket previsto %s) no guardada: %s', res.get('numero_previsto'), res.get('error'))
+                self._venta_no_guardada(res)
+                continue
+            # otro TPV pudo tomar ese número: corregir el visor si sigue mostrándolo
+            if res.get('ticket_no') != res.get('numero_previsto') and getattr(self, '_ultimo_ticket_previsto', None) == res.get('numero_previsto') and not self.carrito:
+                self._ultimo_ticket_previsto = res.get('ticket_no')
                 try:
-                    totals_lines.append(f"TOTAL: {total_meta:.2f}\n")
+                    self.lbl_iva.configure(text=self.lbl_iva.cget('text').replace(f"Nº {res.get('numero_previsto')}", f"Nº {res.get('ticket_no')}"))
                 except Exception:
-                    totals_lines.append(f"TOTAL: {total_meta}\n")
-                if pagado_meta is not None:
-                    try:
-                        totals_lines.append(f"{forma_meta}: {pagado_meta:.2f}\n")
-                    except Exception:
-                        totals_lines.append(f"{forma_meta}: {pagado_meta}\n")
-                if cambio_meta is not None:
-                    try:
-                        totals_lines.append(f"CAMBIO: {cambio_meta:.2f}\n")
-                    except Exception:
-                        totals_lines.append(f"CAMBIO: {cambio_meta}\n")
-
-                ticket_texto = ''.join(header_lines) + ''.join(body_lines) + ''.join(totals_lines) + "\n¡Gracias por tu compra!\n"
-
-                # Si hay un cliente asignado, procesar canje y puntos, y añadir información al ticket
+                    pass
+            if res.get('preview') and preview_ticket is not None:
                 try:
-                    if self.cliente_actual is not None:
-                        # extra info block
-                        try:
-                            cliente_id = None
-                            try:
-                                cliente_id = self.cliente_actual.get('id')
-                            except Exception:
-                                cliente_id = None
-                            try:
-                                cli_svc = ClienteService()
-                            except Exception:
-                                cli_svc = None
-
-                            extra = []
-                            extra.append('\n' + ('-'*20) + '\n')
-
-                            # 1) Si existe canje de puntos, restarlos primero
-                            try:
-                                if getattr(self, 'puntos_a_canjear', 0) and float(self.puntos_a_canjear) > 0 and cliente_id and cli_svc:
-                                    try:
-                                        cli_svc.sumar_puntos(cliente_id, -float(self.puntos_a_canjear))
-                                        extra.append(f"Puntos canjeados: -{float(self.puntos_a_canjear):.2f} pts\n")
-                                    except Exception:
-                                        logging.exception('No se pudieron restar puntos al cliente id=%s', cliente_id)
-                            except Exception:
-                                pass
-
-                            # 2) Calcular puntos ganados por la compra (solo si hay cliente)
-                            try:
-                                if not hasattr(self, 'fidelizacion_service'):
-                                    from modulos.tpv.fidelizacion_service import FidelizacionService
-                                    self.fidelizacion_service = FidelizacionService()
-                                puntos = self.fidelizacion_service.calcular_puntos(self.carrito, getattr(self, 'cliente_actual', None))
-                            except Exception:
-                                puntos = 0.0
-
-                            # 3) Registrar puntos ganados y gasto
-                            saldo = None
-                            if cliente_id and cli_svc:
-                                try:
-                                    if puntos and float(puntos) > 0:
-                                        try:
-                                            cli_svc.sumar_puntos(cliente_id, float(puntos))
-                                        except Exception:
-                                            logging.exception('No se pudieron sumar puntos al cliente id=%s', cliente_id)
-                                    try:
-                                        cli_svc.registrar_gasto(cliente_id, float(total_meta or total))
-                                    except Exception:
-                                        logging.exception('No se pudo registrar gasto para cliente id=%s', cliente_id)
-                                    try:
-                                        updated = cli_svc.obtener_por_id(cliente_id)
-                                        saldo = updated.get('puntos_fidelidad') if updated else None
-                                    except Exception:
-                                        saldo = None
-                                except Exception:
-                                    pass
-
-                            # 4) Añadir línea de puntos ganados si aplica
-                            try:
-                                if puntos and float(puntos) > 0:
-                                    extra.append(f"Puntos ganados en esta compra: {float(puntos):.2f}\n")
-                            except Exception:
-                                try:
-                                    extra.append(f"Puntos ganados en esta compra: {puntos}\n")
-                                except Exception:
-                                    pass
-
-                            # 5) Asegurar que saldo refleje los cambios y añadir línea de saldo
-                            try:
-                                if saldo is None and cliente_id and cli_svc:
-                                    try:
-                                        updated = cli_svc.obtener_por_id(cliente_id)
-                                        saldo = updated.get('puntos_fidelidad') if updated else None
-                                    except Exception:
-                                        saldo = None
-                            except Exception:
-                                pass
-                            try:
-                                extra.append(f"Saldo total de puntos: {float(saldo):.2f}\n" if saldo is not None else "Saldo total de puntos: \n")
-                            except Exception:
-                                extra.append(f"Saldo total de puntos: {saldo if saldo is not None else ''}\n")
-
-                            ticket_texto = ticket_texto + ''.join(extra)
-                        except Exception:
-                            logging.exception('Error proceso fidelización en ticket')
+                    preview_ticket(self, res.get('texto'), modo='ventana')
                 except Exception:
-                    logging.exception('Error proceso fidelización en ticket - envoltura')
-
-                if getattr(self.controller, 'imprimir_tickets_enabled', False):
-                    # Prefer preview_ticket on macOS, otherwise try direct print
-                    if sys.platform == 'darwin' and preview_ticket is not None:
-                        try:
-                            preview_ticket(self, ticket_texto, modo='ventana')
-                        except Exception:
-                            try:
-                                preview_ticket(None, ticket_texto, modo='terminal')
-                            except Exception:
-                                pass
-                    else:
-                        from modulos.impresion.impresora import imprimir_ticket_y_abrir_cajon
-                        try:
-                            imprimir_ticket_y_abrir_cajon(ticket_texto)
-                        except Exception:
-                            try:
-                                if preview_ticket is not None:
-                                    preview_ticket(None, ticket_texto, modo='terminal')
-                            except Exception:
-                                pass
-                else:
                     try:
-                        print('Impresión automática desactivada; ticket guardado en BD.')
+                        preview_ticket(None, res.get('texto'), modo='terminal')
                     except Exception:
                         pass
+        if cola_postventa.pendientes():
+            self._programar_postventa()
+
+    def _venta_no_guardada(self, res):
+        """Ofrece reintentar el guardado o devolver la venta al carrito (el carrito ya se vació al cobrar)."""
+        venta = res.get('venta')
+        texto = f"No se pudo guardar la venta (ticket previsto Nº {res.get('numero_previsto')}).\n{res.get('error')}"
+        if not venta:
+            try:
+                messagebox.showerror('Error', texto)
             except Exception:
                 pass
-        
-        # Limpiar carrito
-        # Reset puntos_a_canjear antes de limpiar carrito y vistas
+            return
         try:
-            self.puntos_a_canjear = 0
+            if self.carrito:
+                # hay otra venta en curso: no mezclar sus líneas
+                reintentar = messagebox.askyesno('Venta no guardada', texto + '\n\n¿Reintentar el guardado?\n(No: la venta se descarta)')
+                recuperar = False
+            else:
+                opcion = messagebox.askyesnocancel(
+                    'Venta no guardada',
+                    texto + '\n\nSí: reintentar el guardado\nNo: devolver los artículos al carrito\nCancelar: descartar la venta')
+                reintentar = opcion is True
+                recuperar = opcion is False
         except Exception:
-            pass
-        self.carrito = []
-        self.actualizar_visor()
+            reintentar, recuperar = False, not self.carrito
+        if reintentar:
+            venta = dict(venta)
+            venta.pop('numero_previsto', None)
+            cola_postventa.encolar(venta)
+            self._programar_postventa()
+        elif recuperar:
+            self._restaurar_venta(venta)
+        else:
+            logging.warning('Venta (ticket previsto %s) descartada tras fallar el guardado', res.get('numero_previsto'))
+
+    def _restaurar_venta(self, venta):
+        """Vuelve a poner en caja las líneas, el cliente y el canje de una venta encolada."""
+        # cada línea vuelve tal cual, incluidos los descuentos repetidos
+        self.carrito.restaurar(venta.get('carrito') or [])
+        cliente = venta.get('cliente')
+        if cliente:
+            self._asignar_cliente(cliente)
         try:
-            self._desvincular_cliente()
+            self.puntos_a_canjear = float(venta.get('puntos_canjear') or 0.0)
         except Exception:
-            pass
+            self.puntos_a_canjear = 0.0
 
     def abrir_selector_sin_codigo(self):
         """Renderiza el selector de productos sin código dentro del área disponible"""
@@ -1779,8 +1548,10 @@ class CajaVentas(ctk.CTkFrame):
                 return
         except Exception:
             pass
-        selector = SelectorSinCodigo(self.agregar_producto_sin_codigo)
-        selector.render_in_frame(self.selector_area)
+        # un solo selector por caja: conserva sus botones entre aperturas
+        if getattr(self, 'selector_sin_codigo', None) is None:
+            self.selector_sin_codigo = SelectorSinCodigo(self.agregar_producto_sin_codigo)
+        self.selector_sin_codigo.render_in_frame(self.selector_area)
 
     def agregar_producto_sin_codigo(self, producto_id, precio, nombre):
         """Agrega un producto al carrito desde el selector sin código"""
@@ -1824,17 +1595,7 @@ class CajaVentas(ctk.CTkFrame):
                     "cantidad": 1
                 }
 
-                encontrado = False
-                for item in self.carrito:
-                    if item['id'] == producto['id']:
-                        item['cantidad'] += 1
-                        encontrado = True
-                        break
-
-                if not encontrado:
-                    self.carrito.append(producto)
-
-                self.actualizar_visor()
+                self.carrito.agregar(producto)
         except Exception as e:
             print(f"Error al agregar producto: {e}")
 
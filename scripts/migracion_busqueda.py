@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+"""Script de migración que crea (o reconstruye) el índice de búsqueda de productos.
+
+Uso:
+  python3 scripts/migracion_busqueda.py [<db_path>]
+
+Crea las tablas FTS5 `productos_fts` y `productos_tri` con sus triggers
+(ver `database.ensure_busqueda_schema`; el arranque de la app también las
+asegura) y vuelve a llenarlas desde `productos` y `codigos_barras`. Se
+puede ejecutar tantas veces como se quiera.
+"""
+import os
+import sys
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from database import connect, ensure_busqueda_schema, reconstruir_busqueda, refresh_schema
+
+
+def migrar(db_path: str = None):
+    """Run migration. Returns a tuple (ok:bool, message:str)."""
+    try:
+        if not ensure_busqueda_schema(db_path):
+            return False, 'esta versión de SQLite no tiene FTS5; la búsqueda seguirá usando LIKE'
+        with connect(db_path) as conn:
+            reconstruir_busqueda(conn)
+            cur = conn.cursor()
+            cur.execute('SELECT COUNT(*) FROM productos_fts')
+            n = cur.fetchone()[0]
+        refresh_schema(db_path)
+        return True, f'índice de búsqueda reconstruido ({n} productos)'
+    except Exception as e:
+        return False, f'error: {e}'
+
+
+if __name__ == '__main__':
+    # accept optional db path as first arg
+    arg = sys.argv[1] if len(sys.argv) > 1 else None
+    ok, msg = migrar(arg)
+    if ok:
+        print('Migración OK:', msg)
+        sys.exit(0)
+    else:
+        print('Migración FALLÓ:', msg)
+        sys.exit(2)
@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""Script de migración que añade los importes en céntimos a los tickets.
+
+Uso:
+  python3 scripts/migracion_centimos.py [<db_path>]
+
+Añade `tickets.total_cent` y `ticket_lines.precio_cent` (INTEGER) y los
+triggers que los rellenan a partir de `total` / `precio` cuando el que
+escribe no los da (ver `database.ensure_centimos_schema`; el arranque de la
+app también lo hace). Se puede ejecutar tantas veces como se quiera: cada
+ejecución recalcula los céntimos de todos los tickets.
+"""
+import os
+import sys
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from database import connect, ensure_centimos_schema, rellenar_centimos, refresh_schema
+
+
+def migrar(db_path: str = None):
+    """Run migration. Returns a tuple (ok:bool, message:str)."""
+    try:
+        if not ensure_centimos_schema(db_path):
+            return False, 'no existen las tablas de tickets'
+        with connect(db_path) as conn:
+            rellenar_centimos(conn)
+            cur = conn.cursor()
+            cur.execute('SELECT COUNT(*), COALESCE(SUM(total_cent), 0) FROM tickets')
+            n, total = cur.fetchone()
+            cur.execute('SELECT COUNT(*) FROM ticket_lines')
+            lineas = cur.fetchone()[0]
+        refresh_schema(db_path)
+        return True, f'{n} tickets ({total / 100:.2f} €), {lineas} líneas'
+    except Exception as e:
+        return False, f'error: {e}'
+
+
+if __name__ == '__main__':
+    # accept optional db path as first arg
+    arg = sys.argv[1] if len(sys.argv) > 1 else None
+    ok, msg = migrar(arg)
+    if ok:
+        print('Migración OK:', msg)
+        sys.exit(0)
+    else:
+        print('Migración FALLÓ:', msg)
+        sys.exit(2)
@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+"""Script de migración que añade las claves de búsqueda de clientes.
+
+Uso:
+  python3 scripts/migracion_clientes_busqueda.py [<db_path>]
+
+Añade `telefono_norm` (sólo dígitos) y `dni_norm` (mayúsculas sin
+separadores) a clientes, la tabla `clientes_fts` con las palabras del nombre
+sin acentos y sus índices (ver `database.ensure_clientes_busqueda_schema`;
+el arranque de la app también lo hace). Se puede ejecutar tantas veces como
+se quiera: cada ejecución recalcula las claves de todos los clientes.
+"""
+import os
+import sys
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from database import connect, ensure_clientes_busqueda_schema, ensure_indexes, reconstruir_clientes_busqueda, refresh_schema
+
+
+def migrar(db_path: str = None):
+    """Run migration. Returns a tuple (ok:bool, message:str)."""
+    try:
+        if not ensure_clientes_busqueda_schema(db_path):
+            return False, 'no existe la tabla clientes'
+        with connect(db_path) as conn:
+            reconstruir_clientes_busqueda(conn)
+            cur = conn.cursor()
+            cur.execute('SELECT COUNT(*), COUNT(telefono_norm), COUNT(dni_norm) FROM clientes')
+            n, tels, dnis = cur.fetchone()
+        ensure_indexes(db_path)
+        refresh_schema(db_path)
+        return True, f'{n} clientes; {tels} con teléfono, {dnis} con DNI'
+    except Exception as e:
+        return False, f'error: {e}'
+
+
+if __name__ == '__main__':
+    # accept optional db path as first arg
+    arg = sys.argv[1] if len(sys.argv) > 1 else None
+    ok, msg = migrar(arg)
+    if ok:
+        print('Migración OK:', msg)
+        sys.exit(0)
+    else:
+        print('Migración FALLÓ:', msg)
+        sys.exit(2)
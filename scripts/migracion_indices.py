@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+"""Script de migración que crea los índices de las consultas calientes.
+
+Uso:
+  python3 scripts/migracion_indices.py [<db_path>]
+
+Los índices están definidos en `database.INDICES` (el arranque de la app
+también los asegura vía `database.bootstrap_schema`). El script es
+idempotente: sólo crea los que faltan y omite tablas/columnas inexistentes.
+"""
+import os
+import sys
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from database import ensure_indexes, refresh_schema
+
+
+def migrar(db_path: str = None):
+    """Run migration. Returns a tuple (ok:bool, message:str)."""
+    try:
+        creados = ensure_indexes(db_path)
+        refresh_schema(db_path)
+        if creados:
+            return True, 'índices creados: ' + ', '.join(creados)
+        return True, 'índices ya presentes'
+    except Exception as e:
+        return False, f'error: {e}'
+
+
+if __name__ == '__main__':
+    # accept optional db path as first arg
+    arg = sys.argv[1] if len(sys.argv) > 1 else None
+    ok, msg = migrar(arg)
+    if ok:
+        print('Migración OK:', msg)
+        sys.exit(0)
+    else:
+        print('Migración FALLÓ:', msg)
+        sys.exit(2)
@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+"""Script de migración que guarda producto, categoría y tipo en las líneas de ticket.
+
+Uso:
+  python3 scripts/migracion_lineas_producto.py [<db_path>]
+
+Añade `producto_id`, `categoria` y `tipo` a `ticket_lines` (ver
+`database.ensure_ticket_schema`; el arranque de la app también lo hace) y
+rellena las líneas antiguas buscando el producto por SKU. Las líneas de
+productos que ya no existen quedan vacías y no cuentan en los desgloses por
+categoría/tipo, igual que antes. Idempotente: sólo toca líneas sin producto.
+"""
+import os
+import sys
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from database import connect, ensure_indexes, ensure_ticket_schema, rellenar_lineas_producto, refresh_schema
+
+
+def migrar(db_path: str = None):
+    """Run migration. Returns a tuple (ok:bool, message:str)."""
+    try:
+        ensure_ticket_schema(db_path)
+        with connect(db_path) as conn:
+            n = rellenar_lineas_producto(conn)
+            cur = conn.cursor()
+            cur.execute('SELECT COUNT(*) FROM ticket_lines WHERE producto_id IS NULL')
+            sin_producto = cur.fetchone()[0]
+        ensure_indexes(db_path)
+        refresh_schema(db_path)
+        return True, f'{n} líneas enlazadas con su producto; {sin_producto} sin producto'
+    except Exception as e:
+        return False, f'error: {e}'
+
+
+if __name__ == '__main__':
+    # accept optional db path as first arg
+    arg = sys.argv[1] if len(sys.argv) > 1 else None
+    ok, msg = migrar(arg)
+    if ok:
+        print('Migración OK:', msg)
+        sys.exit(0)
+    else:
+        print('Migración FALLÓ:', msg)
+        sys.exit(2)
@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""Script de migración que añade las claves enteras de categoría, proveedor y tipo a productos.
+
+Uso:
+  python3 scripts/migracion_relaciones.py [<db_path>]
+
+Añade `categoria_id`, `proveedor_id` y `tipo_id` (ver
+`database.ensure_relaciones_schema`; el arranque de la app también lo hace),
+las rellena a partir de los textos actuales (nombre o id de la maestra),
+calcula los nombres por los que ordena el catálogo (`<campo>_orden`) y
+crea sus índices. Se puede ejecutar tantas veces como se quiera: cada
+ejecución vuelve a calcular los ids de todos los productos.
+"""
+import os
+import sys
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from database import connect, ensure_indexes, ensure_relaciones_schema, reconstruir_relaciones, refresh_schema
+
+
+def migrar(db_path: str = None):
+    """Run migration. Returns a tuple (ok:bool, message:str)."""
+    try:
+        if not ensure_relaciones_schema(db_path):
+            return False, 'faltan las tablas productos, categorias, proveedores o tipos'
+        with connect(db_path) as conn:
+            reconstruir_relaciones(conn)
+            cur = conn.cursor()
+            cur.execute('SELECT COUNT(*), COUNT(categoria_id), COUNT(proveedor_id), COUNT(tipo_id) FROM productos')
+            n, cats, provs, tipos = cur.fetchone()
+        ensure_indexes(db_path)
+        refresh_schema(db_path)
+        return True, f'{n} productos; enlazados: {cats} categoría, {provs} proveedor, {tipos} tipo'
+    except Exception as e:
+        return False, f'error: {e}'
+
+
+if __name__ == '__main__':
+    # accept optional db path as first arg
+    arg = sys.argv[1] if len(sys.argv) > 1 else None
+    ok, msg = migrar(arg)
+    if ok:
+        print('Migración OK:', msg)
+        sys.exit(0)
+    else:
+        print('Migración FALLÓ:', msg)
+        sys.exit(2)
@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+"""Script de migración que crea y rellena el resumen diario de ventas.
+
+Uso:
+  python3 scripts/migracion_ventas_dia.py [<db_path>]
+
+Crea `ventas_dia` y `ventas_dia_articulos` (ver
+`database.ensure_ventas_dia_schema`; el arranque de la app también las crea)
+y las reconstruye a partir de los tickets de todos los cierres Z ya hechos.
+A partir de ahí cada cierre Z añade sus filas. Se puede ejecutar tantas
+veces como se quiera.
+"""
+import os
+import sys
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from database import connect, ensure_ticket_schema, ensure_ventas_dia_schema, reconstruir_ventas_dia, refresh_schema
+
+
+def migrar(db_path: str = None):
+    """Run migration. Returns a tuple (ok:bool, message:str)."""
+    try:
+        # las líneas necesitan producto_id/categoria/tipo para los desgloses
+        ensure_ticket_schema(db_path)
+        ensure_ventas_dia_schema(db_path)
+        with connect(db_path) as conn:
+            n = reconstruir_ventas_dia(conn)
+            cur = conn.cursor()
+            cur.execute('SELECT COUNT(DISTINCT fecha) FROM ventas_dia')
+            dias = cur.fetchone()[0]
+        refresh_schema(db_path)
+        return True, f'resumen diario reconstruido: {n} cierres Z, {dias} días'
+    except Exception as e:
+        return False, f'error: {e}'
+
+
+if __name__ == '__main__':
+    # accept optional db path as first arg
+    arg = sys.argv[1] if len(sys.argv) > 1 else None
+    ok, msg = migrar(arg)
+    if ok:
+        print('Migración OK:', msg)
+        sys.exit(0)
+    else:
+        print('Migración FALLÓ:', msg)
+        sys.exit(2)
@@ -2,7 +2,7 @@ import os
 import sys
 # ensure project root is on sys.path when running this script directly
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
-from modulos.almacen.articulos.dao_articulos import get_products_page
+from modulos.almacen.articulos.dao_articulos import get_products_keyset, count_products
 from database import DB_PATH
 
 DB = DB_PATH
@@ -10,14 +10,14 @@ DB = DB_PATH
 if __name__ == '__main__':
     print('DB:', DB)
     try:
-        page = 1
         page_size = 10
-        items = get_products_page(DB, page=page, page_size=page_size+1)
-        has_next = len(items) > page_size
-        if has_next:
-            items = items[:page_size]
-        print(f'Página {page}, filas devueltas: {len(items)}, hay siguiente: {has_next}')
+        res = get_products_keyset(DB, page_size=page_size)
+        items = res['items']
+        print(f"Primera página, filas devueltas: {len(items)} de {count_products(DB)}, hay siguiente: {res['has_next']}")
         for it in items:
             print(it)
+        if res['next_cursor']:
+            sig = get_products_keyset(DB, cursor=res['next_cursor'], page_size=page_size)
+            print(f"Segunda página, filas devueltas: {len(sig['items'])}, hay siguiente: {sig['has_next']}")
     except Exception as e:
         print('Error ejecutando DAO:', e)
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""Checks the FTS5/trigram product search and its trigger sync (non-pytest)."""
+import os
+import shutil
+import tempfile
+
+import database
+from modulos.almacen import busqueda
+from modulos.almacen.producto_service import ProductoService
+
+
+def _skus(rows):
+    return [r['sku'] for r in rows]
+
+
+def run():
+    tmp_dir = tempfile.mkdtemp()
+    dst = os.path.join(tmp_dir, 'inventario.db.busqueda.sqlite')
+    shutil.copy(database.DB_PATH, dst)
+    orig = database.DB_PATH
+    database.DB_PATH = dst
+    try:
+        database.bootstrap_schema()
+        if not busqueda.disponible():
+            print('SQLite sin FTS5: se omite la prueba')
+            print('TESTS OK')
+            return
+
+        svc = ProductoService()
+        pid = svc.guardar_producto({'nombre': 'Camión de bomberos rojo', 'nombre_boton': 'Camión', 'sku': 'JUG-CAM-0042',
+                                    'categoria': 'Juguetes', 'proveedor': 'Playmobil', 'pvp': 19.95}, ['8412345678905'], [])
+        svc.guardar_producto({'nombre': 'Camiseta roja', 'sku': 'TEX-CAMI-7', 'categoria': 'Camisetas', 'pvp': 12.0}, [], [])
+        assert pid
+
+        # prefijo mientras se teclea, sin acentos y en cualquier orden
+        assert 'JUG-CAM-0042' in _skus(svc.buscar_por_nombre('cami'))
+        assert 'TEX-CAMI-7' in _skus(svc.buscar_por_nombre('cami'))
+        assert _skus(svc.buscar_por_nombre('rojo camion')) == ['JUG-CAM-0042']
+        assert _skus(svc.buscar_por_nombre('BOMBEROS')) == ['JUG-CAM-0042']
+        # trozo en medio de un SKU o EAN -> trigramas
+        assert _skus(svc.buscar_por_nombre('0042')) == ['JUG-CAM-0042']
+        assert _skus(svc.buscar_por_nombre('3456789')) == ['JUG-CAM-0042']
+        # el catálogo usa el mismo índice
+        filtrados = svc.obtener_productos_paginados({'search': 'camion rojo', 'page_size': 100})
+        assert [it['id'] for it in filtrados] == [pid]
+        assert svc.contar_productos({'search': 'playmobil'}) == 1
+        # términos sin palabras indexables se buscan tal cual, no devuelven todo
+        assert svc.contar_productos({'search': '%'}) == 0
+        assert svc.obtener_productos_paginados({'search': '.,', 'page_size': 100}) == []
+        assert svc.contar_productos({'search': '-'}) < svc.contar_productos({})
+
+        # los triggers mantienen el índice al editar, cambiar EANs y borrar
+        svc.guardar_producto({'id': pid, 'nombre': 'Grúa de obra', 'sku': 'JUG-GRU-0042', 'categoria': 'Juguetes', 'pvp': 19.95},
+                             ['8400000000011'], [])
+        assert 'JUG-GRU-0042' not in _skus(svc.buscar_por_nombre('camion'))
+        assert _skus(svc.buscar_por_nombre('grua')) == ['JUG-GRU-0042']
+        assert svc.buscar_por_nombre('3456789') == []
+        assert _skus(svc.buscar_por_nombre('8400000000011')) == ['JUG-GRU-0042']
+        # un UPDATE que no toca columnas indexadas no reescribe la búsqueda
+        conn = database.connect()
+        try:
+            antes = conn.total_changes
+            conn.execute('UPDATE productos SET stock_actual = 7 WHERE id = ?', (pid,))
+            conn.commit()
+            assert conn.total_changes - antes == 1
+        finally:
+            conn.close()
+        assert _skus(svc.buscar_por_nombre('grua')) == ['JUG-GRU-0042']
+        assert svc.eliminar_producto(pid)
+        assert svc.buscar_por_nombre('grua') == []
+        print('TESTS OK')
+    finally:
+        database.DB_PATH = orig
+        database.close_all()
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    run()
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""Checks the cart model: merge by id, running totals per IVA rate and change events (non-pytest)."""
+from modulos.tpv.carrito import Carrito
+
+
+def _cmp(a, b):
+    return abs(float(a) - float(b)) < 1e-6
+
+
+def run():
+    c = Carrito()
+    eventos = []
+    c.suscribir(lambda ev, i, ln: eventos.append((ev, i)))
+
+    camiseta = {'id': 1, 'sku': 'CAM', 'nombre': 'Camiseta', 'precio': 12.1, 'iva': 21}
+    libro = {'id': 2, 'sku': 'LIB', 'nombre': 'Libro', 'precio': '10.40', 'iva': 4}
+    assert c.agregar(dict(camiseta)) == 0
+    assert c.agregar(dict(libro)) == 1
+    assert c.agregar(dict(camiseta)) == 0
+    assert eventos == [('alta', 0), ('alta', 1), ('cambio', 0)]
+    assert len(c) == 2 and c[0]['cantidad'] == 2 and c[1]['precio'] == 10.4
+
+    # totales acumulados = recalcular desde cero
+    assert _cmp(c.total(), 2 * 12.1 + 10.4)
+    base, iva = c.desglose()
+    assert _cmp(base, 2 * 12.1 / 1.21 + 10.4 / 1.04)
+    assert _cmp(base + iva, c.total())
+
+    # descuentos: no se fusionan; el de puntos se sustituye
+    c.agregar({'id': 'MAN_DESC', 'nombre': 'DESC. MANUAL', 'precio': -1.0, 'cantidad': 1, 'iva': 0}, fusionar=False)
+    c.agregar({'id': 'MAN_DESC', 'nombre': 'DESC. MANUAL', 'precio': -1.0, 'cantidad': 1, 'iva': 0}, fusionar=False)
+    c.agregar({'id': 'DESC', 'nombre': 'DESC. PUNTOS', 'precio': -3.0, 'cantidad': 1, 'iva': 0}, fusionar=False)
+    assert len(c) == 5
+    assert c.quitar_id('DESC') and len(c) == 4
+    assert _cmp(c.total(), 2 * 12.1 + 10.4 - 2.0)
+
+    # quitar una línea del medio mantiene el índice por id de las siguientes
+    eventos.clear()
+    c.quitar_unidad(0)
+    assert c[0]['cantidad'] == 1 and eventos == [('cambio', 0)]
+    c.quitar_unidad(0)
+    assert eventos[-1] == ('baja', 0) and c[0]['id'] == 2
+    assert c.agregar(dict(libro)) == 0 and c[0]['cantidad'] == 2
+    assert c.agregar(dict(camiseta)) == len(c) - 1
+
+    # las líneas que salen son copias con las claves de siempre
+    lineas = c.lineas()
+    lineas[0]['cantidad'] = 99
+    assert c[0]['cantidad'] == 2
+    assert set(lineas[0]) >= {'id', 'sku', 'nombre', 'precio', 'cantidad', 'iva'}
+
+    # una venta que no se guardó vuelve línea a línea, sin fusionar descuentos
+    r = Carrito()
+    r.agregar({'id': 3, 'sku': 'TAZ', 'nombre': 'Taza', 'precio': 10.0, 'iva': 21})
+    r.agregar({'id': 'MAN_DESC', 'nombre': 'DESC. MANUAL', 'precio': -1.0, 'cantidad': 1, 'iva': 0}, fusionar=False)
+    r.agregar({'id': 'MAN_DESC', 'nombre': 'DESC. MANUAL', 'precio': -2.0, 'cantidad': 1, 'iva': 0}, fusionar=False)
+    assert r.total_centimos() == 700
+    copia = Carrito()
+    copia.restaurar(r.lineas())
+    assert copia.total_centimos() == 700 and [ln['precio'] for ln in copia] == [10.0, -1.0, -2.0]
+    assert copia.agregar({'id': 3, 'sku': 'TAZ', 'nombre': 'Taza', 'precio': 10.0, 'iva': 21}) == 0 and copia[0]['cantidad'] == 2
+
+    c.vaciar()
+    assert not c and c.total() == 0 and eventos[-1] == ('vacio', None)
+    assert c.agregar(dict(camiseta)) == 0
+    print('TESTS OK')
+
+
+if __name__ == '__main__':
+    run()
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""Checks integer-cents money: parsing, IVA breakdown and exact close-out sums (non-pytest)."""
+import os
+import shutil
+import tempfile
+
+import database
+from dinero import Dinero, centimos, a_euros, desglose_iva
+from modulos.ticket_generator import generar_ticket
+from modulos.tpv.carrito import Carrito
+from modulos.tpv.ticket_service import TicketService
+
+
+def run():
+    assert centimos('12,10') == 1210 and centimos(2.675) == 268 and centimos(3) == 300 and centimos(None) == 0
+    assert centimos(0.1) + centimos(0.2) == 30 and centimos('abc') == 0
+    assert centimos(float('nan')) == 0 and centimos(float('inf')) == 0 and centimos('-inf') == 0
+    for total in (1, 99, 1210, 12345):
+        for tipo in (0, 4, 10, 21, 5.5):
+            base, cuota = desglose_iva(total, tipo)
+            assert base + cuota == total
+    assert desglose_iva(1210, 21) == (1000, 210)
+    assert str(Dinero.de_euros(0.1) + Dinero.de_euros(0.2)) == '0.30' and Dinero(199) * 3 == Dinero(597)
+    assert Dinero(1210).desglose(21) == (Dinero(1000), Dinero(210)) and Dinero(1000) * 0.5 == Dinero(500)
+    assert centimos(Dinero(250)) == 250 and str(-Dinero(5)) == '-0.05' and not hasattr(Dinero(1), '__dict__')
+    # sin ticket_id el ticket de texto desglosa el IVA del propio carrito
+    texto = generar_ticket([{'nombre': 'x', 'cantidad': 1, 'precio': 12.1, 'iva': 21}], 20, 7.9)
+    assert 'IVA (21%):'.ljust(23) + '   2.10' in texto
+
+    # 0.10 diez veces: con float no da 1.0; en céntimos sí
+    carrito = Carrito()
+    for i in range(10):
+        carrito.agregar({'id': None, 'sku': f's{i}', 'nombre': 'x', 'precio': 0.1, 'iva': 21}, fusionar=False)
+    assert carrito.total_centimos() == 100 and carrito.total() == 1.0 and carrito.importe() == Dinero(100)
+
+    tmp_dir = tempfile.mkdtemp()
+    dst = os.path.join(tmp_dir, 'inventario.db.centimos.sqlite')
+    shutil.copy(database.DB_PATH, dst)
+    orig = database.DB_PATH
+    database.DB_PATH = dst
+    try:
+        database.bootstrap_schema()
+        assert 'total_cent' in database.table_columns('tickets')
+        assert 'precio_cent' in database.table_columns('ticket_lines')
+        svc = TicketService()
+        dia = '2031-05-01'
+        esperado = 0
+        for j in range(7):
+            carrito = Carrito()
+            for precio in (0.1, 0.2, 1.15, 2.675):
+                carrito.agregar({'id': None, 'sku': 'p', 'nombre': 'Prueba', 'precio': precio, 'iva': 21}, fusionar=False)
+            esperado += carrito.total_centimos()
+            assert svc.guardar_ticket({'created_at': f'{dia}T10:0{j}:00', 'total': carrito.total(),
+                                       'total_cent': carrito.total_centimos(), 'cajero': 'ana',
+                                       'forma_pago': 'EFECTIVO'}, carrito.lineas())
+        # un escritor que sólo da el REAL: el trigger calcula los céntimos
+        conn = database.connect()
+        try:
+            conn.row_factory = None
+            cur = conn.cursor()
+            cur.execute("INSERT INTO tickets (created_at, total, cajero, forma_pago) VALUES (?, 0.3, 'ana', 'TARJETA')", (f'{dia}T11:00:00',))
+            conn.commit()
+            esperado += 30
+            cur.execute('SELECT total_cent FROM tickets WHERE id = ?', (cur.lastrowid,))
+            assert cur.fetchone()[0] == 30
+            cur.execute("SELECT COUNT(*) FROM tickets WHERE total_cent IS NULL OR total_cent != CAST(ROUND(total * 100) AS INTEGER)")
+            assert cur.fetchone()[0] == 0
+
+            resumen = database.agregar_tickets(conn, 'created_at >= ? AND created_at < ?', database.rango_dia(dia))
+            print('Total:', resumen['total'], 'Impuestos:', resumen['impuestos'])
+            assert resumen['total'] == a_euros(esperado)
+            assert resumen['total_efectivo'] + resumen['total_tarjeta'] == resumen['total']
+            imp = resumen['impuestos'][0]
+            assert centimos(imp['base']) + centimos(imp['cuota']) == centimos(imp['total'])
+        finally:
+            conn.close()
+        print('TESTS OK')
+    finally:
+        database.DB_PATH = orig
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    run()
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""Checks the normalised client search keys and the paged, projected client lists (non-pytest)."""
+import os
+import shutil
+import tempfile
+
+import database
+from modulos.clientes.cliente_service import ClienteService, COLUMNAS_LISTA
+
+
+def run():
+    tmp_dir = tempfile.mkdtemp()
+    dst = os.path.join(tmp_dir, 'inventario.db.clientes_busqueda.sqlite')
+    shutil.copy(database.DB_PATH, dst)
+    orig = database.DB_PATH
+    database.DB_PATH = dst
+    try:
+        database.bootstrap_schema()
+        svc = ClienteService()
+        ana = svc.crear_cliente({'nombre': 'Ana María Núñez', 'telefono': '+34 600-12 34 56', 'dni': '12345678-z'})
+        jose = svc.crear_cliente({'nombre': 'José Pérez', 'telefono': '611 22 33 44', 'dni': 'x1234567l'})
+        otros = [svc.crear_cliente({'nombre': f'Cliente {i:03d}', 'telefono': f'622{i:06d}'}) for i in range(120)]
+        assert ana and jose and all(otros)
+
+        conn = database.connect()
+        try:
+            conn.row_factory = None
+            cur = conn.cursor()
+            cur.execute('SELECT telefono_norm, dni_norm FROM clientes WHERE id = ?', (ana,))
+            assert cur.fetchone() == ('34600123456', '12345678Z')
+        finally:
+            conn.close()
+
+        def ids(termino, **kw):
+            return [c['id'] for c in svc.buscar_clientes(termino, **kw)]
+
+        # teléfono y DNI por prefijo, con o sin separadores
+        assert ids('611 22') == [jose]
+        assert ids('611223344') == [jose]
+        assert ids('X1234') == [jose]
+        assert ids('12345678z') == [ana]
+        # el móvil guardado con +34 se encuentra tecleándolo sin prefijo
+        assert ids('600') == [ana]
+        assert ids('600 12 34 56') == [ana]
+        assert ids('34600') == [ana]
+        # nombre: palabras en cualquier orden, sin acentos, como prefijo
+        assert ids('nunez ana') == [ana]
+        assert ids('jose') == [jose]
+        assert ids('PEREZ') == [jose]
+
+        # sólo las columnas de la lista
+        fila = svc.buscar_clientes('jose')[0]
+        assert set(fila) == set(COLUMNAS_LISTA), fila
+        assert svc.obtener_por_id(jose)['email'] is None
+
+        # limitado y paginado
+        p1 = ids('cliente', limite=50)
+        p3 = ids('cliente', limite=50, pagina=3)
+        assert len(p1) == 50 and len(p3) == 20 and not set(p1) & set(p3)
+        assert len(svc.obtener_todos()) == 50
+        assert len(svc.obtener_todos(limite=None)) >= 122
+
+        # los triggers siguen los cambios
+        assert svc.actualizar_cliente(jose, {'telefono': '699.000.111', 'nombre': 'José Luis Pérez'})
+        assert ids('699000') == [jose] and ids('611223344') == []
+        assert ids('luis') == [jose]
+        assert svc.eliminar_cliente(jose)
+        assert ids('jose') == []
+
+        conn = database.connect()
+        try:
+            cur = conn.cursor()
+            for sql, params, idx in (
+                ('SELECT id FROM clientes WHERE telefono_norm >= ? AND telefono_norm < ?', ('600', '601'), 'idx_clientes_telefono_norm'),
+                ('SELECT id FROM clientes WHERE dni_norm >= ? AND dni_norm < ?', ('X1', 'X2'), 'idx_clientes_dni_norm'),
+                ('SELECT id, nombre FROM clientes ORDER BY nombre COLLATE NOCASE LIMIT 50', (), 'idx_clientes_nombre_nocase'),
+            ):
+                cur.execute('EXPLAIN QUERY PLAN ' + sql, params)
+                plan = ' | '.join(r[3] for r in cur.fetchall())
+                assert idx in plan, plan
+        finally:
+            conn.close()
+        print('TESTS OK')
+    finally:
+        database.DB_PATH = orig
+        database.close_all()
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    run()
@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+"""Checks the ConfigService settings cache: write-through, get_many and external changes (non-pytest)."""
+import os
+import shutil
+import sqlite3
+import tempfile
+
+import database
+from modulos.configuracion.config_service import ConfigService
+
+
+def run():
+    tmp_dir = tempfile.mkdtemp()
+    dst = os.path.join(tmp_dir, 'inventario.db.config.sqlite')
+    shutil.copy(database.DB_PATH, dst)
+    orig = database.DB_PATH
+    database.DB_PATH = dst
+    try:
+        database.bootstrap_schema()
+        svc = ConfigService()
+        assert svc.set_valor('prueba_clave', 'a')
+        assert svc.get_valor('prueba_clave') == 'a'
+        assert svc.get_valor('no_existe', 'def') == 'def'
+
+        # otra conexión (otro TPV) cambia un valor: se ve sin reiniciar
+        otro = sqlite3.connect(dst)
+        otro.execute("INSERT OR REPLACE INTO configuracion (clave, valor) VALUES ('prueba_clave', 'b')")
+        otro.commit()
+        otro.close()
+        assert svc.get_valor('prueba_clave') == 'b'
+
+        vals = svc.get_many({'prueba_clave': None, 'no_existe': 'x'})
+        assert vals == {'prueba_clave': 'b', 'no_existe': 'x'}, vals
+        assert svc.get_many(['prueba_clave', 'no_existe']) == {'prueba_clave': 'b', 'no_existe': None}
+
+        assert ConfigService.cambiar_pass_config('9876')
+        assert ConfigService.validar_pass_config('9876')
+        assert not ConfigService.validar_pass_config('1234')
+        print('TESTS OK')
+    finally:
+        database.DB_PATH = orig
+        database.close_all()
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    run()
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""Checks ConsultaDiferida debounce and superseding without Tk (non-pytest)."""
+import threading
+import time
+
+from modulos.consulta_diferida import ConsultaDiferida
+
+
+class _WidgetFalso:
+    """Imita after/after_cancel: los callbacks se ejecutan al llamar a `procesar`."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._cola = {}
+        self._n = 0
+
+    def after(self, ms, fn):
+        with self._lock:
+            self._n += 1
+            self._cola[self._n] = fn
+            return self._n
+
+    def after_cancel(self, after_id):
+        with self._lock:
+            self._cola.pop(after_id, None)
+
+    def procesar(self, segundos=1.0):
+        fin = time.time() + segundos
+        while time.time() < fin:
+            with self._lock:
+                pendientes = list(self._cola.items())
+                self._cola.clear()
+            for _, fn in pendientes:
+                fn()
+            time.sleep(0.01)
+
+
+def run():
+    w = _WidgetFalso()
+    consultas = ConsultaDiferida(w, espera_ms=200)
+    ejecutadas, entregadas = [], []
+
+    def consulta(texto):
+        def f():
+            ejecutadas.append(texto)
+            return texto.upper()
+        return f
+
+    # tecleo rápido: sólo la última petición llega a ejecutarse
+    for texto in ('c', 'ca', 'cam'):
+        consultas.lanzar(consulta(texto), entregadas.append)
+    w.procesar(0.5)
+    print('Ejecutadas:', ejecutadas, 'Entregadas:', entregadas)
+    assert ejecutadas == ['cam'] and entregadas == ['CAM']
+
+    # una consulta en curso superada por otra: su resultado se descarta
+    ejecutadas.clear()
+    entregadas.clear()
+    empezada = threading.Event()
+    seguir = threading.Event()
+
+    def lenta():
+        empezada.set()
+        seguir.wait(2)
+        return 'vieja'
+
+    consultas.lanzar(lenta, entregadas.append, espera_ms=0)
+    assert empezada.wait(2)
+    consultas.lanzar(consulta('nueva'), entregadas.append, espera_ms=0)
+    seguir.set()
+    w.procesar(0.5)
+    assert entregadas == ['NUEVA'], entregadas
+
+    # errores: al_fallar en el hilo de la UI
+    errores = []
+
+    def falla():
+        raise ValueError('x')
+
+    consultas.lanzar(falla, entregadas.append, espera_ms=0, al_fallar=errores.append)
+    w.procesar(0.3)
+    assert len(errores) == 1 and isinstance(errores[0], ValueError)
+
+    # cancelar descarta lo que estuviera en espera
+    entregadas.clear()
+    consultas.lanzar(consulta('z'), entregadas.append)
+    consultas.cancelar()
+    w.procesar(0.4)
+    assert entregadas == []
+    print('TESTS OK')
+
+
+if __name__ == '__main__':
+    run()
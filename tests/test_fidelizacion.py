@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""Checks the compiled loyalty rules: per-type/category %, promotions and invalidation (non-pytest)."""
+import os
+import shutil
+import tempfile
+from datetime import date
+
+import database
+from modulos.configuracion.config_service import ConfigService
+from modulos.tpv.fidelizacion_service import FidelizacionService, ReglasFidelizacion, invalidar_reglas
+
+
+def _cmp(a, b):
+    return abs(float(a) - float(b)) < 1e-6
+
+
+def run():
+    tmp_dir = tempfile.mkdtemp()
+    dst = os.path.join(tmp_dir, 'inventario.db.fide.sqlite')
+    shutil.copy(database.DB_PATH, dst)
+    orig = database.DB_PATH
+    database.DB_PATH = dst
+    try:
+        database.bootstrap_schema()
+        cfg = ConfigService()
+        cfg.set_valor('fide_activa', '1')
+        cfg.set_valor('fide_porcentaje_general', '5')
+        cfg.set_valor('fide_puntos_valor_euro', '1')
+        conn = database.connect()
+        try:
+            cur = conn.cursor()
+            cur.execute('DELETE FROM fide_promociones')
+            cur.execute("UPDATE tipos SET fide_porcentaje = NULL")
+            cur.execute("UPDATE categorias SET fide_porcentaje = NULL")
+            cur.execute("UPDATE tipos SET fide_porcentaje = 20 WHERE nombre = 'Parche'")
+            cur.execute("UPDATE productos SET tipo = 'Parche', fide_puntos_fijos = NULL WHERE sku = 'egon87'")
+            cur.execute("UPDATE productos SET fide_puntos_fijos = 3 WHERE sku = 'caja33'")
+            cur.execute('SELECT id FROM productos WHERE sku = ?', ('egon87',))
+            egon_id = cur.fetchone()[0]
+            conn.commit()
+        finally:
+            conn.close()
+        invalidar_reglas()
+
+        svc = FidelizacionService()
+        carrito = [
+            {'id': egon_id, 'sku': 'egon87', 'precio': 10.0, 'cantidad': 2},   # tipo Parche -> 20%
+            {'sku': 'caja33', 'precio': 7.0, 'cantidad': 1},                  # 3 puntos fijos
+            {'id': 'DESC', 'nombre': 'DESC. PUNTOS', 'precio': -2.0, 'cantidad': 1},  # general 5%
+        ]
+        puntos = svc.calcular_puntos(carrito)
+        print('Puntos:', puntos)
+        assert _cmp(puntos, 20 * 0.20 + 3 + (-2) * 0.05)
+
+        # sin invalidar se siguen usando las reglas compiladas
+        cfg.guardar_promocion({'nombre': 'x2', 'fecha_inicio': date.today().isoformat(),
+                               'fecha_fin': date.today().isoformat(), 'multiplicador': 2, 'activa': 1})
+        assert _cmp(svc.calcular_puntos(carrito), puntos)
+        invalidar_reglas()
+        assert _cmp(svc.calcular_puntos(carrito), puntos * 2)
+
+        cfg.set_valor('fide_activa', '0')
+        invalidar_reglas()
+        assert svc.calcular_puntos(carrito) == 0.0
+
+        # promociones fuera de fecha no cuentan
+        reglas = ReglasFidelizacion({'promociones': [
+            {'activa': 1, 'fecha_inicio': '2000-01-01', 'fecha_fin': '2000-01-02', 'multiplicador': 5}]})
+        assert reglas.multiplicador == 1.0
+        print('TESTS OK')
+    finally:
+        invalidar_reglas()
+        database.DB_PATH = orig
+        database.close_all()
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    run()
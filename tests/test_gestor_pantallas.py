@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""Checks GestorPantallas caching, on_show/on_hide and eviction without Tk (non-pytest)."""
+from modulos.gestor_pantallas import GestorPantallas
+
+
+class _Widget:
+    """Lo mínimo de un widget Tk que usa el gestor (pack, hijos, destroy)."""
+
+    def __init__(self, master=None, hijos=0):
+        self.master = master
+        self._hijos = []
+        self._manager = ''
+        self.vivo = True
+        self.eventos = []
+        self._nombre = (str(master) if master else '') + f'.w{id(self)}'
+        if master is not None:
+            master._hijos.append(self)
+        for _ in range(hijos):
+            _Widget(self)
+
+    def __str__(self):
+        return self._nombre
+
+    def pack(self, **kw):
+        self._manager = 'pack'
+
+    def pack_forget(self):
+        self._manager = ''
+
+    def tkraise(self):
+        self.eventos.append('raise')
+
+    def winfo_manager(self):
+        return self._manager
+
+    def winfo_exists(self):
+        return self.vivo
+
+    def winfo_children(self):
+        return list(self._hijos)
+
+    def destroy(self):
+        self.vivo = False
+        if self.master is not None and self in self.master._hijos:
+            self.master._hijos.remove(self)
+
+
+class _Pantalla(_Widget):
+    creadas = 0
+
+    def __init__(self, master, hijos=0):
+        super().__init__(master, hijos)
+        _Pantalla.creadas += 1
+        self.pack()
+
+    def on_show(self, **kw):
+        self.eventos.append(('show', kw))
+
+    def on_hide(self):
+        self.eventos.append('hide')
+
+
+def run():
+    cont = _Widget()
+    gestor = GestorPantallas(cont, presupuesto_widgets=50, fijas=('inicio',))
+
+    inicio = gestor.mostrar('inicio', lambda: _Pantalla(cont, 10))
+    caja = gestor.mostrar('ventas', lambda: _Pantalla(cont, 30))
+    assert inicio.vivo and inicio.winfo_manager() == '' and 'hide' in inicio.eventos
+    # volver a una pantalla cacheada no la crea de nuevo y llama a on_show con los argumentos
+    assert gestor.mostrar('inicio', lambda: _Pantalla(cont)) is inicio
+    assert _Pantalla.creadas == 2 and inicio.winfo_manager() == 'pack' and 'raise' in inicio.eventos
+    assert gestor.mostrar('ventas', lambda: _Pantalla(cont), x=1) is caja and ('show', {'x': 1}) in caja.eventos
+
+    # las pantallas sin caché se destruyen al salir
+    edicion = gestor.mostrar('crear_producto', lambda: _Pantalla(cont), cachear=False)
+    gestor.mostrar('inicio', lambda: _Pantalla(cont))
+    assert not edicion.vivo and caja.vivo
+
+    # presupuesto: al ocultar una pantalla grande se libera la menos reciente que no sea fija
+    grande = gestor.mostrar('todos_articulos', lambda: _Pantalla(cont, 40))
+    gestor.mostrar('inicio', lambda: _Pantalla(cont))
+    assert not caja.vivo and grande.vivo and inicio.vivo, (caja.vivo, grande.vivo)
+    assert gestor.mostrar('ventas', lambda: _Pantalla(cont)) is not caja
+
+    gestor.vaciar()
+    assert not inicio.vivo and not cont.winfo_children()
+    print('TESTS OK')
+
+
+if __name__ == '__main__':
+    run()
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""Checks the in-memory quick-sale button index against the SQL it replaces (non-pytest)."""
+import os
+import shutil
+import tempfile
+
+import database
+from modulos.almacen.indice_botones import indice_botones
+from modulos.almacen.producto_service import ProductoService
+
+
+def _por_sql(cur, campo, clave, solo_botones):
+    ident, nombre = clave
+    if ident is not None:
+        where, params = f'p.{campo}_id = ?', (ident,)
+    else:
+        where, params = f'p.{campo}_id IS NULL AND p.{campo} = ?', (nombre,)
+    if solo_botones:
+        where += " AND p.nombre_boton IS NOT NULL AND p.nombre_boton != ''"
+    cur.execute(f'SELECT p.id, p.nombre_boton, p.nombre, pr.pvp FROM productos p JOIN precios pr ON p.id = pr.producto_id '
+                f'WHERE {where} AND pr.activo = 1 ORDER BY p.nombre_boton', params)
+    return sorted((r[0], r[1], r[2], float(r[3] or 0.0)) for r in cur.fetchall())
+
+
+def run():
+    tmp_dir = tempfile.mkdtemp()
+    dst = os.path.join(tmp_dir, 'inventario.db.botones.sqlite')
+    shutil.copy(database.DB_PATH, dst)
+    orig = database.DB_PATH
+    database.DB_PATH = dst
+    try:
+        database.bootstrap_schema()
+        assert indice_botones.cargar()
+        categorias = indice_botones.categorias()
+        tipos = indice_botones.tipos()
+        print('Categorías:', len(categorias), 'Tipos:', len(tipos))
+        assert categorias and tipos
+
+        conn = database.connect()
+        try:
+            conn.row_factory = None
+            cur = conn.cursor()
+            for cat in categorias:
+                assert sorted(indice_botones.productos_categoria(cat)) == _por_sql(cur, 'categoria', cat, True), cat
+            for tipo in tipos:
+                assert sorted(indice_botones.productos_tipo(tipo)) == _por_sql(cur, 'tipo', tipo, False), tipo
+        finally:
+            conn.close()
+
+        # eliminar un producto invalida el índice; la siguiente lectura ya no lo trae
+        cat = categorias[0]
+        pid = indice_botones.productos_categoria(cat)[0][0]
+        assert ProductoService().eliminar_producto(pid)
+        assert not indice_botones.cargado
+        restantes = [c for c in indice_botones.categorias() for b in indice_botones.productos_categoria(c) if b[0] == pid]
+        assert indice_botones.cargado and not restantes
+
+        # una invalidación durante la carga (p. ej. la de fondo) la deja pendiente
+        product_schema = database.product_schema
+
+        def schema_invalidando(*args, **kwargs):
+            indice_botones.invalidar()
+            return product_schema(*args, **kwargs)
+
+        database.product_schema = schema_invalidando
+        try:
+            assert indice_botones.cargar()
+        finally:
+            database.product_schema = product_schema
+        assert not indice_botones.cargado
+        indice_botones.categorias()
+        assert indice_botones.cargado
+        print('TESTS OK')
+    finally:
+        database.DB_PATH = orig
+        indice_botones.invalidar()
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    run()
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""Checks that the scanner code index keeps products saved while it is loading (non-pytest)."""
+import os
+import shutil
+import tempfile
+
+import database
+from modulos.almacen.indice_codigos import indice_codigos
+from modulos.almacen.producto_service import ProductoService
+
+
+class _CursorConPausa:
+    """Cursor que ejecuta `al_leer()` tras la primera lectura (la carga ya tiene su foto)."""
+
+    def __init__(self, cur, al_leer):
+        self._cur = cur
+        self._al_leer = al_leer
+
+    def fetchall(self):
+        filas = self._cur.fetchall()
+        if self._al_leer:
+            al_leer, self._al_leer = self._al_leer, None
+            al_leer()
+        return filas
+
+    def __getattr__(self, nombre):
+        return getattr(self._cur, nombre)
+
+
+class _ConexionConPausa:
+    def __init__(self, conn, al_leer):
+        self._conn = conn
+        self._al_leer = al_leer
+
+    def cursor(self):
+        return _CursorConPausa(self._conn.cursor(), self._al_leer)
+
+    def __getattr__(self, nombre):
+        return getattr(self._conn, nombre)
+
+
+def _cargar_con(al_leer):
+    """`indice_codigos.cargar()` con `al_leer()` ejecutado a mitad de carga."""
+    connect = database.connect
+    pausado = lambda db_path=None: _ConexionConPausa(connect(db_path), en_pausa)
+
+    def en_pausa():
+        database.connect = connect
+        try:
+            al_leer()
+        finally:
+            database.connect = pausado
+
+    database.connect = pausado
+    try:
+        return indice_codigos.cargar()
+    finally:
+        database.connect = connect
+
+
+def run():
+    tmp_dir = tempfile.mkdtemp()
+    dst = os.path.join(tmp_dir, 'inventario.db.codigos.sqlite')
+    shutil.copy(database.DB_PATH, dst)
+    orig = database.DB_PATH
+    database.DB_PATH = dst
+    try:
+        database.bootstrap_schema()
+        svc = ProductoService()
+        datos = {'nombre': 'Taza índice', 'sku': 'IDX-TAZA-1', 'categoria': 'Tazas', 'pvp': 5.0}
+        pid = svc.guardar_producto(datos, ['8400000000028'], [])
+        assert pid
+        assert indice_codigos.cargar()
+        assert indice_codigos.buscar('IDX-TAZA-1')['precio'] == 5.0
+
+        # un cambio de precio mientras la carga lee no se pisa con la foto vieja
+        assert _cargar_con(lambda: svc.guardar_producto(dict(datos, id=pid, pvp=7.5), ['8400000000028'], []))
+        assert indice_codigos.buscar('IDX-TAZA-1')['precio'] == 7.5
+        assert indice_codigos.buscar('8400000000028')['precio'] == 7.5
+        assert svc.buscar_por_codigo('IDX-TAZA-1')['precio'] == 7.5
+
+        # ni un borrado
+        assert _cargar_con(lambda: svc.eliminar_producto(pid))
+        assert indice_codigos.buscar('IDX-TAZA-1') is None and indice_codigos.buscar('8400000000028') is None
+
+        # y si se vacía durante la carga, la carga se descarta
+        otro = svc.guardar_producto(dict(datos, sku='IDX-TAZA-2'), [], [])
+        assert otro and indice_codigos.buscar('IDX-TAZA-2')
+        assert not _cargar_con(indice_codigos.vaciar)
+        assert indice_codigos.buscar('IDX-TAZA-2') is None
+        print('TESTS OK')
+    finally:
+        database.DB_PATH = orig
+        database.close_all()
+        indice_codigos.vaciar()
+        indice_codigos.cargado = False
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    run()
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""Checks that the index migration is idempotent and that hot queries use the indexes (non-pytest)."""
+import os
+import shutil
+import tempfile
+import subprocess
+import sys
+from database import DB_PATH, connect
+from modulos.almacen.producto_service import SQL_BUSCAR_POR_CODIGO
+
+# (consulta, parámetros, índices que deben aparecer en EXPLAIN QUERY PLAN)
+CONSULTAS = [
+    # escáner (fallback SQL de ProductoService.buscar_por_codigo)
+    (SQL_BUSCAR_POR_CODIGO, ('X', 'X'), ['idx_codigos_barras_ean', 'idx_precios_producto_activo']),
+    # TicketService.obtener_ticket_completo
+    ('SELECT * FROM ticket_lines WHERE ticket_id=? ORDER BY id ASC', (1,), ['idx_ticket_lines_ticket_id']),
+    # TicketService.listar_tickets_por_cierre
+    ('SELECT id, created_at, ticket_no, cajero, total FROM tickets WHERE cierre_id=? ORDER BY created_at ASC', (1,), ['idx_tickets_cierre_id']),
+    # productos con precio activo de un tipo (selector sin código sin índice en memoria)
+    ('SELECT p.id, p.nombre_boton, p.nombre, pr.pvp FROM productos p JOIN precios pr ON p.id = pr.producto_id '
+     'WHERE p.tipo = ? AND pr.activo = 1 ORDER BY p.nombre_boton', ('X',), ['idx_productos_tipo', 'idx_precios_producto_activo']),
+    # búsqueda exacta de cliente
+    ('SELECT id FROM clientes WHERE telefono = ?', ('600000000',), ['idx_clientes_telefono']),
+    ('SELECT id FROM clientes WHERE dni = ?', ('X',), ['idx_clientes_dni']),
+    # CierreService.obtener_detalle_cierre (cierre anterior)
+    ('SELECT MAX(fecha_hora) FROM cierres_caja WHERE fecha_hora < ?', ('2030-01-01',), ['idx_cierres_caja_fecha_hora']),
+]
+
+
+def run():
+    tmp_dir = tempfile.mkdtemp()
+    dst = os.path.join(tmp_dir, 'inventario.db.indices.sqlite')
+    shutil.copy(DB_PATH, dst)
+    print('Staging DB at', dst)
+
+    env = os.environ.copy()
+    env['PYTHONPATH'] = os.getcwd()
+    p1 = subprocess.run([sys.executable, 'scripts/migracion_indices.py', dst], env=env, capture_output=True, text=True)
+    print('First run stdout:', p1.stdout.strip())
+    p2 = subprocess.run([sys.executable, 'scripts/migracion_indices.py', dst], env=env, capture_output=True, text=True)
+    print('Second run stdout:', p2.stdout.strip())
+    assert p1.returncode == 0, p1.stderr
+    assert p2.returncode == 0, p2.stderr
+    assert 'ya presentes' in p2.stdout
+
+    conn = connect(dst)
+    cur = conn.cursor()
+    try:
+        for sql, params, indices in CONSULTAS:
+            cur.execute('EXPLAIN QUERY PLAN ' + sql, params)
+            plan = ' | '.join(r[3] for r in cur.fetchall())
+            for idx in indices:
+                assert idx in plan, f'{idx} no usado en: {sql}\n  plan: {plan}'
+        print('TESTS OK')
+    finally:
+        try:
+            cur.close()
+        except Exception:
+            pass
+        try:
+            conn.close()
+        except Exception:
+            pass
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    run()
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""Checks the producto_id/categoria/tipo snapshots of ticket_lines and the breakdowns built on them (non-pytest)."""
+import os
+import shutil
+import sqlite3
+import tempfile
+
+import database
+from modulos.almacen.producto_service import ProductoService
+from modulos.tpv.ticket_service import TicketService
+
+
+def run():
+    tmp_dir = tempfile.mkdtemp()
+    dst = os.path.join(tmp_dir, 'inventario.db.lineas.sqlite')
+    shutil.copy(database.DB_PATH, dst)
+    # una venta de antes de la migración (sin producto_id)
+    raw = sqlite3.connect(dst)
+    raw.execute("INSERT INTO tickets (created_at, total, ticket_no) VALUES ('2020-01-01T10:00:00', 10.0, 900001)")
+    raw.execute("INSERT INTO ticket_lines (ticket_id, sku, nombre, cantidad, precio, iva) VALUES (last_insert_rowid(), 'egon87', 'Egon', 2, 5.0, 21)")
+    raw.commit()
+    raw.close()
+
+    orig = database.DB_PATH
+    database.DB_PATH = dst
+    try:
+        database.bootstrap_schema()
+        conn = database.connect()
+        try:
+            cur = conn.cursor()
+            cur.execute("SELECT producto_id, categoria, tipo FROM ticket_lines WHERE sku = 'egon87'")
+            assert tuple(cur.fetchone()) == (20, 'Parches bordados', 'Parche')
+        finally:
+            conn.close()
+
+        svc = TicketService()
+        pid = ProductoService().guardar_producto({'nombre': 'Gorra verde', 'sku': 'LIN-1', 'categoria': 'Gorros', 'tipo': 'Gorra', 'pvp': 9.0}, [], [])
+        tid = svc.guardar_ticket({'total': 25.0, 'cajero': 'test', 'forma_pago': 'EFECTIVO'}, [
+            {'id': pid, 'sku': 'LIN-1', 'nombre': 'Gorra verde', 'cantidad': 2, 'precio': 9.0, 'iva': 21},
+            {'sku': 'egon87', 'nombre': 'Egon', 'cantidad': 1, 'precio': 5.0, 'iva': 21},
+            {'id': 'MAN_DESC', 'nombre': 'DESC. MANUAL', 'cantidad': 1, 'precio': -1.0, 'iva': 0},
+            {'sku': 'x', 'nombre': 'Libre', 'cantidad': 1, 'precio': 3.0, 'iva': 10},
+        ])
+        assert tid
+        lineas = svc.obtener_ticket_completo(tid)['lineas']
+        snaps = [(ln['producto_id'], ln['categoria'], ln['tipo']) for ln in lineas]
+        assert snaps == [(pid, 'Gorros', 'Gorra'), (20, 'Parches bordados', 'Parche'), (None, None, None), (None, None, None)], snaps
+
+        # renombrar y borrar después de la venta no cambia los desgloses
+        conn = database.connect()
+        try:
+            conn.execute("UPDATE categorias SET nombre = 'Gorros y gorras' WHERE nombre = 'Gorros'")
+            conn.commit()
+        finally:
+            conn.close()
+        ProductoService().guardar_producto({'id': pid, 'nombre': 'Gorra verde lima', 'sku': 'LIN-1', 'categoria': 'Gorros y gorras',
+                                            'tipo': 'Gorra', 'pvp': 9.0}, [], [])
+        svc.guardar_ticket({'total': 9.0, 'cajero': 'test', 'forma_pago': 'TARJETA'},
+                           [{'id': pid, 'sku': 'LIN-1', 'nombre': 'Gorra verde lima', 'cantidad': 1, 'precio': 9.0, 'iva': 21}])
+        assert ProductoService().eliminar_producto(20)
+
+        where = "created_at >= '2021-01-01'"
+        conn = database.connect()
+        try:
+            res = database.agregar_tickets(conn, where, (), por_categoria=True, por_tipo=True, por_articulo=True)
+            cur = conn.cursor()
+            cur.execute("EXPLAIN QUERY PLAN SELECT tl.categoria, SUM(tl.cantidad) FROM ticket_lines tl "
+                        f"WHERE tl.ticket_id IN (SELECT id FROM tickets WHERE {where}) GROUP BY tl.categoria")
+            plan = ' | '.join(r[3] for r in cur.fetchall())
+        finally:
+            conn.close()
+        cats = {c['categoria']: c['total'] for c in res['por_categoria']}
+        print('Por categoría:', cats)
+        assert cats == {'Gorros': 18.0, 'Parches bordados': 5.0, 'Gorros y gorras': 9.0}, cats
+        assert {t['tipo']: t['total'] for t in res['por_tipo']} == {'Gorra': 27.0, 'Parche': 5.0}
+        arts = {a['nombre']: a['qty'] for a in res['por_articulo']}
+        print('Por artículo:', arts)
+        # mismo producto con dos nombres: una sola fila con el nombre más reciente
+        assert arts == {'Gorra verde lima': 3, 'Egon': 1, 'DESC. MANUAL': 1, 'Libre': 1}, arts
+        assert 'productos' not in plan, plan
+        print('TESTS OK')
+    finally:
+        database.DB_PATH = orig
+        database.close_all()
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    run()
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""Checks keyset pagination of the catalogue against a full ordered read (non-pytest)."""
+import os
+import shutil
+import tempfile
+
+import database
+from modulos.almacen.articulos import dao_articulos
+from modulos.almacen.producto_service import ProductoService
+
+
+def _recorrer(svc, filtros):
+    ids, cursor, total = [], None, None
+    while True:
+        res = svc.obtener_pagina_productos(filtros, cursor, incluir_total=True)
+        ids += [it['id'] for it in res['items']]
+        total = res['total']
+        if not res['has_next']:
+            return ids, total
+        cursor = res['cursor_siguiente']
+
+
+def run():
+    tmp_dir = tempfile.mkdtemp()
+    dst = os.path.join(tmp_dir, 'inventario.db.paginacion.sqlite')
+    shutil.copy(database.DB_PATH, dst)
+    orig = database.DB_PATH
+    database.DB_PATH = dst
+    try:
+        database.bootstrap_schema()
+        conn = database.connect()
+        try:
+            cur = conn.cursor()
+            # nombres repetidos y categorías vacías para probar el desempate por id
+            for i in range(120):
+                cur.execute(
+                    'INSERT INTO productos (nombre, sku, categoria, proveedor, tipo) VALUES (?,?,?,?,?)',
+                    (f'art{i % 9}', f'PAG{i}', ['Gorros', 'Camisetas', '', None][i % 4], ['p1', 'p2'][i % 2], ['Gorra', None, 'Parche'][i % 3]),
+                )
+            conn.commit()
+        finally:
+            conn.close()
+
+        svc = ProductoService()
+        for sort_by in (None, 'nombre', 'categoria', 'proveedor', 'tipo'):
+            for desc in (False, True):
+                filtros = {'page_size': 13, 'sort_by': sort_by, 'sort_desc': desc}
+                ids, total = _recorrer(svc, filtros)
+                ref = [it['id'] for it in svc.obtener_productos_paginados(dict(filtros, page_size=100000))]
+                assert len(ids) == len(set(ids)) == total == len(ref), (sort_by, desc, len(ids), total)
+                assert sorted(ids) == sorted(ref), (sort_by, desc)
+                if sort_by is None:
+                    assert ids == sorted(ids)
+
+        # los órdenes con cursor saltan por índice, sin ordenar la tabla entera
+        _, from_where, params, sort_exprs = dao_articulos.catalog_query(None)
+        conn = database.connect()
+        try:
+            for key in ('nombre', 'categoria', 'proveedor', 'tipo'):
+                expr = sort_exprs[key]
+                plan = ' '.join(str(r[-1]) for r in conn.execute(
+                    f'EXPLAIN QUERY PLAN SELECT p.id{from_where} WHERE {expr} >= ? AND ({expr}, p.id) > (?, ?) '
+                    f'ORDER BY {expr}, p.id LIMIT 14', params + ['', '', 0]).fetchall())
+                indice = 'idx_productos_orden_nombre' if key == 'nombre' else f'idx_productos_{key}_orden'
+                assert f'SEARCH p USING INDEX {indice}' in plan and 'TEMP B-TREE' not in plan, (key, plan)
+        finally:
+            conn.close()
+
+        # ...y siguen siendo alfabéticos por el nombre mostrado, también tras renombrar en la maestra
+        def _nombres(sort_by, desc=False):
+            filas, cursor = [], None
+            while True:
+                res = svc.obtener_pagina_productos({'page_size': 13, 'sort_by': sort_by, 'sort_desc': desc}, cursor)
+                filas += [it[sort_by] for it in res['items']]
+                if not res['has_next']:
+                    return filas
+                cursor = res['cursor_siguiente']
+
+        for key in ('categoria', 'proveedor', 'tipo'):
+            assert _nombres(key) == sorted(_nombres(key)), key
+            assert _nombres(key, True) == sorted(_nombres(key), reverse=True), key
+        conn = database.connect()
+        try:
+            conn.execute("UPDATE categorias SET nombre = 'Zzz gorros' WHERE nombre = 'Gorros'")
+            conn.commit()
+        finally:
+            conn.close()
+        nombres = _nombres('categoria')
+        assert nombres == sorted(nombres) and nombres[-1] == 'Zzz gorros'
+        conn = database.connect()
+        try:
+            conn.execute("UPDATE categorias SET nombre = 'Gorros' WHERE nombre = 'Zzz gorros'")
+            conn.commit()
+        finally:
+            conn.close()
+
+        # filtro + total cacheado, que se invalida al borrar por el servicio
+        ids, total = _recorrer(svc, {'page_size': 7, 'categoria': 'gorros'})
+        assert len(ids) == total and total >= 30
+        assert svc.eliminar_productos_por_id(ids[:3])
+        assert svc.contar_productos({'categoria': 'gorros'}) == total - 3
+
+        # un cursor de otro orden se ignora: vuelve a la primera página
+        primera = svc.obtener_pagina_productos({'page_size': 5, 'sort_by': 'nombre'})
+        otra = svc.obtener_pagina_productos({'page_size': 5, 'sort_by': 'tipo'}, primera['cursor_siguiente'])
+        assert otra['items'] == svc.obtener_pagina_productos({'page_size': 5, 'sort_by': 'tipo'})['items']
+        print('TESTS OK')
+    finally:
+        database.DB_PATH = orig
+        database.close_all()
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    run()
@@ -0,0 +1,38 @@
+#!/usr/bin/env python3
+"""Checks the startup profiler's import and step timings (non-pytest)."""
+import sys
+import time
+
+from modulos.perfil_arranque import PerfilArranque
+
+
+def run():
+    perfil = PerfilArranque()
+    with perfil.paso('inactivo'):
+        pass
+    assert perfil.pasos == []
+
+    for m in ('xml.dom.minidom', 'xml.dom'):
+        sys.modules.pop(m, None)
+    perfil.activar()
+    try:
+        with perfil.paso('import minidom'):
+            import xml.dom.minidom  # noqa: F401
+        with perfil.paso('espera'):
+            time.sleep(0.02)
+    finally:
+        perfil.desactivar()
+    modulos = {m: (propio, acumulado) for m, propio, acumulado in perfil.imports}
+    print('Imports:', sorted(modulos))
+    assert 'xml.dom.minidom' in modulos
+    propio, acumulado = modulos['xml.dom.minidom']
+    assert 0 <= propio <= acumulado
+    assert [p for p, _ in perfil.pasos] == ['import minidom', 'espera'] and perfil.pasos[1][1] >= 15
+    informe = perfil.informe()
+    print(informe)
+    assert 'xml.dom.minidom' in informe and 'espera' in informe
+    print('TESTS OK')
+
+
+if __name__ == '__main__':
+    run()
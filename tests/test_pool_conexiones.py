@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""Checks that close_all() also closes idle pooled connections of worker threads (non-pytest)."""
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+
+import database
+
+
+def _usar_en_hilo(dst, conexiones, parar=None):
+    """Usa una conexión del pool en otro hilo; con `parar` el hilo sigue vivo hasta que se marque."""
+    def trabajo():
+        conn = database.connect(dst)
+        conn.execute('SELECT 1').fetchone()
+        conexiones.append(conn)
+        conn.close()
+        if parar is not None:
+            parar.wait()
+    hilo = threading.Thread(target=trabajo, daemon=True)
+    hilo.start()
+    return hilo
+
+
+def _cerrada(conn) -> bool:
+    try:
+        conn.execute('SELECT 1')
+        return False
+    except sqlite3.ProgrammingError:
+        return True
+
+
+def run():
+    tmp_dir = tempfile.mkdtemp()
+    dst = os.path.join(tmp_dir, 'inventario.db.pool.sqlite')
+    shutil.copy(database.DB_PATH, dst)
+    parar = threading.Event()
+    try:
+        # un worker vivo (como el post-venta) con su conexión libre en el pool
+        conexiones = []
+        vivo = _usar_en_hilo(dst, conexiones, parar)
+        while not conexiones:
+            threading.Event().wait(0.01)
+        propia = database.connect(dst)
+        propia.close()
+        assert not _cerrada(conexiones[0])
+        database.close_all()
+        assert _cerrada(conexiones[0]) and _cerrada(propia)
+        parar.set()
+        vivo.join()
+
+        # un hilo ya terminado (como la carga de un índice): se cierra en el siguiente checkout
+        conexiones = []
+        _usar_en_hilo(dst, conexiones).join()
+        assert not _cerrada(conexiones[0])
+        database.connect(dst).close()
+        assert _cerrada(conexiones[0])
+
+        # sin conexiones abiertas el WAL queda volcado en la base
+        database.close_all()
+        assert not os.path.exists(dst + '-wal') or os.path.getsize(dst + '-wal') == 0
+        print('TESTS OK')
+    finally:
+        parar.set()
+        database.close_all()
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    run()
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""Checks the post-sale queue (order, client update) and that finalizar_venta is atomic (non-pytest)."""
+import os
+import shutil
+import tempfile
+
+import database
+from modulos.clientes.cliente_service import ClienteService
+from modulos.tpv.postventa import ColaPostVenta, construir_texto_ticket
+from modulos.tpv.ticket_service import TicketService
+
+
+def _numeracion():
+    """(ticket_seq.val, MAX(ticket_no)) de la base de la prueba."""
+    conn = database.connect()
+    try:
+        cur = conn.cursor()
+        cur.execute("SELECT val FROM ticket_seq WHERE name='ticket_no'")
+        seq = cur.fetchone()[0]
+        cur.execute('SELECT MAX(ticket_no) FROM tickets')
+        return seq, cur.fetchone()[0]
+    finally:
+        conn.close()
+
+
+def run():
+    tmp_dir = tempfile.mkdtemp()
+    dst = os.path.join(tmp_dir, 'inventario.db.postventa.sqlite')
+    shutil.copy(database.DB_PATH, dst)
+    orig = database.DB_PATH
+    database.DB_PATH = dst
+    cola = ColaPostVenta()
+    try:
+        database.bootstrap_schema()
+        cli_svc = ClienteService()
+        cliente_id = cli_svc.crear_cliente({'nombre': 'Cliente Test'})
+        cli_svc.sumar_puntos(cliente_id, 10)
+        cliente = cli_svc.obtener_por_id(cliente_id)
+
+        carrito = [{'sku': 'x', 'nombre': 'Libre', 'cantidad': 2, 'precio': 5.0, 'iva': 21}]
+        previstos = []
+        for i in range(3):
+            previstos.append(cola.encolar({
+                'datos_ticket': {'total': 10.0, 'cajero': 'ana', 'cliente': 'Cliente Test' if i == 0 else None,
+                                 'forma_pago': 'EFECTIVO', 'pagado': 20.0, 'cambio': 10.0},
+                'carrito': carrito,
+                'cliente': cliente if i == 0 else None,
+                'puntos_canjear': 4 if i == 0 else 0,
+                'imprimir': False,
+            }))
+        # la UI puede vaciar su carrito nada más encolar
+        carrito.clear()
+        cola.esperar()
+
+        res = cola.recoger()
+        print('Resultados:', [(r['numero_previsto'], r['ticket_no'], r['error']) for r in res])
+        assert len(res) == 3 and cola.pendientes() == 0
+        assert all(r['error'] is None for r in res)
+        assert [r['ticket_no'] for r in res] == previstos
+        assert 'Puntos canjeados: -4.00 pts' in res[0]['texto']
+        assert '2x Libre  5.00' in res[1]['texto']
+
+        datos = TicketService().obtener_ticket_completo(res[0]['ticket_id'])
+        assert len(datos['lineas']) == 1
+        cli = cli_svc.obtener_por_id(cliente_id)
+        esperado = 10 - 4 + float(datos['meta']['puntos_ganados'] or 0)
+        assert abs(float(cli['puntos_fidelidad']) - esperado) < 1e-6
+        assert abs(float(cli['total_gastado']) - 10.0) < 1e-6
+
+        # finalizar_venta es atómica: si falla una línea, ni ticket ni puntos
+        svc = TicketService()
+        n_antes = _numeracion()
+        assert n_antes[0] is not None and n_antes[1] == previstos[-1]
+        malo = svc.finalizar_venta({'total': 5.0, 'puntos_ganados': 1, 'puntos_canjeados': 0},
+                                   [{'sku': 'x', 'nombre': 'Mala', 'cantidad': 1, 'precio': object(), 'iva': 21}],
+                                   cliente_id=cliente_id)
+        assert malo is None and _numeracion() == n_antes
+        cli2 = cli_svc.obtener_por_id(cliente_id)
+        assert cli2['puntos_fidelidad'] == cli['puntos_fidelidad'] and cli2['total_gastado'] == cli['total_gastado']
+        assert len(TicketService().listar_tickets_por_fecha(datos['meta']['created_at'][:10])) == 3
+
+        # una venta que no se guarda vuelve con su foto para reintentar o recuperar
+        cola = ColaPostVenta()
+        cola.encolar({'datos_ticket': {'total': 5.0}, 'cliente': None, 'imprimir': False,
+                      'carrito': [{'sku': 'x', 'nombre': 'Mala', 'cantidad': 1, 'precio': object(), 'iva': 21}]})
+        cola.esperar()
+        fallo = cola.recoger()
+        assert len(fallo) == 1 and fallo[0]['error'] and cola.pendientes() == 0
+        assert fallo[0]['venta']['carrito'][0]['nombre'] == 'Mala' and _numeracion() == n_antes
+
+        # y el número que no se usó es el de la siguiente venta buena
+        bueno = svc.finalizar_venta({'total': 5.0, 'cajero': 'ana', 'forma_pago': 'EFECTIVO'},
+                                    [{'sku': 'x', 'nombre': 'Buena', 'cantidad': 1, 'precio': 5.0, 'iva': 21}])
+        assert bueno and bueno['ticket_no'] == n_antes[0] + 1 == n_antes[1] + 1
+        assert _numeracion() == (n_antes[0] + 1, n_antes[1] + 1)
+
+        texto = construir_texto_ticket({'ticket_no': 7, 'total': 3, 'forma_pago': 'TARJETA', 'pagado': 3}, [])
+        assert 'FACTURA Nº: 7' in texto and 'TARJETA: 3.00' in texto and 'CAMBIO' not in texto
+        print('TESTS OK')
+    finally:
+        database.DB_PATH = orig
+        database.close_all()
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    run()
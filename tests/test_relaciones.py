@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""Checks the integer category/provider/type keys of productos and the queries using them (non-pytest)."""
+import os
+import shutil
+import tempfile
+
+import database
+from modulos.almacen.articulos import dao_articulos
+from modulos.almacen.producto_service import ProductoService
+from modulos.tpv.ticket_service import TicketService
+
+
+def run():
+    tmp_dir = tempfile.mkdtemp()
+    dst = os.path.join(tmp_dir, 'inventario.db.relaciones.sqlite')
+    shutil.copy(database.DB_PATH, dst)
+    orig = database.DB_PATH
+    database.DB_PATH = dst
+    try:
+        database.bootstrap_schema()
+        conn = database.connect()
+        try:
+            cur = conn.cursor()
+            # backfill: el proveedor se guardaba como id en texto, la categoría por nombre
+            cur.execute("SELECT p.proveedor_id, p.categoria_id, c.nombre FROM productos p LEFT JOIN categorias c ON c.id = p.categoria_id WHERE p.sku = 'caja33'")
+            prov_id, cat_id, cat_nombre = cur.fetchone()
+            assert prov_id == 1 and cat_id is not None and cat_nombre == 'Gorros'
+            cur.execute('SELECT COUNT(*) FROM productos WHERE categoria_id IS NULL OR proveedor_id IS NULL OR tipo_id IS NULL')
+            assert cur.fetchone()[0] == 0
+        finally:
+            conn.close()
+
+        svc = ProductoService()
+        pid = svc.guardar_producto({'nombre': 'Camiseta logo', 'sku': 'REL-1', 'categoria': 'Camisetas', 'proveedor': 'Kool Things',
+                                    'tipo': 'Camiseta', 'pvp': 15.0}, [], [])
+        huerfano = svc.guardar_producto({'nombre': 'Cosa rara', 'sku': 'REL-2', 'categoria': 'Sin maestra', 'pvp': 1.0}, [], [])
+        assert pid and huerfano
+
+        def ids(**f):
+            return sorted(it['id'] for it in svc.obtener_productos_paginados(dict(f, page_size=1000)))
+
+        assert pid in ids(categoria='camisetas')
+        assert ids(categoria='Sin maestra') == [huerfano]
+        assert pid in ids(proveedor='Kool Things', tipo='Camiseta')
+        valores = svc.obtener_valores_unicos('categoria')
+        assert 'Camisetas' in valores and 'Sin maestra' in valores
+
+        # renombrar la maestra no rompe el enlace y el catálogo muestra el nombre nuevo
+        conn = database.connect()
+        try:
+            conn.execute("UPDATE categorias SET nombre = 'Camisetas básicas' WHERE nombre = 'Camisetas'")
+            conn.commit()
+        finally:
+            conn.close()
+        assert ids(categoria='Camisetas básicas') == ids(categoria='camisetas básicas')
+        assert pid in ids(categoria='Camisetas básicas')
+        item = [it for it in svc.obtener_productos_paginados({'search': 'REL-1', 'page_size': 10}) if it['id'] == pid][0]
+        assert item['categoria'] == 'Camisetas básicas'
+
+        # el filtro usa el índice de la clave entera
+        _, from_where, params, _ = dao_articulos.catalog_query(None, '', '', 'Gorros', '', with_price=False)
+        conn = database.connect()
+        try:
+            cur = conn.cursor()
+            cur.execute('EXPLAIN QUERY PLAN SELECT COUNT(*)' + from_where, params)
+            plan = ' | '.join(r[3] for r in cur.fetchall())
+            assert 'idx_productos_categoria_id' in plan, plan
+        finally:
+            conn.close()
+
+        # desglose por categoría del cierre
+        assert TicketService().guardar_ticket({'total': 30.0, 'cajero': 'test', 'forma_pago': 'EFECTIVO'},
+                                              [{'sku': 'REL-1', 'nombre': 'Camiseta logo', 'cantidad': 2, 'precio': 15.0, 'iva': 21}])
+        conn = database.connect()
+        try:
+            res = database.agregar_tickets(conn, 'cierre_id IS NULL', (), por_categoria=True, por_tipo=True)
+        finally:
+            conn.close()
+        cats = {c['categoria']: c for c in res['por_categoria']}
+        print('Por categoría:', res['por_categoria'])
+        assert abs(cats['Camisetas básicas']['total'] - 30.0) < 1e-6
+        assert 'Camiseta' in {t['tipo'] for t in res['por_tipo']}
+        print('TESTS OK')
+    finally:
+        database.DB_PATH = orig
+        database.close_all()
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    run()
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""Checks that turno_actual matches a full re-aggregation of the open shift (non-pytest)."""
+import os
+import shutil
+import tempfile
+from datetime import date
+
+import database
+from modulos.tpv.ticket_service import TicketService
+
+
+def _cmp(a, b):
+    return abs(float(a or 0) - float(b or 0)) < 1e-6
+
+
+def run():
+    tmp_dir = tempfile.mkdtemp()
+    dst = os.path.join(tmp_dir, 'inventario.db.turno.sqlite')
+    shutil.copy(database.DB_PATH, dst)
+    orig = database.DB_PATH
+    database.DB_PATH = dst
+    try:
+        database.bootstrap_schema()
+        svc = TicketService()
+        ventas = [
+            ({'total': 12.5, 'cajero': 'ana', 'forma_pago': 'EFECTIVO', 'puntos_ganados': 3, 'puntos_canjeados': 0},
+             [{'sku': 'egon87', 'nombre': 'Egon', 'cantidad': 2, 'precio': 5.0, 'iva': 21},
+              {'sku': 'x', 'nombre': 'Libre', 'cantidad': 1, 'precio': 2.5, 'iva': 10}]),
+            ({'total': 7.0, 'cajero': 'luis', 'forma_pago': 'TARJETA', 'puntos_ganados': 1, 'puntos_canjeados': 2},
+             [{'sku': 'caja33', 'nombre': 'caja', 'cantidad': 1, 'precio': 7.0, 'iva': 21}]),
+        ]
+        for datos, lineas in ventas:
+            assert svc.guardar_ticket(datos, lineas)
+
+        conn = database.connect()
+        try:
+            turno = database.leer_turno(conn)
+            completo = database.agregar_tickets(conn, database.TURNO_ABIERTO, ())
+            # importes en céntimos enteros, como tickets.total_cent
+            assert [r[0] for r in conn.execute('SELECT DISTINCT typeof(total_cent) FROM turno_actual')] == ['integer']
+        finally:
+            conn.close()
+        print('Turno:', turno)
+        assert turno is not None
+        for key in ('count_tickets', 'total', 'total_efectivo', 'total_tarjeta', 'puntos_ganados', 'puntos_canjeados'):
+            assert _cmp(turno[key], completo[key]), key
+        assert turno['tickets_to'] == completo['tickets_to']
+        iva_t = {i['iva']: i['total'] for i in turno['impuestos']}
+        iva_c = {i['iva']: i['total'] for i in completo['impuestos']}
+        assert set(iva_t) == set(iva_c) and all(_cmp(iva_t[k], iva_c[k]) for k in iva_t)
+
+        # reconstruir da lo mismo que el contador incremental
+        conn = database.connect()
+        try:
+            database.reconstruir_turno(conn)
+            conn.commit()
+            rehecho = database.leer_turno(conn)
+        finally:
+            conn.close()
+        for key in ('count_tickets', 'total', 'total_efectivo', 'total_tarjeta', 'puntos_ganados', 'puntos_canjeados', 'tickets_to'):
+            assert _cmp(rehecho[key], turno[key]), key
+
+        # el cierre Z cierra también los tickets abiertos de días anteriores y vacía el acumulador
+        assert svc.guardar_ticket({'created_at': '2001-01-01T10:00:00', 'total': 3.0, 'cajero': 'ana', 'forma_pago': 'EFECTIVO'},
+                                  [{'sku': 'x', 'nombre': 'Viejo', 'cantidad': 1, 'precio': 3.0, 'iva': 21}])
+        conn = database.connect()
+        try:
+            assert _cmp(database.leer_turno(conn)['total'], turno['total'] + 3.0)
+        finally:
+            conn.close()
+        resumen = database.close_day(date.today().isoformat(), tipo='Z', cajero='test')
+        assert _cmp(resumen['total'], turno['total'] + 3.0)
+        conn = database.connect()
+        try:
+            assert database.leer_turno(conn) is None
+            cur = conn.cursor()
+            cur.execute(f'SELECT COUNT(*) FROM tickets WHERE {database.TURNO_ABIERTO}')
+            assert cur.fetchone()[0] == 0
+        finally:
+            conn.close()
+        print('TESTS OK')
+    finally:
+        database.DB_PATH = orig
+        database.close_all()
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    run()